@@ -4,6 +4,8 @@ import argparse
 import json
 import pathlib
 
+from hwbench.bench.raw_samples import aggregate_raw_samples, read_raw_samples
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -11,6 +13,12 @@ def main():
         description="Convert hwbench results to csv",
     )
     parser.add_argument("filename", help="input JSON file to convert to CSV")
+    parser.add_argument(
+        "--raw-resolution",
+        help="aggregate the raw samples over windows of this duration in seconds, instead of exporting every sample",
+        type=float,
+        default=0,
+    )
     args = parser.parse_args()
     file_path = pathlib.Path(args.filename)
     data = json.loads(file_path.read_bytes())
@@ -18,6 +26,7 @@ def main():
     create_csv_benchmarks_cpu(output_file(file_path, "bench"), data)
     create_csv_power(output_file(file_path, "power"), data)
     create_csv_memory(output_file(file_path, "memory"), data)
+    create_csv_samples(output_file(file_path, "samples"), file_path.parent, data, args.raw_resolution)
 
 
 def output_file(input_file: pathlib.Path, category: str) -> pathlib.Path:
@@ -83,6 +92,44 @@ def create_csv_memory(out_file: pathlib.Path, data):
         print_memrates(out, results)
 
 
+def create_csv_samples(out_file: pathlib.Path, results_dir: pathlib.Path, data, resolution: float):
+    results = sorted(data["bench"].values(), key=result_key)
+    samples_files = {}
+    for result in results:
+        samples_file = result.get("monitoring", {}).get("metadata", {}).get("samples_file")
+        if samples_file and results_dir.joinpath(samples_file).is_file():
+            samples_files[(result.get("job_name", ""), result.get("job_number", ""))] = results_dir / samples_file
+    # Raw samples are only available with monitor_raw=all
+    if not samples_files:
+        return
+
+    with open(out_file, "w") as out:
+        print(f"Writing monitoring samples to {out_file}")
+        if resolution:
+            print("job_name,job_number,time,metric,min,mean,max,stdev,samples", file=out)
+        else:
+            print("job_name,job_number,time,wallclock,source,metric,value", file=out)
+        for (job_name, job_number), samples_file in samples_files.items():
+            samples = read_raw_samples(samples_file)
+            if not samples:
+                continue
+            if resolution:
+                for metric, stats in aggregate_raw_samples(samples, resolution).items():
+                    for window in range(len(stats["mean"])):
+                        values = ",".join(
+                            str(stats[stat][window]) for stat in ["min", "mean", "max", "stdev", "samples"]
+                        )
+                        print(f"{job_name},{job_number},{window * resolution},{metric},{values}", file=out)
+            else:
+                # time is in seconds since the first sample of the job
+                start_ns = samples[0].monotonic_ns
+                for sample in samples:
+                    print(
+                        f"{job_name},{job_number},{(sample.monotonic_ns - start_ns) * 1e-9},{sample.wallclock},{sample.source},{sample.metric},{sample.value}",
+                        file=out,
+                    )
+
+
 def print_streams(out, results):
     for result in results:
         engine_module = result.get("engine_module")
@@ -12,7 +12,7 @@ from matplotlib.ticker import AutoMinorLocator, FuncFormatter, MultipleLocator
 
 from graph.common import fatal
 from graph.trace import Bench
-from hwbench.bench.monitoring_structs import MonitoringContextKeys, MonitorMetric
+from hwbench.bench.monitoring_structs import LATENCY_BUCKETS_MS, MonitoringContextKeys, MonitorMetric
 from hwbench.utils.helpers import cpu_list_to_range
 
 MEAN = "mean"
@@ -367,8 +367,7 @@ def numa_aggregated_components(
             values = [c.get_mean()[sample] for c in cores if sample < len(c.get_mean())]
             means.append(float(np.mean(values)) if values else 0.0)
         metric = MonitorMetric(f"NUMA {node}", cores[0].get_unit())
-        metric.mean = means
-        metric.full_name = f"NUMA {node}"
+        metric.load_from_dict({"mean": means}, f"NUMA {node}")
         components.append(metric)
     return components
 
@@ -967,5 +966,63 @@ def yerr_graph(
     return 1
 
 
+def endpoints_latency_graph(args, output_dir, bench: Bench, device: str) -> int:
+    """Render the latency breakdown of the urls requested to a monitoring device.
+
+    Every url is a horizontal bar split by latency bucket, labelled with its mean
+    latency, request count, retries and received bytes, the slowest url on top."""
+    endpoints = bench.get_endpoints().get(device)
+    if not endpoints:
+        return 0
+    urls = sorted(endpoints, key=lambda url: endpoints[url].get_mean_latency_ms())
+    buckets = [str(bound) for bound in LATENCY_BUCKETS_MS] + ["+Inf"]
+
+    trace = bench.get_trace()
+    title = f'{device} requests latency during "{bench.get_bench_name()}" benchmark job\n\n Stressor: '
+    title += f"{bench.workers()} x {bench.get_title_engine_name()} for {bench.duration()} seconds"
+    title += f"\n{bench.get_system_title()}"
+    graph = Graph(
+        args,
+        title,
+        "Answers [%]",
+        "",
+        output_dir.joinpath(f"{trace.get_name()}/{bench.get_bench_name()}/{MonitoringContextKeys.Monitor!s}"),
+        f"{device} endpoints latency",
+        show_source_file=trace,
+    )
+    ax = graph.get_ax()
+    left = np.zeros(len(urls))
+    colors = matplotlib.colormaps["RdYlGn_r"](np.linspace(0, 1, len(buckets)))
+    previous = "0"
+    for bucket, color in zip(buckets, colors):
+        shares = np.array(
+            [
+                100 * endpoints[url].latency_ms.get(bucket, 0) / max(1, sum(endpoints[url].latency_ms.values()))
+                for url in urls
+            ]
+        )
+        if shares.any():
+            ax.barh(urls, shares, left=left, color=color, label=f"{previous}-{bucket} ms")
+        left += shares
+        previous = bucket
+    for index, url in enumerate(urls):
+        stats = endpoints[url]
+        ax.text(
+            1,
+            index,
+            f"mean {stats.get_mean_latency_ms():.1f} ms, max {stats.max_latency_ms:.1f} ms, "
+            f"{stats.requests} requests, {stats.retries} retries, {stats.failures} failures, "
+            f"{stats.body_bytes / 1024:.1f} KiB",
+            va="center",
+            fontsize=7,
+        )
+    ax.set_xlim(0, 100)
+    ax.tick_params(axis="y", labelsize=7)
+    legend = ax.legend(loc="upper left", bbox_to_anchor=(1.01, 1), title="latency", fontsize=8)
+    graph.needs_legend = False
+    graph.render(extra_legend=legend)
+    return 1
+
+
 class InvalidValue(Exception):
     pass
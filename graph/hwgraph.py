@@ -21,6 +21,7 @@ try:
     from graph.common import fatal
     from graph.graph import (
         cpu_distribution_graph,
+        endpoints_latency_graph,
         generic_graph,
         init_matplotlib,
         numa_aggregated_components,
@@ -78,6 +79,7 @@ def _task_env_bench(trace_idx, bench_name, output_dir_str):
     count += graph_cpu_numa(args, trace, bench_name, output_dir)
     count += graph_pdu(args, trace, bench_name, output_dir)
     count += graph_thermal(args, trace, bench_name, output_dir)
+    count += graph_endpoints(args, trace, bench_name, output_dir)
     return count
 
 
@@ -345,6 +347,10 @@ def render_traces(args: argparse.Namespace):
     """Render the trace files passed in arguments"""
     init_matplotlib(args)
     output_dir = pathlib.Path(args.outdir)
+
+    if args.raw_resolution:
+        for trace in args.traces:
+            trace.set_raw_resolution(args.raw_resolution)
     output_dir.mkdir(parents=True, exist_ok=True)
 
     compare_traces(args)
@@ -379,6 +385,11 @@ def generate_stats(args) -> None:
         max_power = {key: ("", 0.0) for key in PowerConsumptionContextKeys}
         for bench_name in sorted(benches):
             bench = trace.bench(bench_name)
+            for pdu, energy in bench.get_energy().items():
+                print(
+                    f"    PDU.{pdu} energy : {energy.joules:.0f} J, {energy.watts:.2f} Watts"
+                    f" from the {energy.method} in {bench_name}"
+                )
             for metric_name in PowerConsumptionContextKeys:
                 try:
                     for m in [MonitoringContextKeys.PowerConsumption]:
@@ -440,6 +451,7 @@ def graph_monitoring_metrics(args, trace: Trace, bench_name: str, output_dir) ->
             metrics = bench.get_component(MonitoringContextKeys.Monitor, metric_name)
         except KeyError:
             print(f"{bench_name}: {metric_name} metric is not present in trace file, skipping.")
+            continue
         if metrics:
             for metric in metrics:
                 # If a metric has no measure, let's ignore it
@@ -486,6 +498,8 @@ def graph_cpu(args, trace: Trace, bench_name: str, output_dir) -> int:
     cpu_graphs["Package power consumption"] = {MonitoringContextKeys.PowerConsumption: "package"}
     cpu_graphs["Core frequency"] = {MonitoringContextKeys.Freq: "Core"}
     cpu_graphs["Core IPC"] = {MonitoringContextKeys.IPC: "Core"}
+    cpu_graphs["Core busy"] = {MonitoringContextKeys.Busy: "Core"}
+    cpu_graphs["Core temperature"] = {MonitoringContextKeys.Thermal: "Core"}
     # Per-core metrics (filter "Core") are rendered twice: once for all the
     # cores of the system, once restricted to the cores that were pinned during
     # this benchmark job. Each rendering lands in its own subdirectory so the
@@ -629,12 +643,27 @@ def graph_pdu(args, trace: Trace, bench_name: str, output_dir) -> int:
 
 def graph_thermal(args, trace: Trace, bench_name: str, output_dir) -> int:
     rendered_graphs = 0
+    bench = trace.bench(bench_name)
+    # The cores temperatures are rendered with the CPU graphs
+    sensors = [
+        metric
+        for metric in bench.get_all_metrics(MonitoringContextKeys.Thermal)
+        if not metric.get_name().startswith("Core")
+    ]
     rendered_graphs += generic_graph(
-        args, output_dir, trace.bench(bench_name), MonitoringContextKeys.Thermal, "Thermal"
+        args, output_dir, bench, MonitoringContextKeys.Thermal, "Thermal", components=sensors
     )
     return rendered_graphs
 
 
+def graph_endpoints(args, trace: Trace, bench_name: str, output_dir) -> int:
+    rendered_graphs = 0
+    bench = trace.bench(bench_name)
+    for device in bench.get_endpoints():
+        rendered_graphs += endpoints_latency_graph(args, output_dir, bench, device)
+    return rendered_graphs
+
+
 # ---------------------------------------------------------------------------
 # CLI entry point
 # ---------------------------------------------------------------------------
@@ -726,6 +755,13 @@ duration     : duration of the event (in seconds)
         type=int,
         default=os.cpu_count() // 2 or 1,
     )
+    parser_graph.add_argument(
+        "--raw-resolution",
+        help="""Rebuild the monitoring metrics from the raw samples files (see monitor_raw) at this resolution, in seconds.
+Traces without raw samples keep their compacted statistics.""",
+        type=float,
+        default=0,
+    )
     parser_graph.set_defaults(func=render_traces)
 
     parser_list = subparsers.add_parser("list", help="list monitoring metrics from a trace file")
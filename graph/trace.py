@@ -8,15 +8,19 @@ from typing import Any
 
 from graph.common import fatal
 from hwbench.bench.monitoring_structs import (
+    EndpointStats,
     MonitoringContextKeys,
     MonitoringContexts,
     MonitoringMetadata,
     MonitoringMetadataKeys,
     MonitorMetric,
+    PduEnergy,
     Power,
     PowerSuppliesContextKeys,
     Temperature,
+    component_matches,
 )
+from hwbench.bench.raw_samples import aggregate_raw_samples, read_raw_samples
 from hwbench.utils.helpers import cpu_list_to_range
 
 EVENTS = "events"
@@ -125,17 +129,71 @@ class Bench:
                         for measure in m[metric][component_family]:
                             original_measure = m[metric][component_family][measure]
                             if original_measure["unit"] == "Watts":
-                                mm = Power(measure, original_measure["unit"])
+                                mm = Power(measure)
                             elif original_measure["unit"] == "Celsius":
-                                mm = Temperature(measure, original_measure["unit"])
+                                mm = Temperature(measure)
                             else:
                                 mm = MonitorMetric(measure, original_measure["unit"])
                             mm.load_from_dict(original_measure, measure)
                             self.metrics[metric][component_family][measure] = mm
                 else:
                     fatal(f"Unexpected {metric} in monitoring")
+            if not self.load_raw_samples():
+                self.align_monitoring()
         return self.metrics
 
+    def load_raw_samples(self) -> bool:
+        """Rebuild the metrics statistics from the raw samples file at the trace resolution.
+
+        Return False if there is no raw samples to use."""
+        resolution = self.trace.get_raw_resolution()
+        samples_file = self.metrics.get(MonitoringMetadataKeys.samples_file)
+        if not resolution or not samples_file:
+            return False
+        samples_path = pathlib.Path(self.trace.get_filename()).parent / samples_file
+        if not samples_path.is_file():
+            print(f"{self.get_bench_name()}: missing {samples_path}, using the compacted statistics")
+            return False
+
+        # The samples of the warm-up are not part of the statistics
+        aggregated = self.trace.get_raw_samples(
+            samples_path, self.metrics.get(MonitoringMetadataKeys.warmup_end_ns) or 0
+        )
+        if not aggregated:
+            return False
+        for full_name, stats in aggregated.items():
+            context, family, name = full_name.split(".", 2)
+            metric = self.metrics.get(context, {}).get(family, {}).get(name)
+            if metric:
+                metric.load_from_dict(stats, name)
+        self.metrics[MonitoringMetadataKeys.iteration_time] = resolution
+        self.metrics[MonitoringMetadataKeys.samples_count] = len(next(iter(aggregated.values()))["mean"])
+        return True
+
+    def align_monitoring(self) -> None:
+        """Align the metrics of every monitoring source on the time interval of the coarsest one.
+
+        Each source can be sampled at its own rate, graphs are using a single time reference."""
+        sources = self.metrics.get(MonitoringMetadataKeys.sources)
+        if not sources:
+            return
+        reference = self.get_time_interval()
+        # A metric belongs to the first source listing it
+        aligned: set[int] = set()
+        for source in sources.values():
+            for component in source["components"]:
+                context, _, family_metric = component.partition(".")
+                family, _, _ = family_metric.partition(".")
+                for family_name, metrics in self.metrics.get(context, {}).items():
+                    if family and family_name != family:
+                        continue
+                    for name, metric in metrics.items():
+                        if id(metric) in aligned or not component_matches(component, context, family_name, name):
+                            continue
+                        aligned.add(id(metric))
+                        if source["iteration_time"] != reference:
+                            metric.resample(source["iteration_time"], reference)
+
     def get_monitoring_metric(self, metric: MonitoringContextKeys) -> dict[str, dict[str, MonitorMetric]]:
         """Return one monitoring metric."""
         return self.metrics[metric]
@@ -155,6 +213,18 @@ class Bench:
     def get_single_metric(self, metric_type: MonitoringContextKeys, component: Any, metric: Any) -> MonitorMetric:
         return self.get_component(metric_type, component)[str(metric)]
 
+    def get_endpoints(self) -> dict[str, dict[str, EndpointStats]]:
+        """Return the requests statistics of each monitoring device, by url"""
+        endpoints = self.metrics.get(MonitoringMetadataKeys.endpoints) or {}
+        return {
+            device: {url: EndpointStats(**stats) for url, stats in urls.items()} for device, urls in endpoints.items()
+        }
+
+    def get_energy(self) -> dict[str, PduEnergy]:
+        """Return the energy measured by each PDU"""
+        energy = self.metrics.get(MonitoringMetadataKeys.energy) or {}
+        return {pdu: PduEnergy(**measure) for pdu, measure in energy.items()}
+
     def get_samples_count(self):
         """Return the number of monitoring samples"""
         return self.metrics[MonitoringMetadataKeys.samples_count]
@@ -317,6 +387,7 @@ class Bench:
                         value = self.get(perf)["sum_speed"]
                     try:
                         effective_runtime = self.get("effective_runtime")
+                        # The warm-up is a separate stress-ng run, not part of the effective runtime
                         delta = abs(effective_runtime - self.duration())
                         # The effective runtime must be within ~1sec compared to the expected duration.
                         # add_perf() is called many times per bench, so only warn once.
@@ -523,6 +594,9 @@ class Trace:
         # Benchmarks already reported as not completing on time, so the warning
         # is printed only once per bench instead of on every add_perf() call.
         self.incomplete_runtime_reported: set = set()
+        # If set, monitoring metrics are rebuilt from raw samples at this resolution, in seconds
+        self.raw_resolution: float = 0
+        self.raw_samples: dict[tuple[pathlib.Path, int], dict[str, dict[str, Any]]] = {}
         self.__load_file()
 
     def get_name(self) -> str:
@@ -590,6 +664,23 @@ class Trace:
         """Return the filename associated to this Trace object."""
         return self.filename
 
+    def get_raw_resolution(self) -> float:
+        """Return the resolution used to aggregate raw samples, 0 if not used."""
+        return self.raw_resolution
+
+    def set_raw_resolution(self, resolution: float) -> None:
+        """Rebuild monitoring metrics from raw samples at this resolution, in seconds."""
+        self.raw_resolution = resolution
+        self.raw_samples = {}
+
+    def get_raw_samples(self, samples_path: pathlib.Path, start_ns: int = 0) -> dict[str, dict[str, Any]]:
+        """Return the raw samples of a file from start_ns, aggregated at the trace resolution."""
+        # Benches are loaded many times, let's read every file only once
+        if (samples_path, start_ns) not in self.raw_samples:
+            samples = [sample for sample in read_raw_samples(samples_path) if sample.monotonic_ns >= start_ns]
+            self.raw_samples[(samples_path, start_ns)] = aggregate_raw_samples(samples, self.raw_resolution)
+        return self.raw_samples[(samples_path, start_ns)]
+
     def get_trace(self) -> dict:
         """Return the trace dict"""
         return self.trace
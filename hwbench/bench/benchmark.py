@@ -1,8 +1,9 @@
-import dataclasses
 import time
 from typing import Any
 
+from hwbench.environment.rapl import EnergyMeasure, RaplEnergy
 from hwbench.utils import helpers as h
+from hwbench.utils.dataclasses import asdict
 from hwbench.utils.external import External
 
 from .engine import EngineModuleBase
@@ -41,6 +42,7 @@ class Benchmark:
             "engine_module_parameter_base": self.parameters.get_engine_module_parameter_base(),
             "custom_parameters": self.parameters.get_custom_parameters(),
             "timeout": self.parameters.get_runtime(),
+            "warmup": self.parameters.get_warmup(),
             "cpu_pin": self.parameters.get_pinned_cpu(),
             "workers": self.parameters.get_engine_instances_count(),
             "job_number": self.get_job_number(),
@@ -73,7 +75,8 @@ class ExternalBench(External):
     def __init__(self, engine_module: EngineModuleBase, parameters: BenchmarkParameters):
         super().__init__(parameters.out_dir)
         self.monitoring = False
-        if parameters.get_monitoring_config() == "all":
+        # Co-scheduled benchmarks share a monitoring started by Benchmarks
+        if parameters.get_monitoring_config() == "all" and not parameters.is_monitoring_shared():
             self.monitoring = True
         self.runtime = parameters.get_runtime()
         self.parameters = parameters
@@ -124,7 +127,20 @@ class ExternalBench(External):
             self.parameters.get_monitoring().preup(precision_s=2)
             # Start the monitoring in background
             # It runs the same amount of time as the benchmark
-            self.parameters.get_monitoring().monitor(2, 5, self.parameters.get_runtime())
+            # Every source is sampled every 2 seconds with statistics every 5 samples,
+            # unless the job overrides it with monitor_sampling.
+            # The statistics start after the warm-up
+            raw_samples_file = None
+            if self.parameters.get_monitoring_raw() == "all":
+                raw_samples_file = self.parameters.get_raw_samples_path()
+            self.parameters.get_monitoring().monitor(
+                2,
+                5,
+                self.parameters.get_runtime(),
+                self.parameters.get_monitoring_sampling(),
+                raw_samples_file,
+                self.parameters.get_warmup(),
+            )
         p = self.parameters
         cpu_location = ""
         if p.get_pinned_cpu():
@@ -138,19 +154,31 @@ class ExternalBench(External):
         monitoring = ""
         if self.parameters.get_monitoring():
             monitoring = "(M)"
+        warmup = ""
+        if p.get_warmup():
+            warmup = f" after a {p.get_warmup()}s warm-up"
         print(
             f"[{p.get_name_with_position()}] {self.engine_module.get_engine().get_name()}/"
             f"{self.engine_module.get_name()}/{p.get_engine_module_parameter()}{monitoring}: "
-            f"{p.get_engine_instances_count():3d} stressor{cpu_location} for {p.get_runtime()}s{status}"
+            f"{p.get_engine_instances_count():3d} stressor{cpu_location} for {p.get_runtime()}s{warmup}{status}"
         )
 
     def post_run(self, run):
         if self.monitoring and not self.fully_skipped_job():
-            run["monitoring"] = dataclasses.asdict(self.parameters.get_monitoring().get_monitor_metrics())
+            run["monitoring"] = asdict(self.parameters.get_monitoring().get_monitor_metrics())
             # Stop turbostat after monitoring completes
             self.parameters.get_monitoring().predown()
         return run
 
+    def add_energy(self, run, energy: EnergyMeasure):
+        """Add the energy consumed by the benchmark to its results"""
+        run["energy"] = asdict(energy)
+        joules = energy.get_joules()
+        # The warm-up is run apart from the scored run, the bogo ops and the energy cover the same window
+        if "bogo ops/s" in run and joules:
+            # bogo ops/s divided by the average CPU and DRAM watts
+            run["bogo ops/J"] = run["bogo ops/s"] * energy.duration_s / joules
+
     def empty_result(self):
         """A method to report empty results"""
         raise NotImplementedError
@@ -160,8 +188,18 @@ class ExternalBench(External):
         self.pre_run()
 
         if not self.skip:
-            # Run the benchmark
+            # Run the benchmark, measuring the CPU and DRAM energy it consumed after its warm-up.
+            # Co-scheduled benchmarks share the CPU packages, their energy is measured by group.
+            energy = RaplEnergy()
+            measured = energy.is_available() and self.parameters.get_co_schedule() == "none"
+            if measured:
+                energy.start_after(self.parameters.get_warmup())
             run = super().run()
+            if measured:
+                measure = energy.stop_delayed()
+                # The benchmark may have failed before the end of its warm-up
+                if measure:
+                    self.add_energy(run, measure)
         else:
             # We'll return empty results, benchmark is not even called
             run = self.parameters.get_result_format() | self.empty_result()
@@ -169,7 +207,7 @@ class ExternalBench(External):
             # But if we were asked to wait, let's sleep the same amount of time
             # as the original benchmark
             if not self.fully_skipped_job():
-                time.sleep(self.parameters.get_runtime())
+                time.sleep(self.parameters.get_total_runtime())
 
         # Clean the run
         return self.post_run(run)
@@ -1,16 +1,23 @@
 from __future__ import annotations
 
 import datetime
+import io
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from typing import Any, Callable
 
 from hwbench.bench.engine import EngineModuleBase
 from hwbench.environment.hardware import BaseHardware
+from hwbench.environment.rapl import RaplEnergy
 from hwbench.utils import helpers as h
+from hwbench.utils.dataclasses import asdict
 
 from .benchmark import Benchmark
 from .monitoring import Monitoring
 from .parameters import BenchmarkParameters
+from .repetitions import merge_runs
+from .start_conditions import StartState, get_readings_summary, wait_start_conditions
 
 
 class Benchmarks:
@@ -23,6 +30,7 @@ class Benchmarks:
         self.benchs: list[Benchmark] = []
         self.monitoring: Monitoring = None  # type: ignore[assignment]
         self.hardware: BaseHardware | None = None
+        self.bmc_connected = False
 
     def set_hardware(self, hardware: BaseHardware):
         self.hardware = hardware
@@ -152,6 +160,8 @@ class Benchmarks:
                 scs = selected_cpus_scaling
                 h.fatal(f"Unsupported selected_cpus_scaling : {scs}")
 
+        self.__check_co_schedule()
+
     def __schedule_benchmarks(self, job, stressor_range_scaling, pinned_cpu, validate_parameters: bool):
         """Iterate on engine module parameters to schedule benchmarks."""
         # Detecting stressor range scaling mode
@@ -171,13 +181,16 @@ class Benchmarks:
 
         # If job needs monitoring, let's create it
         if monitoring_config != "none" and not self.monitoring:
-            self.get_hardware().vendor.get_bmc().connect_redfish()
-            self.get_hardware().vendor.get_bmc().detect()
+            self.__connect_bmc()
             for pdu in self.get_hardware().vendor.get_pdus():
                 pdu.connect_redfish()
                 pdu.detect()
             self.monitoring = Monitoring(self.out_dir, self.jobs_config, self.get_hardware(), verbose=self.verbose)
 
+        # Waiting for the start conditions requires the BMC
+        if self.jobs_config.get_thermal_start(job) or self.jobs_config.get_fans_start(job):
+            self.__connect_bmc()
+
         # For each stressor, add a benchmark object to the list
         for stressor_count in self.jobs_config.get_stressor_range(job):
             if stressor_count == "auto":
@@ -202,6 +215,14 @@ class Benchmarks:
                         self.monitoring,
                         self.jobs_config.get_skip_method(job),
                         self.jobs_config.get_sync_start(job),
+                        self.jobs_config.get_monitor_sampling(job),
+                        self.jobs_config.get_monitor_raw(job),
+                        self.jobs_config.get_co_schedule(job),
+                        self.jobs_config.get_repeat(job),
+                        self.jobs_config.get_warmup(job),
+                        self.jobs_config.get_thermal_start(job),
+                        self.jobs_config.get_fans_start(job),
+                        self.jobs_config.get_start_timeout(job),
                     )
                     benchmark = Benchmark(self.count_benchmarks(), engine_module, parameters)
                     self.add_benchmark(benchmark, validate_parameters)
@@ -223,11 +244,68 @@ class Benchmarks:
                         self.monitoring,
                         self.jobs_config.get_skip_method(job),
                         self.jobs_config.get_sync_start(job),
+                        self.jobs_config.get_monitor_sampling(job),
+                        self.jobs_config.get_monitor_raw(job),
+                        self.jobs_config.get_co_schedule(job),
+                        self.jobs_config.get_repeat(job),
+                        self.jobs_config.get_warmup(job),
+                        self.jobs_config.get_thermal_start(job),
+                        self.jobs_config.get_fans_start(job),
+                        self.jobs_config.get_start_timeout(job),
                         **bench,
                     )
                     benchmark = Benchmark(self.count_benchmarks(), engine_module, parameters)
                     self.add_benchmark(benchmark, validate_parameters)
 
+    def __connect_bmc(self):
+        if self.bmc_connected:
+            return
+        self.get_hardware().vendor.get_bmc().connect_redfish()
+        self.get_hardware().vendor.get_bmc().detect()
+        self.bmc_connected = True
+
+    def __check_co_schedule(self):
+        """Ensure the co-scheduled benchmarks can run together"""
+        for benchmarks in self.get_schedule():
+            if len(benchmarks) == 1:
+                continue
+            used_cpus: dict[int, str] = {}
+            for benchmark in benchmarks:
+                p = benchmark.get_parameters()
+                pinned_cpu = p.get_pinned_cpu()
+                if pinned_cpu == "":
+                    h.fatal(f"co_schedule={p.get_co_schedule()}: {p.get_name()} must define selected_cpus")
+                for cpu in [pinned_cpu] if isinstance(pinned_cpu, int) else pinned_cpu:
+                    if cpu in used_cpus:
+                        h.fatal(
+                            f"co_schedule={p.get_co_schedule()}: {p.get_name()} and {used_cpus[cpu]} "
+                            f"are both using CPU {cpu}"
+                        )
+                    used_cpus[cpu] = p.get_name()
+                p.set_monitoring_shared(True)
+
+    def get_schedule(self) -> list[list[Benchmark]]:
+        """Return the benchmarks to run, in order, grouped by the ones running at the same time
+
+        The n-th benchmark of every job of a co_schedule group runs with the n-th
+        benchmark of the other jobs, at the position of the first of them."""
+        schedule: list[list[Benchmark]] = []
+        groups: dict[str, list[list[Benchmark]]] = {}
+        positions: dict[str, int] = {}
+        for benchmark in self.get_benchmarks():
+            p = benchmark.get_parameters()
+            if p.get_co_schedule() == "none":
+                schedule.append([benchmark])
+                continue
+            position = positions.get(p.get_name(), 0)
+            positions[p.get_name()] = position + 1
+            group = groups.setdefault(p.get_co_schedule(), [])
+            if position == len(group):
+                group.append([])
+                schedule.append(group[position])
+            group[position].append(benchmark)
+        return schedule
+
     def add_benchmark(self, benchmark: Benchmark, validate_parameters: bool):
         if validate_parameters:
             benchmark.validate_parameters()
@@ -243,67 +321,266 @@ class Benchmarks:
     def get_benchmarks(self) -> list[Benchmark]:
         return self.benchs
 
-    def runtime(self) -> int:
-        """Return the overall runtime to run all jobs."""
+    def get_remaining_schedule(self, completed: dict[str, Any] | None = None) -> list[list[Benchmark]]:
+        """Return the schedule without the benchmarks already completed
+
+        Co-scheduled benchmarks are run again together if one of them did not complete."""
+        return [
+            benchmarks
+            for benchmarks in self.get_schedule()
+            if not all(
+                benchmark.get_parameters().get_name_with_position() in (completed or {}) for benchmark in benchmarks
+            )
+        ]
+
+    def runtime(self, completed: dict[str, Any] | None = None) -> int:
+        """Return the overall runtime to run all jobs, but the completed ones.
+
+        Repeated benchmarks are counted for their minimal number of runs."""
         return sum(
-            [
-                benchmark.get_parameters().get_runtime()
-                for benchmark in self.get_benchmarks()
-                # Only count benchmarks that are not fully skipped
-                if not benchmark.get_enginemodule().fully_skipped_job(benchmark.get_parameters())
-            ]
+            max(
+                [
+                    benchmark.get_parameters().get_total_runtime()
+                    for benchmark in benchmarks
+                    # Only count benchmarks that are not fully skipped
+                    if not benchmark.get_enginemodule().fully_skipped_job(benchmark.get_parameters())
+                ],
+                default=0,
+            )
+            # Co-scheduled benchmarks last as long as the longest of them
+            * max(benchmark.get_parameters().get_repeat().min for benchmark in benchmarks)
+            for benchmarks in self.get_remaining_schedule(completed)
         )
 
-    def run(self):
-        results = {}
-        t = str(timedelta(seconds=self.runtime())).split(":")
+    def run(
+        self,
+        completed: dict[str, Any] | None = None,
+        on_result: Callable[[str, dict[str, Any]], None] | None = None,
+    ) -> dict[str, Any]:
+        """Run the benchmarks, but the completed ones, and return all the results
+
+        on_result is called with the name and the result of every benchmark, as soon as it completes."""
+        completed = completed or {}
+        remaining = self.get_remaining_schedule(completed)
+        t = str(timedelta(seconds=self.runtime(completed))).split(":")
         duration = f"{t[0]}h {t[1]}m {t[2]}s"
-        eta = datetime.datetime.now() + timedelta(seconds=self.runtime())
+        eta = datetime.datetime.now() + timedelta(seconds=self.runtime(completed))
+        resumed = ""
+        if completed:
+            resumed = (
+                f"{self.count_benchmarks() - sum(len(benchmarks) for benchmarks in remaining)} already completed, "
+            )
         print(
             f"hwbench: {self.count_jobs()} jobs, \
-{self.count_benchmarks()} benchmarks, \
+{self.count_benchmarks()} benchmarks, {resumed}\
 ETA {duration}, estimated end at {eta:%Y-%m-%d %H:%M:%S}"
         )
-        # Run every benchmark of the list
-        for benchmark in self.get_benchmarks():
-            bench_name = benchmark.get_parameters().get_name()
-            # This benchmark requires to be synced on a time based
-            if benchmark.get_parameters().get_sync_start() == "time":
-                time_to_sync_secs = h.time_to_next_sync()
-                print(f"hwbench: [{bench_name}]: sync_start=time requested, waiting {time_to_sync_secs} seconds")
-                time.sleep(time_to_sync_secs)
-                print(f"hwbench: [{bench_name}]: started at {datetime.datetime.utcnow()}")
-
-            # Save each benchmark result
-            results[benchmark.get_parameters().get_name_with_position()] = benchmark.run()
+        # Run every benchmark of the list, the co-scheduled ones together.
+        # The repeated benchmarks run again in rounds, interleaved with the others (ABAB)
+        runs: dict[str, list[dict[str, Any]]] = {}
+        pending = remaining
+        round_number = 1
+        while pending:
+            if round_number > 1:
+                print(f"hwbench: round {round_number}: {len(pending)} benchmarks need more runs")
+            next_round = []
+            for benchmarks in pending:
+                bench_name = ", ".join(benchmark.get_parameters().get_name() for benchmark in benchmarks)
+                for benchmark in benchmarks:
+                    p = benchmark.get_parameters()
+                    p.set_repetition(len(runs.get(p.get_name_with_position(), [])) + 1)
+                start_state = self.wait_start_conditions(benchmarks)
+                # This benchmark requires to be synced on a time based
+                if any(benchmark.get_parameters().get_sync_start() == "time" for benchmark in benchmarks):
+                    time_to_sync_secs = h.time_to_next_sync()
+                    print(f"hwbench: [{bench_name}]: sync_start=time requested, waiting {time_to_sync_secs} seconds")
+                    time.sleep(time_to_sync_secs)
+                    print(f"hwbench: [{bench_name}]: started at {datetime.datetime.utcnow()}")
+
+                if len(benchmarks) == 1:
+                    results = {benchmarks[0].get_parameters().get_name_with_position(): benchmarks[0].run()}
+                else:
+                    results = self.run_co_scheduled(benchmarks)
+                for name, result in results.items():
+                    if start_state:
+                        result["start_conditions"] = asdict(start_state)
+                    runs.setdefault(name, []).append(result)
+
+                # Co-scheduled benchmarks run again together while one of them needs it
+                if any(
+                    benchmark.get_parameters()
+                    .get_repeat()
+                    .needs_more(runs[benchmark.get_parameters().get_name_with_position()])
+                    for benchmark in benchmarks
+                ):
+                    next_round.append(benchmarks)
+                    continue
+
+                # Save each benchmark result
+                for benchmark in benchmarks:
+                    name = benchmark.get_parameters().get_name_with_position()
+                    completed[name] = merge_runs(benchmark.get_parameters().get_repeat(), runs[name])
+                    if on_result:
+                        on_result(name, completed[name])
+            pending = next_round
+            round_number += 1
+
+        # The results are reported in the order of the benchmarks
+        return {
+            benchmark.get_parameters().get_name_with_position(): completed[
+                benchmark.get_parameters().get_name_with_position()
+            ]
+            for benchmark in self.get_benchmarks()
+        }
+
+    def wait_start_conditions(self, benchmarks: list[Benchmark]) -> StartState | None:
+        """Wait for the thermal_start and fans_start conditions of benchmarks starting together"""
+        parameters = [
+            benchmark.get_parameters()
+            for benchmark in benchmarks
+            if benchmark.get_parameters().has_start_conditions()
+            and not benchmark.get_enginemodule().fully_skipped_job(benchmark.get_parameters())
+        ]
+        if not parameters:
+            return None
+        bench_name = ", ".join(p.get_name_with_position() for p in parameters)
+        timeout_s = max(p.get_start_timeout() for p in parameters)
+        print(f"hwbench: [{bench_name}]: waiting up to {timeout_s}s for the start conditions")
+        state = wait_start_conditions(
+            self.get_hardware().vendor.get_bmc(),
+            [condition for p in parameters for condition in p.get_thermal_start()],
+            [condition for p in parameters for condition in p.get_fans_start()],
+            timeout_s,
+        )
+        if state.reached:
+            print(
+                f"hwbench: [{bench_name}]: start conditions reached after {state.wait_s:.0f}s: "
+                f"{get_readings_summary(state)}"
+            )
+        else:
+            print(
+                f"hwbench: [{bench_name}]: start conditions not reached after {timeout_s}s, starting anyway: "
+                f"{get_readings_summary(state)}"
+            )
+        return state
+
+    def run_co_scheduled(self, benchmarks: list[Benchmark]) -> dict[str, Any]:
+        """Run benchmarks at the same time, under a single monitoring, return their results"""
+        group = benchmarks[0].get_parameters().get_co_schedule()
+        names = [benchmark.get_parameters().get_name_with_position() for benchmark in benchmarks]
+        print(f"hwbench: co_schedule={group}: running {', '.join(names)} together")
+
+        # The monitoring lasts as long as the longest monitored benchmark, with its sampling
+        monitored = [
+            benchmark
+            for benchmark in benchmarks
+            if benchmark.need_monitoring()
+            and not benchmark.get_enginemodule().fully_skipped_job(benchmark.get_parameters())
+        ]
+        if monitored:
+            p = max(monitored, key=lambda benchmark: benchmark.get_parameters().get_total_runtime()).get_parameters()
+            raw_samples_file = None
+            if p.get_monitoring_raw() == "all":
+                raw_samples_file = p.get_raw_samples_path()
+            p.get_monitoring().preup(precision_s=2)
+            p.get_monitoring().monitor(
+                2, 5, p.get_runtime(), p.get_monitoring_sampling(), raw_samples_file, p.get_warmup()
+            )
+
+        # The CPU and DRAM energy is measured for the whole group, once every benchmark warmed up
+        energy = RaplEnergy()
+        measured = energy.is_available() and not all(
+            benchmark.get_enginemodule().fully_skipped_job(benchmark.get_parameters()) for benchmark in benchmarks
+        )
+        if measured:
+            energy.start_after(max(benchmark.get_parameters().get_warmup() for benchmark in benchmarks))
+
+        # When every benchmark ran, in seconds since the start of the group
+        start_ns = time.monotonic_ns()
+        timeline: dict[str, dict[str, float]] = {}
+
+        def run(benchmark: Benchmark) -> dict[str, Any]:
+            started_ns = time.monotonic_ns()
+            result = benchmark.run()
+            timeline[benchmark.get_parameters().get_name_with_position()] = {
+                "start": (started_ns - start_ns) * 1e-9,
+                "end": (time.monotonic_ns() - start_ns) * 1e-9,
+            }
+            return result
+
+        with ThreadPoolExecutor(max_workers=len(benchmarks), thread_name_prefix="co_schedule") as pool:
+            futures = {name: pool.submit(run, benchmark) for name, benchmark in zip(names, benchmarks)}
+            results = {name: future.result() for name, future in futures.items()}
+
+        measure = energy.stop_delayed() if measured else None
+
+        monitoring = None
+        if monitored:
+            monitoring = asdict(p.get_monitoring().get_monitor_metrics())
+            p.get_monitoring().predown()
+        for benchmark in monitored:
+            results[benchmark.get_parameters().get_name_with_position()]["monitoring"] = monitoring
+        for result in results.values():
+            result["co_schedule"] = {"group": group, "timeline": {name: timeline[name] for name in names}}
+            if measure:
+                # The energy of the group cannot be split by job, so there is no bogo ops/J
+                result["co_schedule"]["energy"] = asdict(measure)
         return results
 
-    def dump(self):
-        with open(self.out_dir / "expanded_job_file.conf", "w") as f:
-            for bench in self.benchs:
-                engine = bench.get_enginemodule().get_engine()
-                em = bench.get_enginemodule()
-                param = bench.get_parameters()
-                print(f"[{param.get_name_with_position()}]", file=f)
-                print(f"runtime={param.get_runtime()}", file=f)
-                print(f"monitoring={param.get_monitoring_config()}", file=f)
-                print(f"engine={engine.get_name()}", file=f)
-                print(f"engine_module={em.get_name()}", file=f)
-                print(f"engine_binary={engine.get_binary()}", file=f)
-                print(f"engine_binary_parameters={engine.run_cmd()}", file=f)
-                print(
-                    f"engine_module_parameter={param.get_engine_module_parameter()}",
-                    file=f,
-                )
-                print(
-                    f"engine_module_parameter_base={param.get_engine_module_parameter_base()}",
-                    file=f,
+    def get_expanded_jobs(self) -> str:
+        """Return the expanded job file, describing every benchmark to run"""
+        f = io.StringIO()
+        for bench in self.benchs:
+            engine = bench.get_enginemodule().get_engine()
+            em = bench.get_enginemodule()
+            param = bench.get_parameters()
+            print(f"[{param.get_name_with_position()}]", file=f)
+            print(f"runtime={param.get_runtime()}", file=f)
+            if param.get_warmup():
+                print(f"warmup={param.get_warmup()}", file=f)
+            print(f"monitoring={param.get_monitoring_config()}", file=f)
+            if param.get_monitoring_sampling():
+                sampling = ",".join(
+                    f"{source}:{rate.precision}:{rate.frequency}"
+                    for source, rate in param.get_monitoring_sampling().items()
                 )
-                if param.get_pinned_cpu():
-                    print(f"pinned_cpu={param.get_pinned_cpu()}", file=f)
-                print(f"stressor_instances={param.get_engine_instances_count()}", file=f)
-                print(f"cmdline={' '.join(em.run_cmd(param))}", file=f)
-                print("", file=f)
+                print(f"monitor_sampling={sampling}", file=f)
+            if param.get_monitoring_raw() != "none":
+                print(f"monitor_raw={param.get_monitoring_raw()}", file=f)
+            if param.get_thermal_start():
+                print(f"thermal_start={','.join(str(condition) for condition in param.get_thermal_start())}", file=f)
+            if param.get_fans_start():
+                print(f"fans_start={','.join(str(condition) for condition in param.get_fans_start())}", file=f)
+            if param.has_start_conditions():
+                print(f"start_timeout={param.get_start_timeout()}", file=f)
+            if param.get_co_schedule() != "none":
+                print(f"co_schedule={param.get_co_schedule()}", file=f)
+            repeat = param.get_repeat()
+            if repeat.is_adaptive():
+                print(f"repeat={repeat.min}:{repeat.max}:{repeat.ci_percent}", file=f)
+            elif repeat.is_repeated():
+                print(f"repeat={repeat.min}", file=f)
+            print(f"engine={engine.get_name()}", file=f)
+            print(f"engine_module={em.get_name()}", file=f)
+            print(f"engine_binary={engine.get_binary()}", file=f)
+            print(f"engine_binary_parameters={engine.run_cmd()}", file=f)
+            print(
+                f"engine_module_parameter={param.get_engine_module_parameter()}",
+                file=f,
+            )
+            print(
+                f"engine_module_parameter_base={param.get_engine_module_parameter_base()}",
+                file=f,
+            )
+            if param.get_pinned_cpu():
+                print(f"pinned_cpu={param.get_pinned_cpu()}", file=f)
+            print(f"stressor_instances={param.get_engine_instances_count()}", file=f)
+            print(f"cmdline={' '.join(em.run_cmd(param))}", file=f)
+            print("", file=f)
+        return f.getvalue()
+
+    def dump(self):
+        (self.out_dir / "expanded_job_file.conf").write_text(self.get_expanded_jobs())
 
     def get_monitoring(self) -> Monitoring | None:
         """Return the monitoring object"""
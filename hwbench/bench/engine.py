@@ -44,6 +44,9 @@ class EngineModuleBase(abc.ABC):
     def fully_skipped_job(self, p) -> bool:
         raise NotImplementedError
 
+    def run_cmd(self, p: BenchmarkParameters) -> list[str]:
+        raise NotImplementedError
+
     def init(self):
         pass
 
@@ -1,19 +1,35 @@
 from __future__ import annotations
 
-import dataclasses
+import functools
+import math
+import pathlib
 import time
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from threading import Thread
-from typing import Any
+from typing import Any, Callable
 
+from hwbench.environment.cpu_sampler import CPUSampler
 from hwbench.environment.hardware import BaseHardware
+from hwbench.environment.ipmi import IpmiSampler
 from hwbench.environment.turbostat import CPUSTATS, Turbostat
+from hwbench.environment.vendors.monitoring_device import MonitoringDevice
+from hwbench.environment.vendors.pdu import PDU
 from hwbench.utils import helpers as h
+from hwbench.utils.dataclasses import iterate_dataclass
 
 from .monitoring_structs import (
     MonitoringContextKeys,
+    MonitoringContexts,
     MonitoringData,
+    MonitoringSourceMetadata,
+    MonitoringSources,
     MonitorMetric,
+    SamplingRate,
+    component_matches,
 )
+from .raw_samples import RawSample, RawSamplesWriter
 
 
 class ThreadWithReturnValue(Thread):
@@ -32,6 +48,69 @@ class ThreadWithReturnValue(Thread):
         return self._return
 
 
+class CircuitBreaker:
+    """Stop reading a source that keeps missing its deadline, and retry it later.
+
+    After <threshold> consecutive failures, reads are skipped for a backoff time,
+    doubled at every new failure up to <max_backoff_s>. A single successful read resets it."""
+
+    def __init__(self, backoff_s: float, threshold: int = 3, max_backoff_s: float = 60):
+        self.threshold = threshold
+        self.initial_backoff_s = backoff_s
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.failures = 0
+        self.open_until_ns = 0
+
+    def allow(self, now_ns: int) -> bool:
+        """Return True if the source can be read"""
+        return now_ns >= self.open_until_ns
+
+    def success(self) -> None:
+        self.failures = 0
+        self.backoff_s = self.initial_backoff_s
+
+    def failure(self, now_ns: int) -> bool:
+        """Record a failure, return True if the breaker opens"""
+        self.failures += 1
+        if self.failures < self.threshold:
+            return False
+        self.open_until_ns = now_ns + int(self.backoff_s * 1e9)
+        self.backoff_s = min(self.backoff_s * 2, self.max_backoff_s)
+        return True
+
+
+class MonitoringSource:
+    """A source of metrics, polled and compacted at its own sampling rate."""
+
+    def __init__(
+        self,
+        name: str,
+        sampling: SamplingRate,
+        poll: Callable[[MonitoringContexts], Any],
+        polling: MonitorMetric,
+        components: list[str],
+    ):
+        self.name = name
+        # poll() reads the source in the contexts it receives
+        self.poll = poll
+        self.polling = polling
+        self.components = components
+        # Metrics already fed by another source, even if they are part of our components
+        self.excluded: list[str] = []
+        self.breaker = CircuitBreaker(sampling.precision)
+        # Number of values of each metric already written in the raw samples file
+        self.logged: dict[str, int] = {}
+        self.metadata = MonitoringSourceMetadata(
+            sampling.precision, sampling.frequency, sampling.get_iteration_time(), components=components
+        )
+
+    def get_warmup_loops(self, warmup_s: float) -> int:
+        """Return the number of iterations polled during a warm-up of warmup_s seconds"""
+        # The epsilon avoids float rounding to add an iteration
+        return math.ceil(warmup_s / self.metadata.precision - 1e-9)
+
+
 class Monitoring:
     """A class to perform monitoring."""
 
@@ -43,7 +122,13 @@ class Monitoring:
         self.vendor = hardware.get_vendor()
         self.metrics = MonitoringData()
         self.executor: ThreadWithReturnValue
-        self.turbostat: Turbostat | None = None
+        # The CPU metrics source: turbostat or the native sampler
+        self.turbostat: Turbostat | CPUSampler | None = None
+        # The in-band BMC sensors, read through ipmitool
+        self.ipmi: IpmiSampler | None = None
+        self.default_sampling = SamplingRate(2, 5)
+        self.sampling: dict[str, SamplingRate] = {}
+        self.raw_samples: RawSamplesWriter | None = None
         self.prepare()
 
     def __get_metrics(self) -> MonitoringData:
@@ -59,7 +144,7 @@ class Monitoring:
         def check_monitoring(source: str, metric_name: MonitoringContextKeys, data: Any):
             if not isinstance(data, dict):
                 # Probably a dataclass
-                data = dataclasses.asdict(data)
+                data = dict(iterate_dataclass(data))
 
             if not len(data):
                 h.fatal(f"Cannot detect {str(metric_name)} metrics")
@@ -70,13 +155,36 @@ class Monitoring:
             )
 
         # - checking if the CPU monitoring works
-        if self.hardware.cpu.get_arch() == "x86_64":
+        if self.config.get_monitor_cpu() == "native":
+            print("Monitoring/cpu: initialize the native sampler")
+            sampler = CPUSampler(self.metrics.contexts)
+            if sampler.is_available():
+                self.turbostat = sampler
+                check_monitoring("cpu", MonitoringContextKeys.Freq, self.metrics.contexts.Freq)
+            else:
+                print("Monitoring/cpu: cannot read the CPU counters, using turbostat")
+        if not self.turbostat and self.hardware.cpu.get_arch() == "x86_64":
             print("Monitoring/turbostat: initialize")
             self.turbostat = Turbostat(self.hardware, self.metrics.contexts)
             check_monitoring("turbostat", MonitoringContextKeys.Freq, self.metrics.contexts.Freq)
             if self.turbostat.has(CPUSTATS.IPC):
                 check_monitoring("turbostat", MonitoringContextKeys.IPC, self.metrics.contexts.IPC)
 
+        # - checking if the in-band IPMI monitoring works
+        if self.config.get_monitor_ipmi():
+            print("Monitoring/IPMI: initialize the ipmitool shell")
+            ipmi = IpmiSampler(self.config.get_monitor_ipmi())
+            ipmi.detect()
+            if ipmi.is_available():
+                self.ipmi = ipmi
+                ipmi.read_power_consumption(self.metrics.contexts.PowerConsumption)
+                ipmi.read_thermals(self.metrics.contexts.Thermal)
+                for component in ipmi.get_components():
+                    context = MonitoringContextKeys(component.split(".")[0])
+                    check_monitoring("IPMI", context, getattr(self.metrics.contexts, context))
+            else:
+                print("Monitoring/IPMI: cannot read the sensors through ipmitool, ignoring")
+
         print(f"Monitoring/BMC: initialize {v.name()} vendor with {bmc.get_driver_name()} {bmc.get_detect_string()}")
 
         for pdu in pdus:
@@ -130,28 +238,203 @@ class Monitoring:
                 print("Monitoring/turbostat: stopping background monitoring")
             self.turbostat.stop_background()
 
-    def __monitor_bmc(self):
-        """Monitor the bmc metrics"""
-        self.vendor.get_bmc().read_thermals(self.metrics.contexts.Thermal)
-        self.vendor.get_bmc().read_fans(self.metrics.contexts.Fans)
-        self.vendor.get_bmc().read_power_consumption(self.metrics.contexts.PowerConsumption)
-        self.vendor.get_bmc().read_power_supplies(self.metrics.contexts.PowerSupplies)
+    def __monitor_bmc_thermal(self, contexts: MonitoringContexts) -> int | None:
+        """Monitor the bmc thermal metrics, return when the BMC pushed them if it does"""
+        bmc = self.vendor.get_bmc()
+        # All the endpoints of the iteration are requested once, together
+        snapshot = bmc.snapshot(bmc.get_thermal_urls())
+        bmc.read_thermals(contexts.Thermal, snapshot)
+        bmc.read_fans(contexts.Fans, snapshot)
+        return bmc.get_push_time_ns()
+
+    def __monitor_bmc_power(self, contexts: MonitoringContexts) -> int | None:
+        """Monitor the bmc power metrics, return when the BMC pushed them if it does"""
+        bmc = self.vendor.get_bmc()
+        snapshot = bmc.snapshot(bmc.get_power_urls())
+        bmc.read_power_consumption(contexts.PowerConsumption, snapshot)
+        bmc.read_power_supplies(contexts.PowerSupplies, snapshot)
+        return bmc.get_push_time_ns()
+
+    def __monitor_pdu(self, pdu: PDU, contexts: MonitoringContexts):
+        """Monitor the power metrics of a PDU"""
+        pdu.read_power_consumption(contexts.PowerConsumption)
+
+    def __monitor_ipmi(self, contexts: MonitoringContexts):
+        """Monitor the BMC sensors read in-band"""
+        assert self.ipmi
+        self.ipmi.read_power_consumption(contexts.PowerConsumption)
+        self.ipmi.read_thermals(contexts.Thermal)
+
+    def __monitor_turbostat(self, contexts: MonitoringContexts) -> int:
+        """Monitor the CPU metrics, return when turbostat outputted them"""
+        assert self.turbostat
+        self.turbostat.trigger_sample()
+        return self.turbostat.get_and_parse_sample(self.__sampling(MonitoringSources.TURBOSTAT).precision, contexts)
+
+    def __sampling(self, source: str, pdu_name: str = "") -> SamplingRate:
+        """Return the sampling rate of a source"""
+        if pdu_name and f"{source}.{pdu_name}" in self.sampling:
+            return self.sampling[f"{source}.{pdu_name}"]
+        return self.sampling.get(source, self.default_sampling)
+
+    def __get_sources(self) -> list[MonitoringSource]:
+        """Return the list of sources to monitor"""
+        contexts = self.metrics.contexts
+        sources = []
+        if self.turbostat:
+            contexts.Monitor.CPU = {"Polling": MonitorMetric("Polling", "ms")}
+            sources.append(
+                MonitoringSource(
+                    MonitoringSources.TURBOSTAT,
+                    self.__sampling(MonitoringSources.TURBOSTAT),
+                    self.__monitor_turbostat,
+                    contexts.Monitor.CPU["Polling"],
+                    [*self.turbostat.get_components(), "Monitor.CPU"],
+                )
+            )
 
-    def __monitor_pdus(self):
-        """Monitor the PDU metrics"""
-        for pdu in self.vendor.get_pdus():
-            pdu.read_power_consumption(self.metrics.contexts.PowerConsumption)
+        # Listed before the BMC, so its Thermal metrics are not claimed by the bmc_thermal source
+        if self.ipmi:
+            contexts.Monitor.IPMI = {"Polling": MonitorMetric("Polling", "ms")}
+            sources.append(
+                MonitoringSource(
+                    MonitoringSources.IPMI,
+                    self.__sampling(MonitoringSources.IPMI),
+                    self.__monitor_ipmi,
+                    contexts.Monitor.IPMI["Polling"],
+                    [*self.ipmi.get_components(), "Monitor.IPMI"],
+                )
+            )
 
-    def __compact(self):
-        """Compute statistics"""
-        # Compact all metrics in contexts
-        self.metrics.contexts.compact_all()
+        contexts.Monitor.BMC = {"Thermal": MonitorMetric("Thermal", "ms"), "Power": MonitorMetric("Power", "ms")}
+        sources.append(
+            MonitoringSource(
+                MonitoringSources.BMC_THERMAL,
+                self.__sampling(MonitoringSources.BMC_THERMAL),
+                self.__monitor_bmc_thermal,
+                contexts.Monitor.BMC["Thermal"],
+                ["Thermal", "Fans", "Monitor.BMC.Thermal"],
+            )
+        )
+        sources.append(
+            MonitoringSource(
+                MonitoringSources.BMC_POWER,
+                self.__sampling(MonitoringSources.BMC_POWER),
+                self.__monitor_bmc_power,
+                contexts.Monitor.BMC["Power"],
+                ["PowerConsumption.BMC", "PowerSupplies", "Monitor.BMC.Power"],
+            )
+        )
+
+        contexts.Monitor.PDU = {}
+        for pdu in self.vendor.get_pdus():
+            contexts.Monitor.PDU[pdu.get_name()] = MonitorMetric(pdu.get_name(), "ms")
+            sources.append(
+                MonitoringSource(
+                    f"{MonitoringSources.PDU}.{pdu.get_name()}",
+                    self.__sampling(MonitoringSources.PDU, pdu.get_name()),
+                    functools.partial(self.__monitor_pdu, pdu),
+                    contexts.Monitor.PDU[pdu.get_name()],
+                    [f"PowerConsumption.PDU.{pdu.get_name()}", f"Monitor.PDU.{pdu.get_name()}"],
+                )
+            )
 
-    def monitor(self, precision_s: int, frequency: int, duration_s: int):
-        """Method to trigger asynchronous monitoring"""
+        # A metric belongs to the first source listing it, like the CPU temperatures in the Thermal context
+        claimed: list[str] = []
+        for source in sources:
+            source.excluded = list(claimed)
+            claimed += source.components
+        return sources
+
+    def __source_metrics(
+        self, source: MonitoringSource, contexts: MonitoringContexts | None = None
+    ) -> Iterator[tuple[str, str, str, MonitorMetric]]:
+        """Return the context, family, name and metric of every metric fed by a source"""
+        for component in source.components:
+            context, _, family_metric = component.partition(".")
+            family, _, _ = family_metric.partition(".")
+            for family_name, metrics in iterate_dataclass(getattr(contexts or self.metrics.contexts, context)):
+                if family and family_name != family:
+                    continue
+                for name, metric in metrics.items():
+                    if not component_matches(component, context, family_name, name):
+                        continue
+                    if any(component_matches(excluded, context, family_name, name) for excluded in source.excluded):
+                        continue
+                    yield context, family_name, name, metric
+
+    def __compact(self, source: MonitoringSource):
+        """Compute statistics of the metrics fed by a source"""
+        for _, _, _, metric in self.__source_metrics(source):
+            metric.compact()
+        # Compacted values are removed from the metrics
+        source.logged.clear()
+
+    def __discard(self, source: MonitoringSource):
+        """Drop the values of the metrics fed by a source"""
+        for _, _, _, metric in self.__source_metrics(source):
+            metric.discard()
+        source.logged.clear()
+
+    def __merge(self, source: MonitoringSource, contexts: MonitoringContexts):
+        """Add the values a source read in its own contexts to the monitoring metrics"""
+        for context, family, name, metric in self.__source_metrics(source, contexts):
+            metrics = self.metrics.contexts.get_family(context, family)
+            if name not in metrics:
+                metrics[name] = metric
+            else:
+                for value in metric.get_values():
+                    metrics[name].add(value)
+
+    def __mark_missing(self, source: MonitoringSource):
+        """Record that all the metrics of a source are missing a sample"""
+        for _, _, _, metric in self.__source_metrics(source):
+            metric.add_missing()
+
+    def __log_raw_samples(self, source: MonitoringSource, polling_completed_ns: int):
+        """Write the values added by the latest polling of a source in the raw samples file"""
+        if not self.raw_samples:
+            return
+        wallclock = time.time() - (time.monotonic_ns() - polling_completed_ns) * 1e-9
+        samples = []
+        for context, family, name, metric in self.__source_metrics(source):
+            full_name = f"{context}.{family}.{name}"
+            values = metric.get_values()
+            for value in values[source.logged.get(full_name, 0) :]:
+                samples.append(RawSample(polling_completed_ns, wallclock, source.name, full_name, value))
+            source.logged[full_name] = len(values)
+        self.raw_samples.write(samples)
+
+    def monitor(
+        self,
+        precision_s: float,
+        frequency: int,
+        duration_s: int,
+        sampling: dict[str, SamplingRate] | None = None,
+        raw_samples_file: pathlib.Path | None = None,
+        warmup_s: int = 0,
+    ):
+        """Method to trigger asynchronous monitoring
+
+        precision_s and frequency are the default sampling rate,
+        sampling can override it per source (see MonitoringSources).
+        If raw_samples_file is set, every polled value is also appended to it.
+        The sources are polled during the warmup_s seconds before duration_s,
+        but these values are not part of the statistics."""
+        self.default_sampling = SamplingRate(precision_s, frequency)
+        self.sampling = sampling or {}
+        pdu_names = [pdu.get_name() for pdu in self.vendor.get_pdus()]
+        for source in self.sampling:
+            name, _, pdu_name = source.partition(".")
+            if name not in list(MonitoringSources) or (pdu_name and pdu_name not in pdu_names):
+                h.fatal(f"Monitoring: unknown '{source}' source in sampling rates")
+        if raw_samples_file:
+            self.raw_samples = RawSamplesWriter(raw_samples_file)
+            # The raw samples file is stored next to results.json
+            self.metrics.metadata.samples_file = raw_samples_file.name
         self.executor = ThreadWithReturnValue(
             target=self.__monitor,
-            args=(precision_s, frequency, duration_s),
+            args=(duration_s, warmup_s),
         )
         self.executor.start()
 
@@ -161,11 +444,89 @@ class Monitoring:
             raise RuntimeError("Monitoring has not been started")
         return self.executor.join()  # type: ignore
 
-    def __monitor(self, precision_s: int, frequency: int, duration_s: int) -> MonitoringData:
+    def __monitor(self, duration_s: int, warmup_s: int = 0) -> MonitoringData:
         """Private method to perform the monitoring."""
+        # The PDU energy counters are read at the start and the end of the monitoring, the warm-up excluded
+        if not warmup_s:
+            for pdu in self.vendor.get_pdus():
+                pdu.start_energy()
         start_monitoring_ns = time.monotonic_ns()
+        sources = self.__get_sources()
+        # The requests statistics only cover this monitoring
+        for device in self.__get_devices().values():
+            device.take_endpoint_stats()
+
+        # Every source (turbostat, the BMC thermal & power and each PDU) runs its
+        # own monitor_loop, at its own sampling rate, from its own worker.
+        # An iteration then lasts as long as its source, a slow BMC cannot delay the others.
+        with ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="monitoring") as polling_pool:
+            futures = [
+                polling_pool.submit(self.__monitor_source, source, start_monitoring_ns, duration_s, warmup_s)
+                for source in sources
+            ]
+            if warmup_s:
+                # The energy is measured once the warm-up is over
+                time.sleep(max(0, start_monitoring_ns + warmup_s * 1e9 - time.monotonic_ns()) / 1e9)
+                for pdu in self.vendor.get_pdus():
+                    pdu.start_energy()
+            for future in futures:
+                future.result()
+
+        if self.raw_samples:
+            self.raw_samples.close()
+            self.raw_samples = None
+
+        # How much time did we spent in this monitoring loop ?
+        completed_time_ns = time.monotonic_ns()
+        self.metrics.metadata.monitoring_time = (completed_time_ns - start_monitoring_ns) * 1e-9  # seconds
+
+        # We were supposed to last "duration_s" after the warm-up, how close are we from this metric ?
+        self.metrics.metadata.overdue_time_ms = (
+            (completed_time_ns - start_monitoring_ns) - ((warmup_s + duration_s) * 1e9)
+        ) * 1e-6
+        if warmup_s:
+            self.metrics.metadata.warmup_time = warmup_s
+            self.metrics.metadata.warmup_end_ns = int(start_monitoring_ns + warmup_s * 1e9)
+
+        # The global metadata reports the coarsest source, the time reference of all the others
+        for source in sources:
+            self.metrics.metadata.sources[source.name] = source.metadata
+        reference = max(sources, key=lambda source: source.metadata.iteration_time)
+        self.metrics.metadata.precision = reference.metadata.precision
+        self.metrics.metadata.frequency = reference.metadata.frequency
+        self.metrics.metadata.iteration_time = reference.metadata.iteration_time
+        self.metrics.metadata.samples_count = min(
+            int(source.metadata.samples_count * source.metadata.iteration_time / reference.metadata.iteration_time)
+            for source in sources
+        )
 
-        # This function will be a thread of self.monitor()
+        for name, device in self.__get_devices().items():
+            endpoints = device.take_endpoint_stats()
+            if endpoints:
+                self.metrics.metadata.endpoints[name] = endpoints
+
+        for pdu in self.vendor.get_pdus():
+            energy = pdu.stop_energy()
+            if energy:
+                self.metrics.metadata.energy[pdu.get_name()] = energy
+
+        # And return the final metrics
+        return self.__get_metrics()
+
+    def __get_devices(self) -> dict[str, MonitoringDevice]:
+        """Return the monitoring devices, named like their sources"""
+        devices: dict[str, MonitoringDevice] = {"bmc": self.vendor.get_bmc()}
+        for pdu in self.vendor.get_pdus():
+            devices[f"{MonitoringSources.PDU}.{pdu.get_name()}"] = pdu
+        return devices
+
+    def __monitor_source(self, source: MonitoringSource, start_monitoring_ns: int, duration_s: int, warmup_s: int):
+        """Perform the monitoring of a single source."""
+        precision_s = source.metadata.precision
+        frequency = source.metadata.frequency
+        warmup_loops = source.get_warmup_loops(warmup_s)
+
+        # This function will be run by a worker of self.__monitor()
         #
         #  >|                         duration                        |<
         #  >|    precision               |<                           |
@@ -173,22 +534,22 @@ class Monitoring:
         #   |           >| sleep_time_ns |<
         # sleep_time_ns is the time to wait before starting a new monitor_loop
         # If frequency == 2, every two <precision_s> run, maths are computed
+        # The first <warmup_loops> runs are polled before the end of the warm-up, their values are dropped
 
-        # Set metadata
-        self.metrics.metadata.precision = precision_s
-        self.metrics.metadata.frequency = frequency
-        self.metrics.metadata.iteration_time = frequency * precision_s
-
-        # Initialize monitor metrics
-        self.metrics.contexts.Monitor.BMC = {"Polling": MonitorMetric("Polling", "ms")}
-        self.metrics.contexts.Monitor.PDU = {"Polling": MonitorMetric("Polling", "ms")}
-        self.metrics.contexts.Monitor.CPU = {"Polling": MonitorMetric("Polling", "ms")}
-
-        # When will we hit "duration_s" ?
-        end_of_run_ns = start_monitoring_ns + (duration_s * 1e9)
+        # When will we hit "duration_s" ? Whatever the precision, the steady window is the same for all the sources
+        end_of_run_ns = start_monitoring_ns + ((warmup_s + duration_s) * 1e9)
         loops_done = 0
         compact_count = 0
 
+        # Values collected before the monitoring started are not part of the raw samples
+        for context, family, name, metric in self.__source_metrics(source):
+            source.logged[f"{context}.{family}.{name}"] = len(metric.get_values())
+
+        # Reads are done by a dedicated worker, so a hung device can be abandoned
+        # when it misses the start of the next iteration.
+        reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"monitoring-{source.name}")
+        reading: Future | None = None
+
         def next_iter_ns() -> float:
             # When does the next iteration must starts ?
             return start_monitoring_ns + ((loops_done + 1) * precision_s) * 1e9
@@ -197,33 +558,43 @@ class Monitoring:
         while True:
             start_time_loop_ns = time.monotonic_ns()
 
-            # Trigger turbostat sample collection at the start of the monitoring loop
-            # This allows turbostat to collect metrics while we perform BMC/PDU monitoring
-            if self.turbostat:
-                self.turbostat.trigger_sample()
-
-            if loops_done and loops_done % frequency == 0:
+            if warmup_loops and loops_done == warmup_loops:
+                # The warm-up is over, its values are not part of the statistics
+                self.__discard(source)
+            elif loops_done > warmup_loops and (loops_done - warmup_loops) % frequency == 0:
                 # At every frequency, the maths are computed
-                self.__compact()
+                self.__compact(source)
                 compact_count = compact_count + 1
 
-            start_bmc_ns = time.monotonic_ns()
-            self.__monitor_bmc()
-            # Let's monitor the time spent at monitoring the BMC, in milliseconds
-            self.metrics.contexts.Monitor.BMC["Polling"].add((time.monotonic_ns() - start_bmc_ns) * 1e-6)
-
-            if self.vendor.get_pdus():
-                start_pdu_ns = time.monotonic_ns()
-                self.__monitor_pdus()
-                # Let's monitor the time spent at monitoring the PDUs, in milliseconds
-                self.metrics.contexts.Monitor.PDU["Polling"].add((time.monotonic_ns() - start_pdu_ns) * 1e-6)
-
-            # Now retrieve and parse the turbostat sample that was triggered at the start
-            if self.turbostat:
-                turbostat_timing = self.turbostat.get_and_parse_sample(precision_s)
-
-                # Let's monitor the time spent at retrieving the CPU metrics, in milliseconds
-                self.metrics.contexts.Monitor.CPU["Polling"].add((turbostat_timing - start_time_loop_ns) * 1e-6)
+            if not source.breaker.allow(start_time_loop_ns):
+                # The source keeps missing its deadline, let's not wait for it
+                source.metadata.skipped += 1
+                self.__mark_missing(source)
+            elif reading and not reading.done():
+                # The previous read is still hung, it counts as a new miss
+                self.__missed_deadline(source, loops_done)
+            else:
+                # Every source is read in its own contexts, an abandoned read cannot alter the metrics
+                contexts = MonitoringContexts()
+                reading = reader.submit(source.poll, contexts)
+                try:
+                    # Some sources report when their data was produced, otherwise it's now.
+                    polling_completed_ns = (
+                        reading.result(timeout=max(0, next_iter_ns() - time.monotonic_ns()) / 1e9)
+                        or time.monotonic_ns()
+                    )
+                except FutureTimeoutError:
+                    self.__missed_deadline(source, loops_done)
+                else:
+                    source.breaker.success()
+                    self.__merge(source, contexts)
+                    # Let's monitor the time spent at polling this source, in milliseconds
+                    # Pushed data was produced before the iteration started, its polling lasted until now
+                    polling_end_ns = (
+                        polling_completed_ns if polling_completed_ns >= start_time_loop_ns else time.monotonic_ns()
+                    )
+                    source.polling.add((polling_end_ns - start_time_loop_ns) * 1e-6)
+                    self.__log_raw_samples(source, polling_completed_ns)
 
             # Based on the time passed, let's compute the amount of sleep time
             # to keep in sync with the expected precision_s
@@ -234,7 +605,7 @@ class Monitoring:
             if sleep_time_ms < -5:
                 # The iteration is already late on schedule
                 # Only print a warning message if we are more than 5ms late
-                print(f"Monitoring iteration {loops_done} is {abs(sleep_time_ms):.2f}ms late")
+                print(f"Monitoring/{source.name}: iteration {loops_done} is {abs(sleep_time_ms):.2f}ms late")
 
             # If the current time + sleep_time is above the total duration_s (we accept up to 500ms overdue)
             if (time.monotonic_ns() + max(0, sleep_time_ns)) > (end_of_run_ns + 0.5 * 1e9):
@@ -247,17 +618,21 @@ class Monitoring:
 
             loops_done = loops_done + 1
 
-        # How much time did we spent in this monitoring loop ?
-        completed_time_ns = time.monotonic_ns()
-        self.metrics.metadata.monitoring_time = (completed_time_ns - start_monitoring_ns) * 1e-9  # seconds
-
-        # We were supposed to last "duration_s", how close are we from this metric ?
-        self.metrics.metadata.overdue_time_ms = ((completed_time_ns - start_monitoring_ns) - (duration_s * 1e9)) * 1e-6
-
-        self.metrics.metadata.samples_count = compact_count
-
-        # And return the final metrics
-        return self.__get_metrics()
+        # A hung read is abandoned, its worker will stop on its own
+        reader.shutdown(wait=False)
+        source.metadata.samples_count = compact_count
+
+    def __missed_deadline(self, source: MonitoringSource, iteration: int):
+        """A source read didn't complete before the next iteration"""
+        source.metadata.missed += 1
+        self.__mark_missing(source)
+        print(f"Monitoring/{source.name}: iteration {iteration} missed its deadline, the sample is missing")
+        now_ns = time.monotonic_ns()
+        if source.breaker.failure(now_ns):
+            print(
+                f"Monitoring/{source.name}: {source.breaker.failures} consecutive missed deadlines, "
+                f"not reading it for {(source.breaker.open_until_ns - now_ns) / 1e9:.1f}s"
+            )
 
     def __reset_metrics(self):
         """Reset all metrics to default state"""
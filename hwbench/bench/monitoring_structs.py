@@ -1,42 +1,202 @@
 from __future__ import annotations
 
-import statistics
+import math
 import sys
+from array import array
 from collections import defaultdict
 from dataclasses import dataclass, field
 from enum import Enum, StrEnum
 from typing import Any
 
 
-@dataclass
+class QuantileSketch:
+    """A mergeable quantile sketch with a relative accuracy (DDSketch)
+
+    Values are counted in logarithmic buckets, a quantile is known within
+    <relative_accuracy> of its actual value whatever the number of values."""
+
+    __slots__ = ("gamma_log", "positives", "negatives", "zeros", "count")
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        self.gamma_log = math.log((1 + relative_accuracy) / (1 - relative_accuracy))
+        self.positives: dict[int, int] = {}
+        self.negatives: dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+
+    def __key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self.gamma_log)
+
+    def __value(self, key: int) -> float:
+        # The middle of the bucket, in relative terms
+        gamma = math.exp(self.gamma_log)
+        return 2 * gamma**key / (gamma + 1)
+
+    def add(self, value: float) -> None:
+        """Add a single value, infinities and nan are ignored"""
+        if not math.isfinite(value):
+            return
+        if value > 0:
+            key = self.__key(value)
+            self.positives[key] = self.positives.get(key, 0) + 1
+        elif value < 0:
+            key = self.__key(-value)
+            self.negatives[key] = self.negatives.get(key, 0) + 1
+        else:
+            self.zeros += 1
+        self.count += 1
+
+    def merge(self, other: QuantileSketch) -> None:
+        """Add the values of another sketch, with the same relative accuracy"""
+        for key, count in other.positives.items():
+            self.positives[key] = self.positives.get(key, 0) + count
+        for key, count in other.negatives.items():
+            self.negatives[key] = self.negatives.get(key, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def quantile(self, quantile: float) -> float:
+        """Return the value at <quantile> (between 0 and 1), nan if empty"""
+        if not self.count:
+            return math.nan
+        # Nearest-rank method: the smallest value with at least <quantile> of the values below or equal
+        rank = max(1, math.ceil(quantile * self.count))
+        seen = 0
+        # From the lowest to the highest value
+        for key in sorted(self.negatives, reverse=True):
+            seen += self.negatives[key]
+            if seen >= rank:
+                return -self.__value(key)
+        seen += self.zeros
+        if seen >= rank:
+            return 0.0
+        for key in sorted(self.positives):
+            seen += self.positives[key]
+            if seen >= rank:
+                return self.__value(key)
+        return self.__value(max(self.positives))
+
+
 class MonitorMetric:
-    """A class to represent monitoring metrics"""
-
-    name: str
-    unit: str
-    value: float = field(default=sys.float_info.max, compare=False, repr=False)
-    values: list[float] = field(default_factory=list, init=False)
-    mean: list[float] = field(default_factory=list, init=False)
-    min: list[float] = field(default_factory=list, init=False)
-    max: list[float] = field(default_factory=list, init=False)
-    stdev: list[float] = field(default_factory=list, init=False)
-    samples: list[int] = field(default_factory=list, init=False)
-    full_name: str = field(default="", init=False)
-
-    def __post_init__(self) -> None:
+    """A class to represent monitoring metrics
+
+    Hundreds of metrics are polled on large servers, so they are stored
+    in typed arrays instead of lists of float objects.
+
+    Statistics are computed while values are added (Welford's algorithm and
+    a quantile sketch), so compact() only saves them and resets the accumulators.
+    values only holds the values of the current window."""
+
+    # Percentiles reported for every window
+    PERCENTILES = {"p50": 0.50, "p95": 0.95, "p99": 0.99}
+
+    __slots__ = (
+        "name",
+        "unit",
+        "value",
+        "values",
+        "mean",
+        "min",
+        "max",
+        "stdev",
+        "samples",
+        "p50",
+        "p95",
+        "p99",
+        "missing",
+        "full_name",
+        "_count",
+        "_mean",
+        "_m2",
+        "_min",
+        "_max",
+        "_sketch",
+        "_missing",
+    )
+
+    def __init__(self, name: str, unit: str, value: float = sys.float_info.max) -> None:
+        self.name = name
+        self.unit = unit
+        self.value = value
+        self.values = array("d")
+        self.mean = array("d")
+        self.min = array("d")
+        self.max = array("d")
+        self.stdev = array("d")
+        self.samples = array("q")
+        self.p50 = array("d")
+        self.p95 = array("d")
+        self.p99 = array("d")
+        self.missing = array("q")
+        self.full_name = ""
+        self.__reset_window()
         if self.value != sys.float_info.max:
             self.add(self.value)
 
+    def __reset_window(self) -> None:
+        """Reset the accumulators of the current window"""
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._min = math.inf
+        self._max = -math.inf
+        self._sketch = QuantileSketch()
+        self._missing = 0
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        # value is only the initial value, it's part of values
+        # and the accumulators are computed from values
+        return all(
+            getattr(self, attr) == getattr(other, attr)
+            for attr in self.__slots__
+            if attr != "value" and not attr.startswith("_")
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(name={self.name!r}, unit={self.unit!r}, values={self.values.tolist()}, "
+            f"mean={self.mean.tolist()}, min={self.min.tolist()}, max={self.max.tolist()}, "
+            f"stdev={self.stdev.tolist()}, samples={self.samples.tolist()}, p50={self.p50.tolist()}, "
+            f"p95={self.p95.tolist()}, p99={self.p99.tolist()}, missing={self.missing.tolist()}, "
+            f"full_name={self.full_name!r})"
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the metric as a json-able dict"""
+        return {
+            "name": self.name,
+            "unit": self.unit,
+            "value": self.value,
+            "values": self.values.tolist(),
+            "mean": self.mean.tolist(),
+            "min": self.min.tolist(),
+            "max": self.max.tolist(),
+            "stdev": self.stdev.tolist(),
+            "samples": self.samples.tolist(),
+            "p50": self.p50.tolist(),
+            "p95": self.p95.tolist(),
+            "p99": self.p99.tolist(),
+            "missing": self.missing.tolist(),
+            "full_name": self.full_name,
+        }
+
     def load_from_dict(self, input_data: dict[str, Any], full_name: str) -> None:
         """Load metric data from a dictionary."""
         self.full_name = full_name
         self.name = str(input_data.get("name", self.name))
         self.unit = str(input_data.get("unit", self.unit))
-        self.mean = input_data.get("mean", [])
-        self.min = input_data.get("min", [])
-        self.max = input_data.get("max", [])
-        self.stdev = input_data.get("stdev", [])
-        self.samples = input_data.get("samples", [])
+        self.mean = array("d", input_data.get("mean", []))
+        self.min = array("d", input_data.get("min", []))
+        self.max = array("d", input_data.get("max", []))
+        self.stdev = array("d", input_data.get("stdev", []))
+        self.samples = array("q", input_data.get("samples", []))
+        # Older results don't have percentiles
+        self.p50 = array("d", input_data.get("p50", []))
+        self.p95 = array("d", input_data.get("p95", []))
+        self.p99 = array("d", input_data.get("p99", []))
+        self.missing = array("q", input_data.get("missing", []))
 
     def get_full_name(self) -> str:
         """Return the metric full name"""
@@ -46,7 +206,7 @@ class MonitorMetric:
         """Return the metric name"""
         return self.name
 
-    def get_values(self) -> list[float]:
+    def get_values(self) -> array[float]:
         """Return the aggregated raw values"""
         return self.values
 
@@ -54,55 +214,173 @@ class MonitorMetric:
         """Return the unit for this metric"""
         return self.unit
 
-    def get_min(self) -> list[float]:
+    def get_min(self) -> array[float]:
         """Return the min for this metric"""
         return self.min
 
-    def get_mean(self) -> list[float]:
+    def get_mean(self) -> array[float]:
         """Return the mean for this metric"""
         return self.mean
 
-    def get_max(self) -> list[float]:
+    def get_max(self) -> array[float]:
         """Return the max for this metric"""
         return self.max
 
-    def get_samples(self) -> list[int]:
+    def get_stdev(self) -> array[float]:
+        """Return the standard deviation for this metric"""
+        return self.stdev
+
+    def get_samples(self) -> array[int]:
         """Return the number of samples"""
         return self.samples
 
+    def get_percentile(self, percentile: str) -> array[float]:
+        """Return a percentile (p50, p95 or p99) for this metric"""
+        return getattr(self, percentile)
+
     def add(self, value: float) -> None:
-        """Add a single value"""
+        """Add a single value, a non-finite one is counted as missing"""
+        if not math.isfinite(value):
+            self.add_missing()
+            return
         self.values.append(value)
+        # Welford's online mean and variance
+        self._count += 1
+        delta = value - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (value - self._mean)
+        self._min = min(self._min, value)
+        self._max = max(self._max, value)
+        self._sketch.add(value)
+
+    def get_missing(self) -> array[int]:
+        """Return the number of missing samples"""
+        return self.missing
+
+    def add_missing(self) -> None:
+        """Record a sample that could not be read"""
+        self._missing += 1
+
+    def discard(self) -> None:
+        """Drop the values of the current window, like the ones of a warm-up"""
+        del self.values[:]
+        self.__reset_window()
 
     def compact(self) -> None:
-        """Compute new min/max/mean/stdev from values."""
-        if not self.values:
+        """Save the min/max/mean/stdev/percentiles of the current window."""
+        if not self._count:
+            if self._missing:
+                self.__compact_missing()
             return
 
-        self.min.append(min(self.values))
-        self.max.append(max(self.values))
-        self.mean.append(statistics.mean(self.values))
-        self.stdev.append(statistics.stdev(self.values) if len(self.values) > 1 else 0.0)
-        self.samples.append(len(self.values))
-        self.values = []
+        self.min.append(self._min)
+        self.max.append(self._max)
+        self.mean.append(self._mean)
+        self.stdev.append(math.sqrt(self._m2 / (self._count - 1)) if self._count > 1 else 0.0)
+        self.samples.append(self._count)
+        for percentile, quantile in self.PERCENTILES.items():
+            # The sketch is approximate, let's keep it within the actual range
+            getattr(self, percentile).append(min(max(self._sketch.quantile(quantile), self._min), self._max))
+        self.missing.append(self._missing)
+        del self.values[:]
+        self.__reset_window()
+
+    def __compact_missing(self) -> None:
+        """Save a window where every sample is missing
+
+        The statistics of the previous window are kept, marked as stale by 0 samples,
+        so all the metrics keep the same number of statistics."""
+        for stats in [self.min, self.max, self.mean, self.p50, self.p95, self.p99]:
+            stats.append(stats[-1] if stats else math.nan)
+        self.stdev.append(0.0)
+        self.samples.append(0)
+        self.missing.append(self._missing)
+        self.__reset_window()
+
+    def resample(self, interval: float, new_interval: float) -> None:
+        """Merge the statistics computed every <interval> seconds into windows of <new_interval> seconds."""
+        windows: dict[int, list[int]] = {}
+        for index in range(len(self.mean)):
+            # The epsilon avoids float rounding to put a statistic in the previous window
+            windows.setdefault(int(index * interval / new_interval + 1e-9), []).append(index)
+
+        samples = self.samples if len(self.samples) == len(self.mean) else array("q", [1] * len(self.mean))
+        merged: dict[str, array] = {
+            "min": array("d"),
+            "max": array("d"),
+            "mean": array("d"),
+            "stdev": array("d"),
+            "samples": array("q"),
+            "p50": array("d"),
+            "p95": array("d"),
+            "p99": array("d"),
+            "missing": array("q"),
+        }
+        has_percentiles = len(self.p50) == len(self.mean)
+        has_missing = len(self.missing) == len(self.mean)
+        for window in sorted(windows):
+            indexes = windows[window]
+            count = sum(samples[index] for index in indexes)
+            # Windows without any sample are stale, they only count if all of them are
+            weights = {index: samples[index] if count else 1 for index in indexes}
+            mean = sum(self.mean[index] * weights[index] for index in indexes) / sum(weights.values())
+            # Pooled variance of the merged windows
+            variance = 0.0
+            if count > 1:
+                variance = sum(
+                    (samples[index] - 1) * self.stdev[index] ** 2 + samples[index] * (self.mean[index] - mean) ** 2
+                    for index in indexes
+                ) / (count - 1)
+            merged["min"].append(min(self.min[index] for index in indexes))
+            merged["max"].append(max(self.max[index] for index in indexes))
+            merged["mean"].append(mean)
+            merged["stdev"].append(variance**0.5)
+            merged["samples"].append(count)
+            if has_percentiles:
+                # Sketches are not saved: the merged median is approximated by the weighted mean of
+                # the medians, the merged tails by the highest tail of the windows
+                merged["p50"].append(sum(self.p50[index] * weights[index] for index in indexes) / sum(weights.values()))
+                merged["p95"].append(max(self.p95[index] for index in indexes))
+                merged["p99"].append(max(self.p99[index] for index in indexes))
+            if has_missing:
+                merged["missing"].append(sum(self.missing[index] for index in indexes))
+
+        self.min = merged["min"]
+        self.max = merged["max"]
+        self.mean = merged["mean"]
+        self.stdev = merged["stdev"]
+        self.samples = merged["samples"]
+        self.p50 = merged["p50"]
+        self.p95 = merged["p95"]
+        self.p99 = merged["p99"]
+        self.missing = merged["missing"]
 
     def reset(self) -> None:
         """Reset all metrics to the default."""
         self.value = sys.float_info.max
-        self.values = []
-        self.mean = []
-        self.min = []
-        self.max = []
-        self.stdev = []
-        self.samples = []
+        self.values = array("d")
+        self.mean = array("d")
+        self.min = array("d")
+        self.max = array("d")
+        self.stdev = array("d")
+        self.samples = array("q")
+        self.p50 = array("d")
+        self.p95 = array("d")
+        self.p99 = array("d")
+        self.missing = array("q")
+        self.__reset_window()
 
 
 class Temperature(MonitorMetric):
+    __slots__ = ()
+
     def __init__(self, name: str, value: float | None = None) -> None:
         super().__init__(name, "Celsius", value=value if value is not None else sys.float_info.max)
 
 
 class Power(MonitorMetric):
+    __slots__ = ()
+
     def __init__(self, name: str, value: float | None = None) -> None:
         super().__init__(name, "Watts", value=value if value is not None else sys.float_info.max)
 
@@ -132,6 +410,116 @@ class PowerCategories(Enum):
         return [member.value for member in cls]
 
 
+class MonitoringSources(StrEnum):
+    """Monitoring sources, each of them is sampled at its own rate"""
+
+    TURBOSTAT = "turbostat"
+    BMC_THERMAL = "bmc_thermal"
+    BMC_POWER = "bmc_power"
+    PDU = "pdu"
+    IPMI = "ipmi"
+
+
+@dataclass
+class SamplingRate:
+    """Sampling rate of a monitoring source"""
+
+    precision: float  # seconds between two samples
+    frequency: int  # number of samples per compaction window
+
+    def get_iteration_time(self) -> float:
+        """Return the duration of a compaction window, in seconds"""
+        return self.precision * self.frequency
+
+
+@dataclass
+class MonitoringSourceMetadata:
+    """Metadata of a monitoring source"""
+
+    precision: float
+    frequency: int
+    iteration_time: float
+    samples_count: int = 0
+    # Reads abandoned because they missed their deadline
+    missed: int = 0
+    # Reads not done because the source kept missing its deadline
+    skipped: int = 0
+    # Metrics fed by this source, as 'Context', 'Context.Family' or 'Context.Family.Metric'
+    components: list[str] = field(default_factory=list)
+
+
+# Upper bounds of the endpoints latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+@dataclass
+class EndpointStats:
+    """Requests statistics of a monitoring device url"""
+
+    requests: int = 0
+    # Requests sent again after a connection failure or a timeout
+    retries: int = 0
+    # Requests that never got an answer
+    failures: int = 0
+    # Size of the answers bodies, as sent by the device
+    body_bytes: int = 0
+    # Number of answers by HTTP status
+    status: dict[str, int] = field(default_factory=dict)
+    # Number of answers by latency bucket, named after its upper bound like '100' or '+Inf'
+    latency_ms: dict[str, int] = field(default_factory=dict)
+    total_latency_ms: float = 0
+    max_latency_ms: float = 0
+
+    def add(self, status: int | None, latency_ms: float, body_bytes: int = 0, retries: int = 0) -> None:
+        """Count a request, its status is None if it never got an answer"""
+        self.requests += 1
+        self.retries += retries
+        if status is None:
+            self.failures += 1
+            return
+        self.body_bytes += body_bytes
+        self.status[str(status)] = self.status.get(str(status), 0) + 1
+        bucket = next((str(bound) for bound in LATENCY_BUCKETS_MS if latency_ms <= bound), "+Inf")
+        self.latency_ms[bucket] = self.latency_ms.get(bucket, 0) + 1
+        self.total_latency_ms += latency_ms
+        self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+
+    def get_mean_latency_ms(self) -> float:
+        """Return the mean latency of the answered requests"""
+        answers = sum(self.status.values())
+        return self.total_latency_ms / answers if answers else 0
+
+
+@dataclass
+class PduEnergy:
+    """Energy consumed by the outlets of a PDU during a monitoring"""
+
+    # 'counter' when read from the energy counters, 'integration' of the power readings otherwise
+    method: str
+    duration_s: float
+    # Energy of every outlet or outlet group, in joules
+    outlets: dict[str, float] = field(default_factory=dict)
+    # Smallest change of the energy counters of all the outlets, in joules
+    resolution_j: float | None = None
+    joules: float = 0
+    watts: float = 0
+
+    def __post_init__(self):
+        self.joules = sum(self.outlets.values())
+        self.watts = self.joules / self.duration_s if self.duration_s else 0
+
+
+def component_matches(component: str, context: str, family: str, name: str) -> bool:
+    """Return if a metric is part of a 'Context', 'Context.Family' or 'Context.Family.Metric' component"""
+    component_context, _, family_metric = component.partition(".")
+    component_family, _, metric_name = family_metric.partition(".")
+    if component_context != context:
+        return False
+    if component_family and component_family != family:
+        return False
+    return not metric_name or metric_name == name
+
+
 @dataclass
 class MonitoringMetadata:
     """Metadata for monitoring operations"""
@@ -142,6 +530,17 @@ class MonitoringMetadata:
     monitoring_time: float | None = None
     overdue_time_ms: float | None = None
     samples_count: int | None = None
+    sources: dict[str, MonitoringSourceMetadata] = field(default_factory=dict)
+    # Name of the raw samples file, if any, in the same directory as results.json
+    samples_file: str | None = None
+    # Requests statistics of each monitoring device ('bmc', 'pdu.<name>'), by url
+    endpoints: dict[str, dict[str, EndpointStats]] = field(default_factory=dict)
+    # Energy consumed during the monitoring, by PDU
+    energy: dict[str, PduEnergy] = field(default_factory=dict)
+    # Seconds polled before the statistics start, while the benchmark warms up
+    warmup_time: float | None = None
+    # Monotonic time the statistics start at, the raw samples before are the warm-up
+    warmup_end_ns: int | None = None
 
 
 class MonitoringMetadataKeys(StrEnum):
@@ -151,6 +550,12 @@ class MonitoringMetadataKeys(StrEnum):
     monitoring_time = "monitoring_time"
     overdue_time_ms = "overdue_time_ms"
     samples_count = "samples_count"
+    sources = "sources"
+    samples_file = "samples_file"
+    endpoints = "endpoints"
+    energy = "energy"
+    warmup_time = "warmup_time"
+    warmup_end_ns = "warmup_end_ns"
 
 
 @dataclass
@@ -176,6 +581,7 @@ class PowerConsumptionContext:
     CPU: dict[str, MonitorMetric] = field(default_factory=dict)
     BMC: dict[str, MonitorMetric] = field(default_factory=dict)
     PDU: dict[str, MonitorMetric] = field(default_factory=dict)
+    IPMI: dict[str, MonitorMetric] = field(default_factory=dict)
 
     def compact_all(self) -> None:
         """Compact all metrics in this context"""
@@ -185,12 +591,15 @@ class PowerConsumptionContext:
             metric.compact()
         for metric in self.PDU.values():
             metric.compact()
+        for metric in self.IPMI.values():
+            metric.compact()
 
 
 class PowerConsumptionContextKeys(StrEnum):
     CPU = "CPU"
     BMC = "BMC"
     PDU = "PDU"
+    IPMI = "IPMI"
 
 
 @dataclass
@@ -251,6 +660,30 @@ class IPCContextKeys(StrEnum):
     CPU = "CPU"
 
 
+@dataclass
+class BusyContext:
+    """CPU busy time monitoring context"""
+
+    CPU: dict[str, MonitorMetric] = field(default_factory=dict)
+
+    def compact_all(self) -> None:
+        """Compact all metrics in this context"""
+        for metric in self.CPU.values():
+            metric.compact()
+
+
+class BusyContextKeys(StrEnum):
+    CPU = "CPU"
+
+
+CStateContext = defaultdict[str, dict[str, MonitorMetric]]
+"""C-state residency monitoring context, one family per C-state"""
+
+
+def CStateContextFactory() -> CStateContext:
+    return defaultdict(dict[str, MonitorMetric])
+
+
 @dataclass
 class MonitorContext:
     """Monitoring context"""
@@ -258,6 +691,7 @@ class MonitorContext:
     BMC: dict[str, MonitorMetric] = field(default_factory=dict)
     PDU: dict[str, MonitorMetric] = field(default_factory=dict)
     CPU: dict[str, MonitorMetric] = field(default_factory=dict)
+    IPMI: dict[str, MonitorMetric] = field(default_factory=dict)
 
     def compact_all(self) -> None:
         """Compact all metrics in this context"""
@@ -267,12 +701,15 @@ class MonitorContext:
             metric.compact()
         for metric in self.CPU.values():
             metric.compact()
+        for metric in self.IPMI.values():
+            metric.compact()
 
 
 class MonitorContextKeys(StrEnum):
     BMC = "BMC"
     PDU = "PDU"
     CPU = "CPU"
+    IPMI = "IPMI"
 
 
 @dataclass
@@ -285,8 +722,15 @@ class MonitoringContexts:
     Thermal: ThermalContext = field(default_factory=ThermalContextFactory)
     Freq: FreqContext = field(default_factory=FreqContext)
     IPC: IPCContext = field(default_factory=IPCContext)
+    Busy: BusyContext = field(default_factory=BusyContext)
+    CState: CStateContext = field(default_factory=CStateContextFactory)
     Monitor: MonitorContext = field(default_factory=MonitorContext)
 
+    def get_family(self, context: str, family: str) -> dict[str, MonitorMetric]:
+        """Return the metrics of a context family, created if the context is a dict"""
+        families = getattr(self, context)
+        return families[family] if isinstance(families, dict) else getattr(families, family)
+
     def compact_all(self) -> None:
         """Compact all metrics in all contexts"""
         self.Fans.compact_all()
@@ -297,6 +741,10 @@ class MonitoringContexts:
                 metric.compact()
         self.Freq.compact_all()
         self.IPC.compact_all()
+        self.Busy.compact_all()
+        for cstate in self.CState.values():
+            for metric in cstate.values():
+                metric.compact()
         self.Monitor.compact_all()
 
 
@@ -307,6 +755,8 @@ class MonitoringContextKeys(StrEnum):
     Thermal = "Thermal"
     Freq = "Freq"
     IPC = "IPC"
+    Busy = "Busy"
+    CState = "CState"
     Monitor = "Monitor"
 
 
@@ -6,6 +6,9 @@ from typing import TYPE_CHECKING
 from hwbench.environment.hardware import BaseHardware
 
 from .monitoring import Monitoring
+from .monitoring_structs import SamplingRate
+from .repetitions import RepeatPolicy
+from .start_conditions import StartCondition
 
 if TYPE_CHECKING:
     from .benchmark import Benchmark
@@ -28,6 +31,14 @@ class BenchmarkParameters:
         monitoring: Monitoring,
         skip_method: str,
         sync_start: str,
+        monitoring_sampling: dict[str, SamplingRate] | None = None,
+        monitoring_raw: str = "none",
+        co_schedule: str = "none",
+        repeat: RepeatPolicy | None = None,
+        warmup: int = 0,
+        thermal_start: list[StartCondition] | None = None,
+        fans_start: list[StartCondition] | None = None,
+        start_timeout: int = 600,
         **kwargs,
     ):
         self.out_dir = out_dir
@@ -43,6 +54,18 @@ class BenchmarkParameters:
         self.monitoring = monitoring
         self.skip_method = skip_method
         self.sync_start = sync_start
+        self.monitoring_sampling = monitoring_sampling or {}
+        self.monitoring_raw = monitoring_raw
+        self.co_schedule = co_schedule
+        self.repeat = repeat or RepeatPolicy()
+        # The current run of a repeated benchmark, from 1
+        self.repetition = 1
+        self.warmup = warmup
+        self.thermal_start = thermal_start or []
+        self.fans_start = fans_start or []
+        self.start_timeout = start_timeout
+        # Set when the benchmark runs with others, their monitoring is then done by Benchmarks
+        self.shared_monitoring = False
         self.custom_parameters: dict[str, str] = kwargs
         # Set once the owning Benchmark is built (see set_benchmark); until then
         # get_name_with_position() falls back to the bare job name.
@@ -79,18 +102,66 @@ class BenchmarkParameters:
     def get_runtime(self) -> int:
         return self.runtime
 
+    def get_warmup(self) -> int:
+        return self.warmup
+
+    def get_total_runtime(self) -> int:
+        """Return how long the benchmark runs, warm-up included"""
+        return self.warmup + self.runtime
+
     def get_monitoring_config(self) -> str:
         return self.monitoring_config
 
     def get_monitoring(self) -> Monitoring:
         return self.monitoring
 
+    def get_monitoring_sampling(self) -> dict[str, SamplingRate]:
+        return self.monitoring_sampling
+
+    def get_monitoring_raw(self) -> str:
+        return self.monitoring_raw
+
     def get_skip_method(self) -> str:
         return self.skip_method
 
     def get_sync_start(self) -> str:
         return self.sync_start
 
+    def get_thermal_start(self) -> list[StartCondition]:
+        return self.thermal_start
+
+    def get_fans_start(self) -> list[StartCondition]:
+        return self.fans_start
+
+    def get_start_timeout(self) -> int:
+        return self.start_timeout
+
+    def has_start_conditions(self) -> bool:
+        return bool(self.thermal_start or self.fans_start)
+
+    def get_co_schedule(self) -> str:
+        return self.co_schedule
+
+    def get_repeat(self) -> RepeatPolicy:
+        return self.repeat
+
+    def get_repetition(self) -> int:
+        return self.repetition
+
+    def set_repetition(self, repetition: int):
+        self.repetition = repetition
+
+    def get_raw_samples_path(self) -> pathlib.Path:
+        """Return the raw samples file of the current run, a repeated benchmark has one by run"""
+        repetition = f"-r{self.repetition}" if self.repeat.is_repeated() else ""
+        return pathlib.Path(self.out_dir) / f"{self.get_name_with_position()}{repetition}-samples.jsonl"
+
+    def is_monitoring_shared(self) -> bool:
+        return self.shared_monitoring
+
+    def set_monitoring_shared(self, shared: bool):
+        self.shared_monitoring = shared
+
     def set_result_format(self, format):
         """Set the default result content to be padded with performance results."""
         self.result_format = format
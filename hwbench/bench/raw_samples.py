@@ -0,0 +1,107 @@
+"""Raw monitoring samples, written to disk as they are polled.
+
+The monitoring only keeps min/mean/max/stdev of every compaction window,
+a raw samples file keeps every single value with its own timestamp.
+It is written append-only, one JSON object per line:
+
+    {"monotonic_ns": 1234, "wallclock": 1700000000.1, "source": "turbostat", "metric": "Freq.CPU.Core_0", "value": 3500.0}
+
+metric is the full name of the metric: <Context>.<Family>.<Metric>
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import pathlib
+import statistics
+import threading
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass
+class RawSample:
+    """A single monitoring value"""
+
+    monotonic_ns: int
+    wallclock: float
+    source: str
+    metric: str
+    value: float
+
+
+class RawSamplesWriter:
+    """Append raw samples to a file, can be shared by several monitoring threads"""
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self.lock = threading.Lock()
+        # A benchmark run again by --resume starts a new file
+        self.file = open(path, "w")  # noqa: SIM115
+
+    def write(self, samples: list[RawSample]) -> None:
+        """Append samples to the file"""
+        if not samples:
+            return
+        lines = "".join(json.dumps(dataclasses.asdict(sample)) + "\n" for sample in samples)
+        with self.lock:
+            self.file.write(lines)
+            # Samples must be on disk even if hwbench doesn't complete
+            self.file.flush()
+
+    def close(self) -> None:
+        with self.lock:
+            self.file.close()
+
+
+def read_raw_samples(path: pathlib.Path) -> list[RawSample]:
+    """Read a raw samples file, sorted by time"""
+    samples = []
+    with open(path) as raw_file:
+        for line in raw_file:
+            try:
+                samples.append(RawSample(**json.loads(line)))
+            except (ValueError, TypeError):
+                # The last line can be truncated if hwbench was interrupted
+                continue
+    return sorted(samples, key=lambda sample: sample.monotonic_ns)
+
+
+def aggregate_raw_samples(samples: list[RawSample], resolution_s: float) -> dict[str, dict[str, Any]]:
+    """Compute min/mean/max/stdev of every metric over windows of <resolution_s> seconds.
+
+    All metrics share the same windows, starting at the first sample of the file.
+    A window without any value of a metric holds the closest previous value with 0 samples,
+    so every metric has the same number of statistics."""
+    if not samples:
+        return {}
+    start_ns = min(sample.monotonic_ns for sample in samples)
+    end_ns = max(sample.monotonic_ns for sample in samples)
+    resolution_ns = resolution_s * 1e9
+    windows_count = int((end_ns - start_ns) / resolution_ns) + 1
+
+    values: dict[str, list[list[float]]] = {}
+    for sample in samples:
+        windows = values.setdefault(sample.metric, [[] for _ in range(windows_count)])
+        windows[int((sample.monotonic_ns - start_ns) / resolution_ns)].append(sample.value)
+
+    metrics: dict[str, dict[str, Any]] = {}
+    for metric, windows in values.items():
+        stats: dict[str, list] = {"min": [], "mean": [], "max": [], "stdev": [], "samples": []}
+        # Before the first value of a metric, let's use this first value
+        last_value = next(window for window in windows if window)[0]
+        for window in windows:
+            if window:
+                last_value = window[-1]
+                stats["min"].append(min(window))
+                stats["mean"].append(statistics.mean(window))
+                stats["max"].append(max(window))
+                stats["stdev"].append(statistics.stdev(window) if len(window) > 1 else 0.0)
+            else:
+                for stat in ["min", "mean", "max"]:
+                    stats[stat].append(last_value)
+                stats["stdev"].append(0.0)
+            stats["samples"].append(len(window))
+        metrics[metric] = stats
+    return metrics
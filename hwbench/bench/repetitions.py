@@ -0,0 +1,173 @@
+"""Repetitions of a benchmark, until its performance is known precisely enough.
+
+A job with repeat=<min>:<max>:<ci> runs at least <min> times and at most <max>
+times, until the 95% confidence interval of its primary metric is narrower than
++/- <ci> percent of the mean. The repetitions of all the benchmarks are
+interleaved (A B A B ...), so a slow drift of the server, like its thermal state,
+does not bias a single benchmark.
+"""
+
+from __future__ import annotations
+
+import math
+import statistics
+from dataclasses import dataclass
+from typing import Any
+
+# The two-sided 95% quantiles of the Student t distribution, by degrees of freedom
+T_95 = [
+    12.706,
+    4.303,
+    3.182,
+    2.776,
+    2.571,
+    2.447,
+    2.365,
+    2.306,
+    2.262,
+    2.228,
+    2.201,
+    2.179,
+    2.160,
+    2.145,
+    2.131,
+    2.120,
+    2.110,
+    2.101,
+    2.093,
+    2.086,
+    2.080,
+    2.074,
+    2.069,
+    2.064,
+    2.060,
+    2.056,
+    2.052,
+    2.048,
+    2.045,
+    2.042,
+]
+# The normal approximation, for more than 30 degrees of freedom
+Z_95 = 1.960
+
+
+@dataclass
+class RepeatPolicy:
+    """How many times a benchmark runs"""
+
+    min: int = 1
+    max: int = 1
+    # The maximum half-width of the confidence interval, in percent of the mean
+    ci_percent: float = 0.0
+
+    def is_adaptive(self) -> bool:
+        return self.max > self.min
+
+    def is_repeated(self) -> bool:
+        return self.max > 1
+
+    def needs_more(self, runs: list[dict[str, Any]]) -> bool:
+        """Return if the benchmark must run again, given the results of its runs"""
+        if len(runs) < self.min:
+            return True
+        if len(runs) >= self.max:
+            return False
+        metric = get_primary_metric_values(runs)
+        if metric is None:
+            # Without a metric to converge on, the benchmark runs min times
+            return False
+        return not is_converged(metric[1], self.ci_percent)
+
+
+def get_t_95(samples: int) -> float:
+    degrees = samples - 1
+    if degrees <= len(T_95):
+        return T_95[degrees - 1]
+    return Z_95
+
+
+def get_primary_metric(result: dict[str, Any]) -> tuple[str, float] | None:
+    """Return the metric the repetitions are based on, and its value
+
+    - the bogo ops/s of the stress-ng and sleep benchmarks,
+    - the total of sum_speed for stress-ng memrate, and sum_total for stream,
+    - the total bandwidth of the fio jobs, or their iops if no bandwidth is reported."""
+    if "bogo ops/s" in result:
+        return "bogo ops/s", float(result["bogo ops/s"])
+    if "sum_total" in result:
+        return "sum_total", float(result["sum_total"])
+    speeds = [value["sum_speed"] for value in result.values() if isinstance(value, dict) and "sum_speed" in value]
+    if speeds:
+        return "sum_speed", float(sum(speeds))
+    if "fio_results" in result:
+        jobs = result["fio_results"].get("jobs", [])
+        for metric in ["bw", "iops"]:
+            total = sum(job.get(rw, {}).get(metric, 0) for job in jobs for rw in ["read", "write", "trim"])
+            if total:
+                return f"fio {metric}", float(total)
+    return None
+
+
+def get_primary_metric_values(runs: list[dict[str, Any]]) -> tuple[str, list[float]] | None:
+    """Return the primary metric of the runs of a benchmark, and its values"""
+    names = set()
+    values = []
+    for run in runs:
+        metric = get_primary_metric(run)
+        if metric is None:
+            return None
+        names.add(metric[0])
+        values.append(metric[1])
+    if len(names) != 1:
+        return None
+    return names.pop(), values
+
+
+def get_ci(values: list[float]) -> float:
+    """Return the half-width of the 95% confidence interval of the mean"""
+    if len(values) < 2:
+        return math.inf
+    return get_t_95(len(values)) * statistics.stdev(values) / math.sqrt(len(values))
+
+
+def is_converged(values: list[float], ci_percent: float) -> bool:
+    """Return if the confidence interval is narrower than ci_percent of the mean"""
+    mean = statistics.fmean(values) if values else 0
+    if not mean:
+        # Nothing to measure, like a skipped benchmark
+        return len(values) > 0
+    return get_ci(values) <= abs(mean) * ci_percent / 100
+
+
+def summarize(metric: str, values: list[float], policy: RepeatPolicy) -> dict[str, Any]:
+    """Return the statistics of the primary metric over the runs"""
+    mean = statistics.fmean(values)
+    ci = get_ci(values) if len(values) > 1 else None
+    return {
+        "metric": metric,
+        "values": values,
+        "mean": mean,
+        "ci": ci,
+        "cv": statistics.stdev(values) / mean if len(values) > 1 and mean else None,
+        "min": policy.min,
+        "max": policy.max,
+        "ci_percent": policy.ci_percent,
+        # Fixed repetitions have no stop rule
+        "converged": is_converged(values, policy.ci_percent) if policy.is_adaptive() else None,
+    }
+
+
+def merge_runs(policy: RepeatPolicy, runs: list[dict[str, Any]]) -> dict[str, Any]:
+    """Return the result of a repeated benchmark
+
+    It is the result of its first run, with the statistics of the primary metric
+    and the results of the other runs under 'repetitions'."""
+    result = runs[0]
+    if not policy.is_repeated():
+        return result
+    result["repetitions"] = {"runs": len(runs)}
+    metric = get_primary_metric_values(runs)
+    if metric:
+        result["repetitions"] |= summarize(*metric, policy)
+    result["repetitions"]["results"] = runs[1:]
+    return result
@@ -0,0 +1,84 @@
+"""Benchmark results, written to disk as soon as each benchmark completes.
+
+A campaign interrupted by a crash, an OOM or a reboot keeps the results of its
+completed benchmarks and can be resumed with --resume <out_dir>. The result of
+every benchmark, monitoring included, is appended as one JSON object per line:
+
+    {"name": "check_1_core_int8_perf_0", "result": {"engine": "stressng", ...}}
+
+results.json is then assembled from these parts when the campaign completes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pathlib
+import threading
+from typing import Any
+
+from hwbench.utils import helpers as h
+
+PARTS_FILE = "results.parts.jsonl"
+FINGERPRINT_FILE = "fingerprint.json"
+
+
+def digest(data: Any) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def get_fingerprint(hardware: dict[str, Any], jobs_config: dict[str, Any], expanded_jobs: str) -> dict[str, str]:
+    """Return what must not change when resuming a campaign
+
+    The hardware (dmi & cpu), the jobs configuration and the benchmarks it expands to."""
+    return {
+        "hardware": digest({"dmi": hardware["dmi"], "cpu": hardware["cpu"]}),
+        "config": digest(jobs_config),
+        "jobs": digest(expanded_jobs),
+    }
+
+
+class ResultsJournal:
+    """The results of the completed benchmarks of a campaign"""
+
+    def __init__(self, out_dir: pathlib.Path):
+        self.path = out_dir / PARTS_FILE
+        self.fingerprint_path = out_dir / FINGERPRINT_FILE
+        self.lock = threading.Lock()
+
+    def append(self, name: str, result: dict[str, Any]) -> None:
+        """Durably add the result of a benchmark"""
+        line = json.dumps({"name": name, "result": result}) + "\n"
+        with self.lock, open(self.path, "a") as parts:
+            parts.write(line)
+            # The result must survive a power loss or a reboot
+            parts.flush()
+            os.fsync(parts.fileno())
+
+    def load(self) -> dict[str, Any]:
+        """Return the results of the completed benchmarks, by name"""
+        results: dict[str, Any] = {}
+        if not self.path.exists():
+            return results
+        with open(self.path) as parts:
+            for line in parts:
+                try:
+                    part = json.loads(line)
+                    results[part["name"]] = part["result"]
+                except (ValueError, KeyError, TypeError):
+                    # The last line can be truncated if hwbench was interrupted
+                    continue
+        return results
+
+    def write_fingerprint(self, fingerprint: dict[str, str]) -> None:
+        self.fingerprint_path.write_text(json.dumps(fingerprint))
+
+    def check_fingerprint(self, fingerprint: dict[str, str]) -> None:
+        """Ensure a campaign is resumed on the same hardware, with the same jobs"""
+        if not self.fingerprint_path.exists():
+            h.fatal(f"Cannot resume: {self.fingerprint_path} does not exist")
+        expected = json.loads(self.fingerprint_path.read_text())
+        changed = [key for key in fingerprint if expected.get(key) != fingerprint[key]]
+        if changed:
+            h.fatal(f"Cannot resume: the {', '.join(changed)} changed since the campaign started")
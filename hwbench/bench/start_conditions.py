@@ -0,0 +1,127 @@
+"""Conditions the server must reach before a benchmark starts.
+
+With thermal_start and fans_start, a benchmark waits for the BMC temperatures
+and fans speed to be at or below their targets, so it does not start in the
+thermal state the previous benchmark left. hwbench is idle while waiting, the
+CPUs can enter their C-states and cool down.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from hwbench.bench.monitoring_structs import FansContext, FansContextKeys, MonitorMetric, ThermalContextFactory
+
+if TYPE_CHECKING:
+    from hwbench.environment.vendors.bmc import BMC
+
+START_CONDITION = re.compile(r"(?P<item>[^:]+):(?P<value>[0-9]*\.?[0-9]+)\s*(?P<unit>%|rpm)?", re.IGNORECASE)
+# The fans ReadingUnits matching the fans_start units
+FAN_UNITS = {"%": "percent", "rpm": "rpm"}
+
+
+@dataclass
+class StartCondition:
+    """A sensor, or a family of sensors, must be at or below a value"""
+
+    item: str
+    value: float
+    # Only set for fans, to select the fans reporting this unit
+    unit: str = ""
+
+    def __str__(self) -> str:
+        return f"{self.item}:{self.value:g}{self.unit}"
+
+    def get_matching_metrics(self, family: str, metrics: dict[str, MonitorMetric]) -> dict[str, MonitorMetric]:
+        """Return the metrics this condition applies to: the whole family, or a sensor by name"""
+        matching = metrics if self.item == family else {name: m for name, m in metrics.items() if name == self.item}
+        if self.unit:
+            matching = {name: m for name, m in matching.items() if m.get_unit().lower() == FAN_UNITS[self.unit]}
+        return {name: m for name, m in matching.items() if len(m.get_values())}
+
+
+@dataclass
+class StartState:
+    """How long a benchmark waited for its start conditions, and the state it started with"""
+
+    wait_s: float = 0
+    reached: bool = False
+    timeout_s: int = 0
+    # The latest reading of the sensors of the conditions, by condition
+    thermal: dict[str, dict[str, float]] = field(default_factory=dict)
+    fans: dict[str, dict[str, float]] = field(default_factory=dict)
+
+
+def parse_start_conditions(value: str) -> list[StartCondition]:
+    """Parse a list of <item>:<value>[%|rpm], raise ValueError on an invalid syntax"""
+    conditions = []
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        match = START_CONDITION.fullmatch(item.strip())
+        if not match:
+            raise ValueError(f"'{item.strip()}' does not match the <item>:<value> syntax")
+        conditions.append(
+            StartCondition(
+                match.group("item").strip(), float(match.group("value")), (match.group("unit") or "").lower()
+            )
+        )
+    return conditions
+
+
+def check_conditions(
+    conditions: list[StartCondition], families: dict[str, dict[str, MonitorMetric]]
+) -> tuple[bool, dict[str, dict[str, float]]]:
+    """Return if all the conditions are met, and the readings of their sensors
+
+    A condition matching no sensor is ignored."""
+    reached = True
+    readings: dict[str, dict[str, float]] = {}
+    for condition in conditions:
+        key = str(condition)
+        readings[key] = {}
+        for family, metrics in families.items():
+            for name, metric in condition.get_matching_metrics(family, metrics).items():
+                readings[key][name] = metric.get_values()[-1]
+                reached &= metric.get_values()[-1] <= condition.value
+    return reached, readings
+
+
+def wait_start_conditions(
+    bmc: BMC,
+    thermal: list[StartCondition],
+    fans: list[StartCondition],
+    timeout_s: int,
+    polling_s: float = 5,
+) -> StartState:
+    """Poll the BMC until the start conditions are met, or timeout_s seconds"""
+    state = StartState(timeout_s=timeout_s)
+    start = time.monotonic()
+    while True:
+        reached = True
+        if thermal:
+            thermals_reached, state.thermal = check_conditions(thermal, bmc.read_thermals(ThermalContextFactory()))
+            reached &= thermals_reached
+        if fans:
+            fans_context = bmc.read_fans(FansContext())
+            fans_reached, state.fans = check_conditions(fans, {str(FansContextKeys.Fan): fans_context.Fan})
+            reached &= fans_reached
+        state.wait_s = time.monotonic() - start
+        if reached:
+            state.reached = True
+            return state
+        if state.wait_s >= timeout_s:
+            return state
+        time.sleep(min(polling_s, timeout_s - state.wait_s))
+
+
+def get_readings_summary(state: StartState) -> str:
+    """Return the readings of a start state, as text"""
+    readings: dict[str, float] = {}
+    for conditions in [state.thermal, state.fans]:
+        for sensors in conditions.values():
+            readings |= sensors
+    return ", ".join(f"{name}={value:g}" for name, value in readings.items())
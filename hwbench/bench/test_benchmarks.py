@@ -83,8 +83,11 @@ class TestParse(tbc.TestCommon):
 
         # Data is from a 64 cores CPU
         assert get_monitoring_members(MonitoringContextKeys.Freq) == 64
-        # Cores + package + BMC
-        assert get_monitoring_members(MonitoringContextKeys.PowerConsumption) == 66
+        # Cores + packages total + package_0 + BMC
+        assert get_monitoring_members(MonitoringContextKeys.PowerConsumption) == 67
+        assert get_monitoring_members(MonitoringContextKeys.Busy) == 64
+        # C1% and C2% of every core
+        assert get_monitoring_members(MonitoringContextKeys.CState) == 128
 
     def test_stream_short(self):
         with patch("hwbench.engines.stressng_cpu.EngineModuleCpu.list_module_parameters") as p:
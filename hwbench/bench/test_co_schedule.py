@@ -0,0 +1,94 @@
+from unittest.mock import patch
+
+from hwbench.engines.sleep import Sleep
+from hwbench.environment.rapl import EnergyDomain, EnergyMeasure
+
+from . import test_benchmarks_common as tbc
+
+
+class TestCoSchedule(tbc.TestCommon):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.load_mocked_hardware(
+            cpucores="./hwbench/tests/parsing/cpu_cores/v2321",
+            cpuinfo="./hwbench/tests/parsing/cpu_info/v2321",
+            numa="./hwbench/tests/parsing/numa/8domainsllc",
+        )
+        self.load_benches("./hwbench/config/co_schedule.conf")
+
+    def get_schedule_names(self) -> list[list[str]]:
+        return [
+            [benchmark.get_parameters().get_name_with_position() for benchmark in benchmarks]
+            for benchmarks in self.benches.get_schedule()
+        ]
+
+    def test_schedule(self):
+        self.parse_jobs_config()
+        assert self.benches.count_benchmarks() == 4
+        # The first benchmark of each job of the group run together
+        assert self.get_schedule_names() == [["memory_0", "cpu_1"], ["cpu_2"], ["alone_3"]]
+        assert self.benches.runtime() == 40
+        assert self.get_bench_parameters(0).is_monitoring_shared()
+        assert self.get_bench_parameters(1).is_monitoring_shared()
+        assert not self.get_bench_parameters(2).is_monitoring_shared()
+
+    def test_overlap(self):
+        self.get_jobs_config().get_config().set("memory", "selected_cpus", "0-8")
+        self.should_be_fatal(self.parse_jobs_config)
+
+    def test_run(self):
+        self.parse_jobs_config()
+
+        def run(benchmark):
+            return {"job_name": benchmark.get_parameters().get_name()}
+
+        with patch("hwbench.bench.benchmark.Benchmark.run", autospec=True, side_effect=run):
+            results = self.benches.run()
+        # The results are kept per job
+        assert list(results) == ["memory_0", "cpu_1", "cpu_2", "alone_3"]
+        assert results["cpu_1"]["job_name"] == "cpu"
+        co_schedule = results["memory_0"]["co_schedule"]
+        assert co_schedule == results["cpu_1"]["co_schedule"]
+        assert co_schedule["group"] == "mixed"
+        assert list(co_schedule["timeline"]) == ["memory_0", "cpu_1"]
+        assert "co_schedule" not in results["cpu_2"]
+
+    def test_energy(self):
+        self.parse_jobs_config()
+
+        def run(benchmark):
+            return {"job_name": benchmark.get_parameters().get_name(), "bogo ops/s": 1000.0}
+
+        with (
+            patch("hwbench.bench.benchmark.Benchmark.run", autospec=True, side_effect=run),
+            patch("hwbench.bench.benchmarks.RaplEnergy") as rapl,
+        ):
+            rapl.return_value.is_available.return_value = True
+            rapl.return_value.stop_delayed.return_value = EnergyMeasure(10, {"package": EnergyDomain(1000, 100)})
+            results = self.benches.run()
+
+        # The energy is measured once for the whole group
+        rapl.return_value.start_after.assert_called_once_with(0)
+        energy = results["memory_0"]["co_schedule"]["energy"]
+        assert energy == results["cpu_1"]["co_schedule"]["energy"]
+        assert energy["domains"]["package"]["joules"] == 1000
+        assert "bogo ops/J" not in results["memory_0"]
+        assert "energy" not in results["memory_0"]
+
+    def test_bogo_ops_per_joule(self):
+        self.parse_jobs_config()
+        benchmark = self.benches.get_benchmarks()[3]
+        sleep = Sleep(benchmark.get_enginemodule(), benchmark.get_parameters())
+        measure = EnergyMeasure(10, {"package": EnergyDomain(500, 50)})
+        run = {"bogo ops/s": 1000.0}
+        sleep.add_energy(run, measure)
+        assert run["bogo ops/J"] == 20
+
+        # The warm-up is run apart, the bogo ops and the energy cover the same window
+        benchmark.get_parameters().warmup = 5
+        run = {"bogo ops/s": 1000.0}
+        sleep.add_energy(run, measure)
+        assert "energy" in run
+        assert run["bogo ops/J"] == 20
+        assert sleep.run_cmd()[-1] == str(benchmark.get_parameters().get_runtime())
+        assert sleep.run_cmd_warmup()[-1] == "5"
@@ -39,3 +39,15 @@ class TestFio(tbc.TestCommon):
             bench_1.get_engine_module_parameter_base()
             == "--direct=1 --rw=randread --bs=4k --ioengine=libaio --iodepth=256 --group_reporting --readonly --runtime=40 --time_based --output-format=json+ --numjobs=6 --name=randread_cmdline_1 --invalidate=1 --log_avg_msec=20000 --filename=/dev/nvme0n1 --write_bw_log=fio/randread_cmdline_1_bw.log --write_lat_log=fio/randread_cmdline_1_lat.log --write_hist_log=fio/randread_cmdline_1_hist.log --write_iops_log=fio/randread_cmdline_1_iops.log"
         )
+
+    def test_warmup(self):
+        """Check the warm-up is a fio ramp_time."""
+        with patch("hwbench.engines.fio.Engine.validate_disks", return_value=None):
+            self.load_benches("./hwbench/config/fio.conf")
+            self.get_jobs_config().get_config().set("randread_cmdline", "warmup", "10")
+            self.parse_jobs_config()
+        assert self.benches.runtime() == 100
+        bench_0 = self.get_bench_parameters(0)
+        assert bench_0.get_warmup() == 10
+        assert "--runtime=40 --time_based" in bench_0.get_engine_module_parameter_base()
+        assert "--ramp_time=10" in bench_0.get_engine_module_parameter_base()
@@ -0,0 +1,393 @@
+import json
+import math
+import pathlib
+import statistics
+import tempfile
+import time
+from unittest.mock import MagicMock, patch
+
+from hwbench.bench.monitoring import CircuitBreaker
+from hwbench.bench.monitoring_structs import MonitoringSources, MonitorMetric, Power, QuantileSketch, SamplingRate
+from hwbench.bench.raw_samples import RawSample, aggregate_raw_samples, read_raw_samples
+from hwbench.utils.dataclasses import asdict
+
+from . import test_benchmarks_common as tbc
+
+POLLING_DELAY_S = 0.3
+
+
+def slow_read(context, snapshot=None):
+    time.sleep(POLLING_DELAY_S)
+    return context
+
+
+def hung_read(context, snapshot=None):
+    time.sleep(2 * POLLING_DELAY_S)
+    return context
+
+
+class TestMonitoring(tbc.TestCommon):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.load_mocked_hardware(
+            cpucores="./hwbench/tests/parsing/cpu_cores/v2321",
+            cpuinfo="./hwbench/tests/parsing/cpu_info/v2321",
+            numa="./hwbench/tests/parsing/numa/8domainsllc",
+        )
+        self.load_benches("./hwbench/config/spike.conf")
+        self.parse_jobs_config()
+
+    def tearDown(self):
+        self.hw.get_vendor().pdus = []
+
+    def get_monitoring(self):
+        monitoring = self.benches.get_monitoring()
+        assert monitoring
+        # There is no turbostat process to sample from in the tests
+        monitoring.turbostat = None
+        return monitoring
+
+    def add_slow_pdus(self, count: int):
+        pdus = []
+        for pdu_number in range(count):
+            pdu = MagicMock()
+            pdu.get_name.return_value = f"PDU{pdu_number}"
+            pdu.read_power_consumption.side_effect = slow_read
+            pdus.append(pdu)
+        self.hw.get_vendor().pdus = pdus
+        return pdus
+
+    def test_concurrent_polling(self):
+        """Check the BMC and PDUs are polled concurrently."""
+        monitoring = self.get_monitoring()
+        pdus = self.add_slow_pdus(2)
+        with patch("hwbench.environment.vendors.mock.MockedBMC.read_power_supplies", side_effect=slow_read):
+            monitoring.monitor(1, 1, 1)
+            metrics = monitoring.get_monitor_metrics()
+
+        for pdu in pdus:
+            assert pdu.read_power_consumption.call_count == 2
+
+        bmc_polling = metrics.contexts.Monitor.BMC["Power"].get_mean()
+        assert len(bmc_polling) == 1
+        assert bmc_polling[0] >= POLLING_DELAY_S * 1e3
+        for pdu in pdus:
+            pdu_polling = metrics.contexts.Monitor.PDU[pdu.get_name()].get_mean()
+            assert len(pdu_polling) == 1
+            assert POLLING_DELAY_S * 1e3 <= pdu_polling[0] < 2 * POLLING_DELAY_S * 1e3
+        # A serial polling would have taken 3 x POLLING_DELAY_S per iteration
+        assert metrics.metadata.overdue_time_ms is not None
+        assert metrics.metadata.overdue_time_ms < 2 * POLLING_DELAY_S * 1e3
+
+    def test_sampling_parsing(self):
+        """Check the per-source sampling rates are read from the job."""
+        self.load_benches("./hwbench/config/monitor_sampling.conf")
+        self.parse_jobs_config()
+        assert self.get_bench_parameters(0).get_monitoring_sampling() == {}
+        assert self.get_bench_parameters(1).get_monitoring_sampling() == {
+            "turbostat": SamplingRate(0.5, 20),
+            "pdu.PDU_outlet": SamplingRate(1, 10),
+        }
+
+    def test_sampling_rates(self):
+        """Check each source is sampled at its own rate."""
+        monitoring = self.get_monitoring()
+        pdus = self.add_slow_pdus(1)
+        with patch("hwbench.environment.vendors.mock.MockedBMC.read_thermals") as read_thermals:
+            monitoring.monitor(
+                1,
+                1,
+                2,
+                {
+                    str(MonitoringSources.BMC_THERMAL): SamplingRate(0.25, 2),
+                    f"{MonitoringSources.PDU}.PDU0": SamplingRate(2, 1),
+                },
+            )
+            metrics = monitoring.get_monitor_metrics()
+
+        # 2 seconds at 250ms, plus the 500ms of accepted overdue
+        assert read_thermals.call_count == 10
+        assert pdus[0].read_power_consumption.call_count == 2
+
+        sources = metrics.metadata.sources
+        assert sources[MonitoringSources.BMC_THERMAL].iteration_time == 0.5
+        assert sources[MonitoringSources.BMC_THERMAL].samples_count == 4
+        assert sources[MonitoringSources.BMC_POWER].iteration_time == 1
+        assert sources[MonitoringSources.BMC_POWER].samples_count == 2
+        assert sources[f"{MonitoringSources.PDU}.PDU0"].samples_count == 1
+        assert len(metrics.contexts.Monitor.BMC["Thermal"].get_mean()) == 4
+        assert len(metrics.contexts.Monitor.BMC["Power"].get_mean()) == 2
+
+        # The coarsest source is the time reference
+        assert metrics.metadata.iteration_time == 2
+        assert metrics.metadata.samples_count == 1
+
+    def test_unknown_source(self):
+        """Check an unknown source is fatal."""
+        monitoring = self.get_monitoring()
+        self.should_be_fatal(monitoring.monitor, 1, 1, 1, {"pdu.unknown": SamplingRate(1, 1)})
+
+    def test_raw_samples(self):
+        """Check every polled value is written in the raw samples file."""
+        monitoring = self.get_monitoring()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            samples_file = pathlib.Path(tmpdir) / "job_0-samples.jsonl"
+            monitoring.monitor(0.25, 2, 1, raw_samples_file=samples_file)
+            metrics = monitoring.get_monitor_metrics()
+            samples = read_raw_samples(samples_file)
+
+        assert metrics.metadata.samples_file == "job_0-samples.jsonl"
+        # 1 second at 250ms, plus the 500ms of accepted overdue
+        fans = [sample for sample in samples if sample.metric == "Fans.Fan.Fan1"]
+        assert len(fans) == 6
+        assert all(sample.source == MonitoringSources.BMC_THERMAL for sample in fans)
+        assert all(sample.value == 40 for sample in fans)
+        assert [sample.monotonic_ns for sample in fans] == sorted(sample.monotonic_ns for sample in fans)
+        polling = [sample for sample in samples if sample.metric == "Monitor.BMC.Power"]
+        assert len(polling) == 6
+        assert all(sample.source == MonitoringSources.BMC_POWER for sample in polling)
+
+    def test_warmup(self):
+        """Check the warm-up is polled but not part of the statistics."""
+        monitoring = self.get_monitoring()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            samples_file = pathlib.Path(tmpdir) / "job_0-samples.jsonl"
+            monitoring.monitor(0.25, 2, 1, raw_samples_file=samples_file, warmup_s=1)
+            metrics = monitoring.get_monitor_metrics()
+            samples = read_raw_samples(samples_file)
+
+        assert metrics.metadata.warmup_time == 1
+        assert metrics.metadata.warmup_end_ns
+        # The warm-up second, then 1 second at 250ms, plus the 500ms of accepted overdue
+        fans = [sample for sample in samples if sample.metric == "Fans.Fan.Fan1"]
+        assert len([sample for sample in fans if sample.monotonic_ns < metrics.metadata.warmup_end_ns]) == 4
+        assert len([sample for sample in fans if sample.monotonic_ns >= metrics.metadata.warmup_end_ns]) == 6
+        # Like a monitoring without warm-up, the statistics only cover the steady second
+        assert metrics.contexts.Fans.Fan["Fan1"].get_samples().tolist() == [2, 2]
+        assert metrics.metadata.sources[MonitoringSources.BMC_THERMAL].samples_count == 2
+        assert metrics.metadata.overdue_time_ms is not None
+        assert metrics.metadata.overdue_time_ms < 1000
+
+    def test_unaligned_warmup(self):
+        """Check a warm-up not multiple of a source precision is not stretched."""
+        monitoring = self.get_monitoring()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            samples_file = pathlib.Path(tmpdir) / "job_0-samples.jsonl"
+            sampling = {MonitoringSources.BMC_THERMAL: SamplingRate(0.75, 1)}
+            monitoring.monitor(0.25, 2, 1, sampling, raw_samples_file=samples_file, warmup_s=1)
+            metrics = monitoring.get_monitor_metrics()
+            samples = read_raw_samples(samples_file)
+
+        assert metrics.metadata.warmup_time == 1
+        # The statistics of every source start at the end of the warm-up, not at the 1.5s of the thermal iterations
+        fans = [sample.monotonic_ns for sample in samples if sample.metric == "Fans.Fan.Fan1"]
+        assert len([ns for ns in fans if ns < metrics.metadata.warmup_end_ns]) == 2
+        assert len([ns for ns in fans if ns >= metrics.metadata.warmup_end_ns]) == 2
+        power = [sample.monotonic_ns for sample in samples if sample.metric == "Monitor.BMC.Power"]
+        assert len([ns for ns in power if ns < metrics.metadata.warmup_end_ns]) == 4
+        assert len([ns for ns in power if ns >= metrics.metadata.warmup_end_ns]) == 6
+        # No source samples past the end of the run, plus the 500ms of accepted overdue
+        assert max(fans + power) < metrics.metadata.warmup_end_ns + 1.5e9
+        # The iteration at 1.5s is compacted, the one at 2.25s is the last read
+        assert metrics.contexts.Fans.Fan["Fan1"].get_samples().tolist() == [1]
+        assert len(metrics.contexts.Fans.Fan["Fan1"].get_values()) == 1
+
+    def test_aggregate_raw_samples(self):
+        """Check raw samples are aggregated on windows shared by all metrics."""
+        samples = [
+            RawSample(int(1e9), 0, "bmc_power", "PowerConsumption.BMC.Chassis", 100),
+            RawSample(int(1.5e9), 0, "bmc_power", "PowerConsumption.BMC.Chassis", 200),
+            RawSample(int(3.2e9), 0, "bmc_power", "PowerConsumption.BMC.Chassis", 300),
+            RawSample(int(2.1e9), 0, "bmc_thermal", "Fans.Fan.Fan1", 40),
+        ]
+        aggregated = aggregate_raw_samples(samples, 1)
+        assert aggregated["PowerConsumption.BMC.Chassis"] == {
+            "min": [100, 200, 300],
+            "mean": [150, 200, 300],
+            "max": [200, 200, 300],
+            "stdev": [aggregated["PowerConsumption.BMC.Chassis"]["stdev"][0], 0.0, 0.0],
+            "samples": [2, 0, 1],
+        }
+        assert round(aggregated["PowerConsumption.BMC.Chassis"]["stdev"][0], 2) == 70.71
+        # Before its first value, a metric holds this first value
+        assert aggregated["Fans.Fan.Fan1"]["mean"] == [40, 40, 40]
+        assert aggregated["Fans.Fan.Fan1"]["samples"] == [0, 1, 0]
+
+    def test_metric_serialization(self):
+        """Check metrics are serialized like plain lists and loaded back."""
+        metric = Power("Chassis", 100)
+        metric.add(200)
+        metric.compact()
+        metric.add(300)
+        output = json.loads(json.dumps(metric.to_dict()))
+        assert output == {
+            "name": "Chassis",
+            "unit": "Watts",
+            "value": 100,
+            "values": [300],
+            "mean": [150],
+            "min": [100],
+            "max": [200],
+            "stdev": [output["stdev"][0]],
+            "samples": [2],
+            "p50": output["p50"],
+            "p95": output["p95"],
+            "p99": output["p99"],
+            "missing": [0],
+            "full_name": "",
+        }
+        assert round(output["stdev"][0], 2) == 70.71
+        assert abs(output["p50"][0] - 100) <= 1
+        assert abs(output["p99"][0] - 200) <= 2
+
+        loaded = Power("Chassis")
+        loaded.load_from_dict(output, "Chassis")
+        assert loaded.get_mean() == metric.get_mean()
+        assert loaded.get_samples() == metric.get_samples()
+        assert loaded != MonitorMetric("Chassis", "Watts")
+
+        monitoring = self.get_monitoring()
+        monitoring.monitor(0.25, 2, 1)
+        data = json.loads(json.dumps(asdict(monitoring.get_monitor_metrics())))
+        fan = data["contexts"]["Fans"]["Fan"]["Fan1"]
+        assert fan["unit"] == "RPM"
+        assert fan["mean"] == [40, 40]
+        assert data["metadata"]["sources"][MonitoringSources.BMC_THERMAL]["samples_count"] == 2
+
+    def test_streaming_statistics(self):
+        """Check statistics computed while adding values match the exact ones."""
+        values = [float((value * 37) % 101) for value in range(1000)]
+        metric = MonitorMetric("Metric", "Unit")
+        for value in values:
+            metric.add(value)
+        metric.compact()
+        assert metric.get_samples().tolist() == [1000]
+        assert metric.get_min().tolist() == [min(values)]
+        assert metric.get_max().tolist() == [max(values)]
+        assert round(metric.get_mean()[0], 6) == round(statistics.mean(values), 6)
+        assert round(metric.get_stdev()[0], 6) == round(statistics.stdev(values), 6)
+        quantiles = statistics.quantiles(values, n=100, method="inclusive")
+        for percentile, index in [("p50", 49), ("p95", 94), ("p99", 98)]:
+            assert abs(metric.get_percentile(percentile)[0] - quantiles[index]) <= 0.02 * quantiles[index]
+        # The accumulators are reset for the next window
+        assert metric.get_values().tolist() == []
+        metric.add(-5)
+        metric.add(0)
+        metric.add(5)
+        metric.compact()
+        assert metric.get_mean().tolist()[1] == 0
+        assert metric.get_min().tolist()[1] == -5
+        assert metric.get_percentile("p50").tolist()[1] == 0
+
+    def test_quantile_sketch_merge(self):
+        """Check merged sketches are like a single sketch of all the values."""
+        full = QuantileSketch()
+        first = QuantileSketch()
+        second = QuantileSketch()
+        for value in range(1, 1001):
+            full.add(value)
+            (first if value % 2 else second).add(value)
+        first.merge(second)
+        assert first.count == full.count == 1000
+        for quantile in [0.5, 0.95, 0.99]:
+            assert first.quantile(quantile) == full.quantile(quantile)
+            assert abs(full.quantile(quantile) - quantile * 1000) <= 0.02 * quantile * 1000
+
+    def test_non_finite_values(self):
+        """Check infinities and nan are counted as missing, not in the statistics."""
+        sketch = QuantileSketch()
+        for value in [math.inf, -math.inf, math.nan, 10]:
+            sketch.add(value)
+        assert sketch.count == 1
+        assert sketch.zeros == 0
+
+        metric = MonitorMetric("Metric", "Unit")
+        for value in [10, math.inf, 20, math.nan, -math.inf]:
+            metric.add(value)
+        metric.compact()
+        assert metric.get_samples().tolist() == [2]
+        assert metric.get_missing().tolist() == [3]
+        assert metric.get_mean().tolist() == [15]
+        assert metric.get_max().tolist() == [20]
+        assert abs(metric.get_percentile("p99")[0] - 20) <= 0.02 * 20
+
+    def test_missed_deadline(self):
+        """Check a hung source is abandoned without delaying the others."""
+        monitoring = self.get_monitoring()
+        with patch("hwbench.environment.vendors.mock.MockedBMC.read_fans", side_effect=hung_read):
+            monitoring.monitor(0.25, 2, 2)
+            metrics = monitoring.get_monitor_metrics()
+
+        thermal = metrics.metadata.sources[MonitoringSources.BMC_THERMAL]
+        assert thermal.missed >= 3
+        # The circuit breaker stopped reading the hung source for a while
+        assert thermal.skipped >= 1
+        fan = metrics.contexts.Fans.Fan["Fan1"]
+        # Windows without any sample are kept, so all metrics are aligned
+        assert len(fan.get_mean()) == thermal.samples_count == 4
+        assert fan.get_mean().tolist() == [40] * 4
+        assert sum(fan.get_missing()) >= thermal.missed
+        assert 0 in fan.get_samples()
+
+        # The other sources are not affected
+        power = metrics.metadata.sources[MonitoringSources.BMC_POWER]
+        assert power.missed == power.skipped == 0
+        assert len(metrics.contexts.PowerConsumption.BMC["Chassis"].get_mean()) == power.samples_count == 4
+        assert metrics.contexts.Monitor.BMC["Power"].get_missing().tolist() == [0] * 4
+        assert metrics.metadata.overdue_time_ms is not None
+        assert metrics.metadata.overdue_time_ms < 2 * POLLING_DELAY_S * 1e3
+
+    def test_abandoned_cpu_read(self):
+        """Check a CPU read completing after its deadline does not alter the metrics."""
+        monitoring = self.get_monitoring()
+        cpu_metric = MonitorMetric("Core_0", "Mhz")
+        monitoring.metrics.contexts.Freq.CPU = {"Core_0": cpu_metric}
+        reads = []
+
+        def get_and_parse_sample(precision_s, contexts=None):
+            reads.append(time.monotonic_ns())
+            if len(reads) == 1:
+                # The first read outlives its iteration, then completes
+                time.sleep(1.5 * POLLING_DELAY_S)
+                value = 999.0
+            else:
+                value = 1000.0
+            target = (contexts or monitoring.metrics.contexts).Freq.CPU
+            target.setdefault("Core_0", MonitorMetric("Core_0", "Mhz")).add(value)
+            return time.monotonic_ns()
+
+        turbostat = MagicMock()
+        turbostat.get_components.return_value = ["Freq.CPU"]
+        turbostat.get_and_parse_sample.side_effect = get_and_parse_sample
+        monitoring.turbostat = turbostat
+        monitoring.monitor(POLLING_DELAY_S, 2, 1)
+        metrics = monitoring.get_monitor_metrics()
+
+        # The read missed the first iteration, and was still running at the second one
+        assert metrics.metadata.sources[MonitoringSources.TURBOSTAT].missed == 2
+        assert sum(cpu_metric.get_missing()) == 2
+        # The late value was read in contexts that were never merged
+        assert {value for value in cpu_metric.get_max().tolist() if not math.isnan(value)} == {1000}
+        # Every other read is counted once, the last one after the last statistics
+        assert sum(cpu_metric.get_samples()) + len(cpu_metric.get_values()) == len(reads) - 1
+
+    def test_circuit_breaker(self):
+        """Check the circuit breaker backoff."""
+        breaker = CircuitBreaker(1, threshold=2, max_backoff_s=3)
+        assert breaker.allow(0)
+        assert not breaker.failure(0)
+        assert breaker.allow(0)
+        assert breaker.failure(0)
+        assert not breaker.allow(int(0.9e9))
+        assert breaker.allow(int(1e9))
+        # A new failure doubles the backoff, up to max_backoff_s
+        assert breaker.failure(int(1e9))
+        assert not breaker.allow(int(2.9e9))
+        assert breaker.allow(int(3e9))
+        assert breaker.failure(int(3e9))
+        assert breaker.allow(int(6e9))
+        # A success resets it
+        breaker.success()
+        assert not breaker.failure(int(6e9))
+        assert breaker.failure(int(6e9))
+        assert breaker.allow(int(7e9))
@@ -0,0 +1,89 @@
+from unittest.mock import patch
+
+import pytest
+
+from . import test_benchmarks_common as tbc
+from .repetitions import RepeatPolicy, get_ci, get_primary_metric, is_converged, merge_runs
+
+
+def runs(*values: float) -> list[dict]:
+    return [{"bogo ops/s": value} for value in values]
+
+
+class TestRepetitions(tbc.TestCommon):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.load_mocked_hardware(
+            cpucores="./hwbench/tests/parsing/cpu_cores/v2321",
+            cpuinfo="./hwbench/tests/parsing/cpu_info/v2321",
+            numa="./hwbench/tests/parsing/numa/8domainsllc",
+        )
+        self.load_benches("./hwbench/config/repeat.conf")
+        self.parse_jobs_config()
+
+    def test_statistics(self):
+        # The Student quantile for 2 degrees of freedom, times the standard deviation of the mean
+        assert get_ci([9, 10, 11]) == pytest.approx(4.303 / 3**0.5)
+        assert is_converged([1000, 1001, 999], 1)
+        assert not is_converged([1000, 1100, 900], 1)
+        # A single run cannot tell the variance
+        assert not is_converged([1000], 50)
+
+        assert get_primary_metric({"sum_total": 42.0}) == ("sum_total", 42)
+        assert get_primary_metric({"read64": {"sum_speed": 10}, "write64": {"sum_speed": 5}}) == ("sum_speed", 15)
+        fio = {"fio_results": {"jobs": [{"read": {"bw": 100, "iops": 25}, "write": {"bw": 50, "iops": 12}}]}}
+        assert get_primary_metric(fio) == ("fio bw", 150)
+        assert get_primary_metric({"skipped": True}) is None
+
+    def test_policy(self):
+        policy = RepeatPolicy(2, 5, 1)
+        assert policy.needs_more(runs(1000))
+        assert not policy.needs_more(runs(1000, 1001))
+        assert policy.needs_more(runs(1000, 1100, 900))
+        assert not policy.needs_more(runs(1000, 1100, 900, 1000, 1050))
+        # Without a primary metric, the benchmark runs min times
+        assert not policy.needs_more([{"skipped": True}] * 2)
+
+        result = merge_runs(policy, runs(1000, 1100, 900))
+        assert result["bogo ops/s"] == 1000
+        repetitions = result["repetitions"]
+        assert repetitions["values"] == [1000, 1100, 900]
+        assert repetitions["mean"] == 1000
+        assert repetitions["cv"] == pytest.approx(0.1)
+        assert not repetitions["converged"]
+        assert repetitions["results"] == runs(1100, 900)
+        # A benchmark running once is reported as is
+        assert merge_runs(RepeatPolicy(), runs(1000)) == {"bogo ops/s": 1000}
+
+    def test_run(self):
+        assert self.benches.runtime() == 10 * (2 + 2 + 3 + 1)
+        values = {"stable": iter([100, 100.5]), "noisy": iter([100, 150, 80, 120])}
+        order = []
+
+        def run(benchmark):
+            name = benchmark.get_parameters().get_name()
+            order.append(name)
+            return {
+                "job_name": name,
+                "bogo ops/s": next(values[name]) if name in values else 10,
+                "samples_file": benchmark.get_parameters().get_raw_samples_path().name,
+            }
+
+        with patch("hwbench.bench.benchmark.Benchmark.run", autospec=True, side_effect=run):
+            results = self.benches.run()
+        # The runs are interleaved, only the benchmarks needing it run again
+        assert order == ["stable", "noisy", "fixed", "once", "stable", "noisy", "fixed", "noisy", "fixed", "noisy"]
+        assert results["stable_0"]["repetitions"]["converged"]
+        assert results["noisy_1"]["repetitions"]["values"] == [100, 150, 80, 120]
+        assert not results["noisy_1"]["repetitions"]["converged"]
+        assert results["fixed_2"]["repetitions"]["runs"] == 3
+        assert results["fixed_2"]["repetitions"]["converged"] is None
+        assert "repetitions" not in results["once_3"]
+        # Every run of a repeated benchmark has its own raw samples file
+        fixed = results["fixed_2"]
+        assert [fixed["samples_file"]] + [run["samples_file"] for run in fixed["repetitions"]["results"]] == [
+            "fixed_2-r1-samples.jsonl",
+            "fixed_2-r2-samples.jsonl",
+            "fixed_2-r3-samples.jsonl",
+        ]
+        assert results["once_3"]["samples_file"] == "once_3-samples.jsonl"
@@ -0,0 +1,70 @@
+import pathlib
+import tempfile
+from unittest.mock import patch
+
+import pytest
+
+from . import test_benchmarks_common as tbc
+from .results import ResultsJournal, get_fingerprint
+
+HARDWARE = {"dmi": {"serial": "1234"}, "cpu": {"model": "EPYC"}, "bmc": {"firmware_version": "1.0"}}
+
+
+class TestResults(tbc.TestCommon):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.load_mocked_hardware(
+            cpucores="./hwbench/tests/parsing/cpu_cores/v2321",
+            cpuinfo="./hwbench/tests/parsing/cpu_info/v2321",
+            numa="./hwbench/tests/parsing/numa/8domainsllc",
+        )
+        self.load_benches("./hwbench/config/co_schedule.conf")
+        self.parse_jobs_config()
+
+    def test_journal(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            journal = ResultsJournal(pathlib.Path(tmpdir))
+            assert journal.load() == {}
+            journal.append("memory_0", {"job_name": "memory"})
+            journal.append("cpu_1", {"job_name": "cpu"})
+            # A result written again replaces the previous one
+            journal.append("memory_0", {"job_name": "memory", "rerun": True})
+            # hwbench was killed while writing a result
+            with open(journal.path, "a") as parts:
+                parts.write('{"name": "cpu_2", "res')
+            assert journal.load() == {"memory_0": {"job_name": "memory", "rerun": True}, "cpu_1": {"job_name": "cpu"}}
+
+    def test_fingerprint(self):
+        config = self.get_jobs_config().to_dict()
+        jobs = self.benches.get_expanded_jobs()
+        fingerprint = get_fingerprint(HARDWARE, config, jobs)
+        # The BMC is not part of the fingerprint
+        assert get_fingerprint(HARDWARE | {"bmc": {}}, config, jobs) == fingerprint
+        with tempfile.TemporaryDirectory() as tmpdir:
+            journal = ResultsJournal(pathlib.Path(tmpdir))
+            with pytest.raises(SystemExit):
+                journal.check_fingerprint(fingerprint)
+            journal.write_fingerprint(fingerprint)
+            journal.check_fingerprint(fingerprint)
+            with pytest.raises(SystemExit):
+                journal.check_fingerprint(get_fingerprint(HARDWARE | {"cpu": {"model": "Xeon"}}, config, jobs))
+            with pytest.raises(SystemExit):
+                journal.check_fingerprint(get_fingerprint(HARDWARE, config, jobs.replace("runtime=20", "runtime=30")))
+
+    def test_resume(self):
+        runs = []
+
+        def run(benchmark):
+            runs.append(benchmark.get_parameters().get_name_with_position())
+            return {"job_name": benchmark.get_parameters().get_name()}
+
+        # cpu_1 did not complete, it runs again with memory_0 as they are co-scheduled
+        completed = {"memory_0": {"job_name": "memory"}, "cpu_2": {"job_name": "cpu"}}
+        assert self.benches.runtime(completed) == 30
+        saved = {}
+        with patch("hwbench.bench.benchmark.Benchmark.run", autospec=True, side_effect=run):
+            results = self.benches.run(completed, saved.__setitem__)
+        assert sorted(runs) == ["alone_3", "cpu_1", "memory_0"]
+        assert sorted(saved) == ["alone_3", "cpu_1", "memory_0"]
+        assert list(results) == ["memory_0", "cpu_1", "cpu_2", "alone_3"]
+        assert "co_schedule" in results["memory_0"]
@@ -0,0 +1,77 @@
+from unittest.mock import patch
+
+import pytest
+
+from hwbench.bench.monitoring_structs import MonitorMetric, Temperature
+
+from . import test_benchmarks_common as tbc
+from .start_conditions import StartCondition, check_conditions, parse_start_conditions
+
+
+def metric(metric: MonitorMetric, value: float) -> MonitorMetric:
+    metric.add(value)
+    return metric
+
+
+class TestStartConditions(tbc.TestCommon):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.load_mocked_hardware(
+            cpucores="./hwbench/tests/parsing/cpu_cores/v2321",
+            cpuinfo="./hwbench/tests/parsing/cpu_info/v2321",
+            numa="./hwbench/tests/parsing/numa/8domainsllc",
+        )
+        self.load_benches("./hwbench/config/start_conditions.conf")
+        self.parse_jobs_config()
+
+    def test_parse(self):
+        assert parse_start_conditions("CPU:45, Inlet Temp:25.5") == [
+            StartCondition("CPU", 45),
+            StartCondition("Inlet Temp", 25.5),
+        ]
+        assert parse_start_conditions("Fan:40%,Fan1:3000RPM") == [
+            StartCondition("Fan", 40, "%"),
+            StartCondition("Fan1", 3000, "rpm"),
+        ]
+        assert parse_start_conditions("") == []
+        with pytest.raises(ValueError, match="syntax"):
+            parse_start_conditions("CPU<40")
+        assert self.get_bench_parameters(0).get_fans_start() == [StartCondition("Fan1", 50, "rpm")]
+        assert not self.get_bench_parameters(2).has_start_conditions()
+
+    def test_check(self):
+        thermals = {
+            "CPU": {"CPU1": metric(Temperature("CPU1"), 50), "CPU2": metric(Temperature("CPU2"), 42)},
+            "Intake": {"Inlet": metric(Temperature("Inlet"), 24)},
+        }
+        # All the sensors of a family must be cold enough
+        assert check_conditions([StartCondition("CPU", 45)], thermals) == (False, {"CPU:45": {"CPU1": 50, "CPU2": 42}})
+        assert check_conditions([StartCondition("CPU2", 45), StartCondition("Intake", 25)], thermals)[0]
+        # A condition matching no sensor is ignored
+        assert check_conditions([StartCondition("GPU", 45)], thermals) == (True, {"GPU:45": {}})
+
+        fans = {
+            "Fan": {
+                "Fan1": metric(MonitorMetric("Fan1", "Percent"), 60),
+                "Fan2": metric(MonitorMetric("Fan2", "RPM"), 9000),
+            }
+        }
+        assert check_conditions([StartCondition("Fan", 50, "%")], fans) == (False, {"Fan:50%": {"Fan1": 60}})
+        assert check_conditions([StartCondition("Fan", 10000, "rpm")], fans)[0]
+
+    def test_run(self):
+        def run(benchmark):
+            return {"job_name": benchmark.get_parameters().get_name()}
+
+        with patch("hwbench.bench.benchmark.Benchmark.run", autospec=True, side_effect=run):
+            results = self.benches.run()
+        # The mocked BMC reports the CPU1 at 40 celsius and the Fan1 at 40 RPM
+        cold = results["cold_0"]["start_conditions"]
+        assert cold["reached"]
+        assert cold["wait_s"] < 1
+        assert cold["thermal"] == {"CPU:45": {"CPU1": 40}}
+        assert cold["fans"] == {"Fan1:50rpm": {"Fan1": 40}}
+        too_hot = results["too_hot_1"]["start_conditions"]
+        assert not too_hot["reached"]
+        assert 1 <= too_hot["wait_s"] < 2
+        assert "start_conditions" not in results["any_2"]
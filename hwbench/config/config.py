@@ -7,6 +7,9 @@ import re
 from typing import Any
 
 from hwbench.bench.engine import EngineBase
+from hwbench.bench.monitoring_structs import SamplingRate
+from hwbench.bench.repetitions import RepeatPolicy
+from hwbench.bench.start_conditions import StartCondition, parse_start_conditions
 from hwbench.environment import hardware as env_hw
 from hwbench.utils import helpers as h
 
@@ -30,6 +33,7 @@ class Config:
         # Ensure default options from the configuration file
         default_parameters = {
             "runtime": "60",
+            "warmup": "0",
             "monitor": "none",
             "stressor_range": "1",
             "stressor_range_scaling": "plus_1",
@@ -38,6 +42,15 @@ class Config:
             "engine_module_parameter_base": "",
             "skip_method": "bypass",
             "sync_start": "none",
+            "thermal_start": "",
+            "fans_start": "",
+            "start_timeout": "600",
+            "co_schedule": "none",
+            "repeat": "1",
+            "monitor_sampling": "",
+            "monitor_raw": "none",
+            "monitor_cpu": "turbostat",
+            "monitor_ipmi": "none",
         }
         self.jobs_config = configparser.RawConfigParser(default_section="global", defaults=default_parameters)
         self.jobs_config.read(self.jobs_file)
@@ -69,6 +82,7 @@ class Config:
         """Return the list of valid keywords."""
         return [
             "runtime",
+            "warmup",
             "monitor",
             "engine",
             "engine_module",
@@ -80,8 +94,15 @@ class Config:
             "selected_cpus_scaling",
             "thermal_start",
             "fans_start",
+            "start_timeout",
             "skip_method",
             "sync_start",
+            "co_schedule",
+            "repeat",
+            "monitor_sampling",
+            "monitor_raw",
+            "monitor_cpu",
+            "monitor_ipmi",
         ]
 
     def get_directive(self, section_name, directive) -> str:
@@ -92,10 +113,42 @@ class Config:
         """Return the runtime value of a section."""
         return int(self.get_directive(section_name, "runtime"))
 
+    def get_warmup(self, section_name) -> int:
+        """Return the warm-up time of a section, run before the runtime."""
+        return int(self.get_directive(section_name, "warmup"))
+
     def get_monitor(self, section_name) -> str:
         """Return the monitor value of a section."""
         return self.get_directive(section_name, "monitor")
 
+    def get_monitor_sampling(self, section_name) -> dict[str, SamplingRate]:
+        """Return the per-source monitoring sampling rates of a section."""
+        sampling = {}
+        # PDU names are case sensitive, get_directive() cannot be used here
+        for item in self.get_section(section_name)["monitor_sampling"].split(","):
+            if not item.strip():
+                continue
+            # syntax: <source>[.<pdu_name>]:<precision_in_seconds>:<frequency>
+            source, precision, frequency = item.strip().rsplit(":", 2)
+            source, separator, pdu_name = source.partition(".")
+            sampling[f"{source.lower()}{separator}{pdu_name}"] = SamplingRate(float(precision), int(frequency))
+        return sampling
+
+    def get_monitor_raw(self, section_name) -> str:
+        """Return the monitor_raw value of a section."""
+        return self.get_directive(section_name, "monitor_raw")
+
+    def get_monitor_cpu(self) -> str:
+        """Return how the CPU metrics are collected, the monitoring is shared by all jobs."""
+        return self.get_directive("global", "monitor_cpu")
+
+    def get_monitor_ipmi(self) -> list[str]:
+        """Return the items read through the in-band IPMI source, the monitoring is shared by all jobs."""
+        value = self.get_directive("global", "monitor_ipmi")
+        if value == "none":
+            return []
+        return [item.strip() for item in value.split(",")]
+
     def get_engine(self, section_name) -> str:
         """Return the engine value of a section."""
         return self.get_directive(section_name, "engine")
@@ -224,6 +277,31 @@ class Config:
         """Return the sync_start method of a section."""
         return self.get_directive(section_name, "sync_start")
 
+    def get_thermal_start(self, section_name) -> list[StartCondition]:
+        """Return the temperatures to reach before starting the benchmarks of a section."""
+        # Sensor names are case sensitive, get_directive() cannot be used here
+        return parse_start_conditions(self.get_section(section_name)["thermal_start"])
+
+    def get_fans_start(self, section_name) -> list[StartCondition]:
+        """Return the fans speed to reach before starting the benchmarks of a section."""
+        return parse_start_conditions(self.get_section(section_name)["fans_start"])
+
+    def get_start_timeout(self, section_name) -> int:
+        """Return how long to wait for thermal_start and fans_start, in seconds."""
+        return int(self.get_directive(section_name, "start_timeout"))
+
+    def get_co_schedule(self, section_name) -> str:
+        """Return the name of the group of jobs running together, none if the job runs alone."""
+        return self.get_directive(section_name, "co_schedule")
+
+    def get_repeat(self, section_name) -> RepeatPolicy:
+        """Return how many times the benchmarks of a section run."""
+        # syntax: <runs> or <min_runs>:<max_runs>:<ci_percent>
+        fields = self.get_directive(section_name, "repeat").split(":")
+        if len(fields) == 1:
+            return RepeatPolicy(int(fields[0]), int(fields[0]))
+        return RepeatPolicy(int(fields[0]), int(fields[1]), float(fields[2]))
+
     def is_valid_keyword(self, keyword) -> bool:
         """Return if a keyword is valid"""
         return keyword in self.get_valid_keywords()
@@ -1,5 +1,9 @@
 import re
 
+from hwbench.bench.monitoring_structs import MonitoringSources
+from hwbench.bench.start_conditions import parse_start_conditions
+from hwbench.environment import ipmi
+
 
 def validate_runtime(config, section_name, value) -> str:
     """Validate the runtime syntax."""
@@ -8,6 +12,13 @@ def validate_runtime(config, section_name, value) -> str:
     return ""
 
 
+def validate_warmup(config, section_name, value) -> str:
+    """Validate the warmup syntax."""
+    if not value.isnumeric():
+        return f"{value} is not a numeric value"
+    return ""
+
+
 def validate_monitor(config, section_name, value) -> str:
     """Validate the monitor syntax."""
     if value not in ["all", "none"]:
@@ -15,6 +26,32 @@ def validate_monitor(config, section_name, value) -> str:
     return ""
 
 
+def validate_monitor_raw(config, section_name, value) -> str:
+    """Validate the monitor_raw syntax."""
+    if value not in ["all", "none"]:
+        return f"{value} is not a valid monitor_raw value"
+    return ""
+
+
+def validate_monitor_cpu(config, section_name, value) -> str:
+    """Validate the monitor_cpu syntax."""
+    if value.lower() not in ["turbostat", "native"]:
+        return f"{value} is not a valid monitor_cpu value"
+    if config.get_monitor_cpu() != value.lower():
+        return "monitor_cpu can only be set in the global section"
+    return ""
+
+
+def validate_monitor_ipmi(config, section_name, value) -> str:
+    """Validate the monitor_ipmi syntax."""
+    items = [item.strip() for item in value.lower().split(",")]
+    if items != ["none"] and any(item not in ipmi.ITEMS for item in items):
+        return f"{value} is not a valid monitor_ipmi value"
+    if config.get_section("global")["monitor_ipmi"] != value:
+        return "monitor_ipmi can only be set in the global section"
+    return ""
+
+
 def validate_engine(config, section_name, value) -> str:
     """Validate the engine syntax."""
     try:
@@ -107,11 +144,28 @@ def validate_selected_cpus_scaling(config, section_name, value) -> str:
 
 def validate_thermal_start(config, section_name, value) -> str:
     """Validate the thermal start syntax."""
+    try:
+        conditions = parse_start_conditions(value)
+    except ValueError as e:
+        return str(e)
+    if any(condition.unit for condition in conditions):
+        return "temperatures are in celsius, without unit"
     return ""
 
 
 def validate_fans_start(config, section_name, value) -> str:
     """Validate the fans start syntax."""
+    try:
+        parse_start_conditions(value)
+    except ValueError as e:
+        return str(e)
+    return ""
+
+
+def validate_start_timeout(config, section_name, value) -> str:
+    """Validate the start_timeout syntax."""
+    if not value.isnumeric():
+        return f"{value} is not a numeric value"
     return ""
 
 
@@ -127,3 +181,45 @@ def validate_sync_start(config, section_name, value) -> str:
     if value not in ["none", "time"]:
         return f"{value} is not a valid sync_start value"
     return ""
+
+
+def validate_co_schedule(config, section_name, value) -> str:
+    """Validate the co_schedule syntax."""
+    if not re.fullmatch(r"[\w.-]+", value):
+        return f"{value} is not a valid co_schedule group name"
+    return ""
+
+
+def validate_repeat(config, section_name, value) -> str:
+    """Validate the repeat syntax."""
+    match = re.fullmatch(r"(?P<min>[0-9]+)(:(?P<max>[0-9]+):(?P<ci>[0-9]*\.?[0-9]+))?", value)
+    if not match:
+        return f"{value} does not match the <runs> or <min_runs>:<max_runs>:<ci_percent> syntax"
+    if int(match.group("min")) < 1:
+        return "a benchmark must run at least once"
+    if match.group("max"):
+        if int(match.group("max")) < int(match.group("min")):
+            return f"max_runs {match.group('max')} is lower than min_runs {match.group('min')}"
+        if float(match.group("ci")) <= 0:
+            return "the confidence interval must be greater than 0 percent"
+    return ""
+
+
+def validate_monitor_sampling(config, section_name, value) -> str:
+    """Validate the monitor_sampling syntax."""
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        match = re.fullmatch(r"(?P<source>[^:]+):(?P<precision>[0-9]*\.?[0-9]+):(?P<frequency>[0-9]+)", item.strip())
+        if not match:
+            return f"'{item.strip()}' does not match the <source>:<precision>:<frequency> syntax"
+        source, _, pdu_name = match.group("source").partition(".")
+        if source.lower() not in list(MonitoringSources):
+            return f"unknown '{source}' monitoring source"
+        if pdu_name and source.lower() != MonitoringSources.PDU:
+            return f"only the {MonitoringSources.PDU} source can be selected by name"
+        if float(match.group("precision")) <= 0:
+            return f"precision of '{match.group('source')}' must be greater than 0"
+        if int(match.group("frequency")) < 1:
+            return f"frequency of '{match.group('source')}' must be at least 1"
+    return ""
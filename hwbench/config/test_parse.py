@@ -61,10 +61,22 @@ class TestParseConfig(tbc.TestCommon):
             for section in [
                 "engine_error",
                 "runtime_error",
+                "warmup_error",
                 "unknown_engine",
                 "unknown_engine_module",
                 "unknown_engine_module_parameter",
                 "unknown_monitoring",
+                "unknown_monitoring_source",
+                "invalid_monitoring_sampling",
+                "invalid_monitor_raw",
+                "invalid_monitor_cpu",
+                "job_monitor_cpu",
+                "invalid_monitor_ipmi",
+                "job_monitor_ipmi",
+                "invalid_co_schedule",
+                "invalid_repeat",
+                "invalid_thermal_start",
+                "invalid_fans_start",
             ]:
                 self.should_be_fatal(self.get_jobs_config().validate_section, section)
 
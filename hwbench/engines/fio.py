@@ -176,6 +176,9 @@ class Fio(ExternalBench):
             ["--log_avg_msec", self.log_avg_msec],
             ["--filename", self.parameters.get_custom_parameters()["disk"]],
         ]
+        if self.parameters.get_warmup():
+            # fio runs <ramp_time> seconds before its runtime, without reporting them
+            enforced_items.append(["--ramp_time", self.parameters.get_warmup()])
         for log_type in ["bw", "lat", "hist", "iops"]:
             enforced_items.append([f"--write_{log_type}_log", f"fio/{name}_{log_type}.log"])
 
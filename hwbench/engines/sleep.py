@@ -67,6 +67,12 @@ class Sleep(ExternalBench):
 
         return self.get_taskset(args)
 
+    def run_cmd_warmup(self) -> list[str]:
+        # Like stress-ng, the warm-up is a run of its own
+        if not self.parameters.get_warmup():
+            return []
+        return self.get_taskset([self.engine_module.get_engine().get_binary(), str(self.parameters.get_warmup())])
+
     def parse_cmd(self, stdout: bytes, stderr: bytes):
         # Add the score to the global output
         return self.parameters.get_result_format() | {"bogo ops/s": self.parameters.get_runtime()}
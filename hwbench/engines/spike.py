@@ -26,6 +26,9 @@ class EngineModuleCPUSpike(EngineModuleBase):
     def validate_module_parameters(self, p: BenchmarkParameters):
         msg = super().validate_module_parameters(p)
         Spike(self, p).parse_parameters()
+        if p.get_warmup():
+            # The fans behavior is studied from a cold start
+            return "warmup is not supported"
         return msg
 
     def run_cmd(self, p: BenchmarkParameters):
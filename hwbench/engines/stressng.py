@@ -100,6 +100,17 @@ class StressNG(ExternalBench):
 
         return self.get_taskset(args)
 
+    def run_cmd_warmup(self) -> list[str]:
+        # stress-ng reports the bogo ops of its whole run: the warm-up is a run of its own,
+        # so the score covers the same steady window as the monitoring and the energy.
+        if not self.parameters.get_warmup() or self.need_skip_because_version():
+            return []
+        args = self.run_cmd()
+        args[args.index("--timeout") + 1] = str(self.parameters.get_warmup())
+        yaml = args.index("--yaml")
+        del args[yaml : yaml + 2]
+        return args
+
     @property
     def name(self) -> str:
         return self.engine_module.get_engine().get_name() + self.stressor_name
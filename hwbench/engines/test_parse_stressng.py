@@ -90,6 +90,30 @@ class TestParse(unittest.TestCase):
                         output.pop(key, None)
                     assert output == json.loads((d / "output").read_bytes())
 
+    def test_warmup_cmd(self):
+        """Check the warm-up is a stress-ng run of its own, not part of the score."""
+        engine = mock_engine("v17")
+        params = BenchmarkParameters(
+            pathlib.Path(""), "qsort", 4, "", 60, "", "", MockHardware(), "none", None, "bypass", "none", warmup=10
+        )
+        test_target = StressNGQsort(EngineModuleQsort(engine, "qsort"), params)
+        test_target.parse_version(
+            pathlib.Path("./hwbench/tests/parsing/stressng/v17/version-stdout").read_bytes(), None
+        )
+        assert test_target.run_cmd() == [
+            "stress-ng",
+            "--timeout",
+            "60",
+            "--metrics",
+            "--yaml",
+            "qsort_stressng.yaml",
+            "--qsort",
+            "4",
+        ]
+        assert test_target.run_cmd_warmup() == ["stress-ng", "--timeout", "10", "--metrics", "--qsort", "4"]
+        params.warmup = 0
+        assert test_target.run_cmd_warmup() == []
+
     def test_stressng_methods(self):
         test_dir = pathlib.Path("./hwbench/tests/parsing/stressngmethods")
         for d in test_dir.iterdir():
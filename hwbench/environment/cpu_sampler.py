@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import logging
+import os
+import pathlib
+import time
+
+from hwbench.bench.monitoring_structs import MonitoringContextKeys, MonitoringContexts, MonitorMetric
+from hwbench.environment.rapl import detect_rapl_domains
+from hwbench.environment.turbostat import CORE, CPUSTATS, DRAM, PACKAGE, TurbostatColumn
+
+MSR_TSC = 0x10
+MSR_MPERF = 0xE7
+MSR_APERF = 0xE8
+
+# The metrics fed by the native sampler, stored like the turbostat ones
+COLUMNS = {
+    CPUSTATS.BUSY_PERCENT: TurbostatColumn(CPUSTATS.BUSY_PERCENT, MonitoringContextKeys.Busy, "CPU", "%"),
+    CPUSTATS.BUSY_MHZ: TurbostatColumn(CPUSTATS.BUSY_MHZ, MonitoringContextKeys.Freq, "CPU", "Mhz"),
+    CPUSTATS.PACKAGE_WATTS: TurbostatColumn(
+        CPUSTATS.PACKAGE_WATTS, MonitoringContextKeys.PowerConsumption, "CPU", "Watts", PACKAGE, total=True
+    ),
+    CPUSTATS.RAM_WATTS: TurbostatColumn(
+        CPUSTATS.RAM_WATTS, MonitoringContextKeys.PowerConsumption, "CPU", "Watts", PACKAGE, DRAM, True
+    ),
+}
+
+
+class CPUSampler:
+    """Read the CPU counters in process, an alternative to turbostat.
+
+    - the frequency and busy time of each core from the APERF/MPERF/TSC msr,
+      or the frequency from cpufreq if the msr cannot be read,
+    - the package and dram power from the powercap (RAPL) energy counters.
+
+    Like turbostat with '--cpu core', only the first cpu of each core is reported."""
+
+    def __init__(self, monitoring_contexts: MonitoringContexts, root: pathlib.Path = pathlib.Path("/")):
+        self.monitoring_contexts = monitoring_contexts
+        self.root = root
+        self.clock = time.monotonic_ns
+        self.cpus = self.__detect_cpus()
+        self.msr_fds: dict[int, int] = {}
+        self.use_msr = self.__can_read_msr()
+        self.cpufreq = {
+            cpu: root / f"sys/devices/system/cpu/cpu{cpu}/cpufreq/scaling_cur_freq"
+            for cpu in self.cpus
+            if (root / f"sys/devices/system/cpu/cpu{cpu}/cpufreq/scaling_cur_freq").is_file()
+        }
+        rapl = detect_rapl_domains(root)
+        self.packages, self.drams = rapl[PACKAGE], rapl[DRAM]
+        # Previous msr values of each cpu: aperf, mperf, tsc
+        self.last_msr: dict[int, tuple[int, int, int]] = {}
+        self.last_sample_ns = 0
+        self.reinitialize_metrics()
+
+    def __detect_cpus(self) -> list[int]:
+        """Return the first cpu of every core"""
+        cpus = []
+        for cpu_dir in (self.root / "sys/devices/system/cpu").glob("cpu[0-9]*"):
+            cpu = int(cpu_dir.name[3:])
+            # An offline cpu, like the hyperthreads with nosmt, has no topology nor msr
+            online = cpu_dir / "online"
+            if online.is_file() and online.read_text().strip() == "0":
+                continue
+            siblings = cpu_dir / "topology/thread_siblings_list"
+            if siblings.is_file():
+                # thread_siblings_list is like '0,64' or '0-1'
+                first = siblings.read_text().strip().replace("-", ",").split(",")[0]
+                if int(first) != cpu:
+                    continue
+            cpus.append(cpu)
+        return sorted(cpus)
+
+    def __can_read_msr(self) -> bool:
+        if not self.cpus:
+            return False
+        try:
+            with open(self.__msr_path(self.cpus[0]), "rb") as msr:
+                os.pread(msr.fileno(), 8, MSR_APERF)
+        except OSError as e:
+            logging.info(f"CPUSampler: cannot read msr ({e}), using cpufreq")
+            return False
+        return True
+
+    def __msr_path(self, cpu: int) -> pathlib.Path:
+        return self.root / f"dev/cpu/{cpu}/msr"
+
+    def read_msr(self, cpu: int, register: int) -> int:
+        """Return a msr of a cpu, the file offset is the register number"""
+        return int.from_bytes(os.pread(self.msr_fds[cpu], 8, register), "little")
+
+    def is_available(self) -> bool:
+        """Return if the CPU frequency can be read"""
+        return self.use_msr or bool(self.cpufreq)
+
+    def has(self, metric) -> bool:
+        """Return if the sampler reports a given turbostat metric"""
+        if metric == CPUSTATS.BUSY_MHZ:
+            return self.is_available()
+        if metric == CPUSTATS.BUSY_PERCENT:
+            return self.use_msr
+        if metric == CPUSTATS.PACKAGE_WATTS:
+            return bool(self.packages)
+        if metric == CPUSTATS.RAM_WATTS:
+            return bool(self.drams)
+        return False
+
+    def get_cores_count(self) -> int:
+        return len(self.cpus)
+
+    def get_components(self) -> list[str]:
+        """Return the monitoring components fed by the sampler"""
+        return list(dict.fromkeys(column.get_components() for stat, column in COLUMNS.items() if self.has(stat)))
+
+    def reinitialize_metrics(self):
+        """Create the metrics in the monitoring contexts"""
+        for stat, column in COLUMNS.items():
+            if not self.has(stat):
+                continue
+            family = self.monitoring_contexts.get_family(column.context, column.family)
+            if column.scope == CORE:
+                names = [f"Core_{cpu}" for cpu in self.cpus]
+            else:
+                domains = self.packages if stat == CPUSTATS.PACKAGE_WATTS else self.drams
+                names = [f"{column.prefix}_{package}" for package in domains] + [column.prefix]
+            for name in names:
+                family[name] = MonitorMetric(name, column.unit)
+
+    def start_background(self):
+        """Open the msr devices and read the counters a first time"""
+        if self.use_msr:
+            for cpu in list(self.cpus):
+                try:
+                    self.msr_fds[cpu] = os.open(self.__msr_path(cpu), os.O_RDONLY)
+                except OSError as e:
+                    self.__drop_msr(cpu, e)
+        self.last_msr = {}
+        for domain in [*self.packages.values(), *self.drams.values()]:
+            domain.last_energy_uj = None
+        self.sample()
+
+    def __drop_msr(self, cpu: int, error: OSError) -> None:
+        """Read a cpu whose msr cannot be opened from cpufreq, or stop reporting it"""
+        self.monitoring_contexts.Busy.CPU.pop(f"Core_{cpu}", None)
+        if cpu in self.cpufreq:
+            logging.warning(f"CPUSampler: cannot open the msr of cpu{cpu} ({error}), using cpufreq")
+            return
+        logging.warning(f"CPUSampler: cannot open the msr of cpu{cpu} ({error}), it is not reported")
+        self.cpus.remove(cpu)
+        self.monitoring_contexts.Freq.CPU.pop(f"Core_{cpu}", None)
+
+    def stop_background(self):
+        for fd in self.msr_fds.values():
+            os.close(fd)
+        self.msr_fds = {}
+
+    def trigger_sample(self) -> None:
+        """The counters are read synchronously by get_and_parse_sample()"""
+
+    def get_and_parse_sample(self, precision_s: float, contexts: MonitoringContexts | None = None) -> int:
+        """Read the counters and add the values to contexts, the monitoring contexts by default.
+
+        Returns when (in monotonic time) the counters were read."""
+        self.sample(contexts)
+        return self.last_sample_ns
+
+    def __add(self, contexts: MonitoringContexts, stat: CPUSTATS, name: str, value: float) -> None:
+        """Add a value to a metric created by reinitialize_metrics()"""
+        column = COLUMNS[stat]
+        if name not in self.monitoring_contexts.get_family(column.context, column.family):
+            return
+        family = contexts.get_family(column.context, column.family)
+        if name not in family:
+            family[name] = MonitorMetric(name, column.unit)
+        family[name].add(value)
+
+    def sample(self, contexts: MonitoringContexts | None = None) -> None:
+        """Read all the counters, values are computed from the previous read"""
+        now_ns = self.clock()
+        elapsed_s = (now_ns - self.last_sample_ns) * 1e-9 if self.last_sample_ns else 0
+        self.last_sample_ns = now_ns
+        contexts = contexts or self.monitoring_contexts
+
+        if self.use_msr:
+            for cpu in self.msr_fds:
+                current = (
+                    self.read_msr(cpu, MSR_APERF),
+                    self.read_msr(cpu, MSR_MPERF),
+                    self.read_msr(cpu, MSR_TSC),
+                )
+                last = self.last_msr.get(cpu)
+                self.last_msr[cpu] = current
+                if not last or not elapsed_s:
+                    continue
+                aperf, mperf, tsc = (current[i] - last[i] for i in range(3))
+                if not mperf or not tsc:
+                    continue
+                # Like turbostat: Busy% = MPERF/TSC, Bzy_MHz = TSC_MHz * APERF/MPERF
+                self.__add(contexts, CPUSTATS.BUSY_PERCENT, f"Core_{cpu}", 100 * mperf / tsc)
+                self.__add(contexts, CPUSTATS.BUSY_MHZ, f"Core_{cpu}", tsc / elapsed_s / 1e6 * aperf / mperf)
+        if elapsed_s:
+            for cpu, cpufreq in self.cpufreq.items():
+                if cpu in self.msr_fds:
+                    continue
+                # scaling_cur_freq is in kHz
+                self.__add(contexts, CPUSTATS.BUSY_MHZ, f"Core_{cpu}", int(cpufreq.read_text()) / 1000)
+
+        for stat, domains in [(CPUSTATS.PACKAGE_WATTS, self.packages), (CPUSTATS.RAM_WATTS, self.drams)]:
+            prefix = COLUMNS[stat].prefix
+            total = 0.0
+            for package, domain in domains.items():
+                delta_uj = domain.get_delta_uj()
+                if delta_uj is None or not elapsed_s:
+                    continue
+                watts = delta_uj * 1e-6 / elapsed_s
+                self.__add(contexts, stat, f"{prefix}_{package}", watts)
+                total += watts
+            if domains and elapsed_s:
+                self.__add(contexts, stat, prefix, total)
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+import select
+import subprocess
+import threading
+import time
+
+from hwbench.bench.monitoring_structs import (
+    Power,
+    PowerCategories,
+    PowerConsumptionContext,
+    Temperature,
+    ThermalContext,
+)
+
+IPMI = "IPMI"
+PROMPT = b"ipmitool> "
+# The terminal control sequences readline may output around the prompt
+ESCAPE_SEQUENCES = re.compile(r"\x1b\[[0-9;?]*[a-zA-Z]")
+DCMI_POWER = re.compile(r"Instantaneous power reading:\s+(?P<watts>[0-9.]+)\s+Watts")
+SDR_TEMPERATURE = re.compile(r"(?P<celsius>-?[0-9.]+)\s+degrees C")
+
+# The items that can be read by the ipmi source
+DCMI = "dcmi"
+SDR = "sdr"
+ITEMS = [DCMI, SDR]
+
+
+class IpmiShell:
+    """A long-lived 'ipmitool shell' process.
+
+    The commands are written on its stdin, an answer ends when the next prompt
+    is printed: no process is forked per command, and ipmitool keeps its SDR
+    repository cache between the commands."""
+
+    def __init__(self, command: list[str] | None = None):
+        self.command = command or ["ipmitool", "shell"]
+        self.process: subprocess.Popen[bytes] | None = None
+        self.lock = threading.Lock()
+
+    def __del__(self):
+        self.stop()
+
+    def is_running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self, timeout_s: float = 10):
+        self.process = subprocess.Popen(
+            self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
+        self.__read_answer(timeout_s)
+
+    def stop(self):
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        for pipe in [self.process.stdin, self.process.stdout]:
+            if pipe:
+                pipe.close()
+        self.process = None
+
+    def run(self, command: str, timeout_s: float = 5) -> str:
+        """Run an ipmitool command, return its output.
+
+        The shell is (re)started if needed, and stopped if it does not answer in time."""
+        with self.lock:
+            try:
+                if not self.is_running():
+                    self.start()
+                assert self.process
+                assert self.process.stdin
+                self.process.stdin.write(command.encode() + b"\n")
+                self.process.stdin.flush()
+                output = self.__read_answer(timeout_s)
+            except (OSError, TimeoutError):
+                self.stop()
+                raise
+        lines = output.splitlines()
+        # readline echoes the command when stdin is not a terminal
+        if lines and lines[0].strip() == command:
+            lines = lines[1:]
+        return "\n".join(lines)
+
+    def __read_answer(self, timeout_s: float) -> str:
+        """Read the output until the next prompt"""
+        assert self.process
+        assert self.process.stdout
+        fd = self.process.stdout.fileno()
+        deadline = time.monotonic() + timeout_s
+        output = b""
+        while PROMPT not in output[output.rfind(b"\n") + 1 :]:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"{' '.join(self.command)} did not answer within {timeout_s}s")
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise OSError(f"{' '.join(self.command)} exited")
+            output += chunk
+        output = output[: output.rfind(PROMPT)]
+        return ESCAPE_SEQUENCES.sub("", output.decode("utf-8", "ignore")).replace("\r", "")
+
+
+def parse_dcmi_power(output: str) -> float | None:
+    """Return the instantaneous power of a 'dcmi power reading' output"""
+    match = DCMI_POWER.search(output)
+    return float(match.group("watts")) if match else None
+
+
+def parse_sdr_temperatures(output: str) -> dict[str, float]:
+    """Return the readings of a 'sdr type Temperature' output, by sensor name
+
+    Lines are like 'Inlet Temp       | 04h | ok  |  7.1 | 23 degrees C',
+    sensors sharing a name, like the CPU ones, are suffixed by their id.
+    A reading is kept whatever the sensor status: the non critical (nc),
+    critical (cr) and non recoverable (nr) ones are the hottest."""
+    temperatures = {}
+    for line in output.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) != 5:
+            continue
+        name, sensor_id, _, _, reading = fields
+        match = SDR_TEMPERATURE.search(reading)
+        if match:
+            if name in temperatures:
+                name = f"{name} {sensor_id}"
+            temperatures[name] = float(match.group("celsius"))
+    return temperatures
+
+
+class IpmiSampler:
+    """Read the BMC sensors in-band, through a persistent ipmitool shell.
+
+    - the server power consumption from 'dcmi power reading',
+    - the temperature sensors from 'sdr type Temperature'.
+
+    The values are reported in the IPMI family of the PowerConsumption and
+    Thermal contexts, next to the Redfish ones they can be compared with."""
+
+    def __init__(self, items: list[str], shell: IpmiShell | None = None):
+        self.items = items
+        self.shell = shell or IpmiShell()
+        self.dcmi = False
+        self.sdr = False
+
+    def __run(self, command: str) -> str:
+        try:
+            return self.shell.run(command)
+        except (OSError, TimeoutError) as e:
+            logging.warning(f"IPMI: '{command}' failed: {e}")
+            return ""
+
+    def detect(self):
+        """Detect which items the BMC can report"""
+        self.dcmi = DCMI in self.items and parse_dcmi_power(self.__run("dcmi power reading")) is not None
+        self.sdr = SDR in self.items and bool(parse_sdr_temperatures(self.__run("sdr type Temperature")))
+
+    def is_available(self) -> bool:
+        return self.dcmi or self.sdr
+
+    def get_components(self) -> list[str]:
+        """Return the monitoring components fed by the sampler"""
+        components = []
+        if self.dcmi:
+            components.append(f"PowerConsumption.{IPMI}")
+        if self.sdr:
+            components.append(f"Thermal.{IPMI}")
+        return components
+
+    def read_power_consumption(self, power_consumption: PowerConsumptionContext) -> PowerConsumptionContext:
+        """Return the server power consumption reported by DCMI"""
+        if not self.dcmi:
+            return power_consumption
+        watts = parse_dcmi_power(self.__run("dcmi power reading"))
+        if watts is not None:
+            name = str(PowerCategories.SERVER)
+            if name not in power_consumption.IPMI:
+                power_consumption.IPMI[name] = Power(name)
+            power_consumption.IPMI[name].add(watts)
+        return power_consumption
+
+    def read_thermals(self, thermals: ThermalContext) -> ThermalContext:
+        """Return the temperature sensors of the SDR"""
+        if not self.sdr:
+            return thermals
+        for sensor, celsius in parse_sdr_temperatures(self.__run("sdr type Temperature")).items():
+            if sensor not in thermals[IPMI]:
+                thermals[IPMI][sensor] = Temperature(sensor)
+            thermals[IPMI][sensor].add(celsius)
+        return thermals
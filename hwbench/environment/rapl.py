@@ -0,0 +1,153 @@
+"""RAPL energy counters, exposed by the powercap framework in /sys/class/powercap.
+
+Each package has an intel-rapl:<package> zone, and sub zones intel-rapl:<package>:<domain>
+like the dram. energy_uj is a counter in micro joules, wrapping around at max_energy_range_uj.
+"""
+
+from __future__ import annotations
+
+import pathlib
+import threading
+import time
+from dataclasses import dataclass, field
+
+from hwbench.environment.turbostat import DRAM, PACKAGE
+
+
+class RaplDomain:
+    """A powercap energy counter, in micro joules"""
+
+    def __init__(self, path: pathlib.Path, name: str):
+        self.path = path
+        self.name = name
+        self.max_energy_range_uj = int((path / "max_energy_range_uj").read_text())
+        self.last_energy_uj: int | None = None
+
+    def read_energy_uj(self) -> int:
+        return int((self.path / "energy_uj").read_text())
+
+    def get_delta_uj(self) -> int | None:
+        """Return the energy consumed since the previous call, None at the first call"""
+        energy_uj = self.read_energy_uj()
+        last_energy_uj, self.last_energy_uj = self.last_energy_uj, energy_uj
+        if last_energy_uj is None:
+            return None
+        # The counter wraps around at max_energy_range_uj
+        if energy_uj < last_energy_uj:
+            energy_uj += self.max_energy_range_uj
+        return energy_uj - last_energy_uj
+
+
+def detect_rapl_domains(root: pathlib.Path = pathlib.Path("/")) -> dict[str, dict[str, RaplDomain]]:
+    """Return the package and dram energy counters, by package number"""
+    domains: dict[str, dict[str, RaplDomain]] = {PACKAGE: {}, DRAM: {}}
+    for zone in sorted((root / "sys/class/powercap").glob("intel-rapl:*")):
+        try:
+            name = (zone / "name").read_text().strip()
+            package = zone.name.split(":")[1]
+            if name.startswith("package"):
+                domains[PACKAGE][package] = RaplDomain(zone, name)
+            elif name == DRAM:
+                domains[DRAM][package] = RaplDomain(zone, name)
+        except (OSError, ValueError, IndexError):
+            continue
+    return domains
+
+
+@dataclass
+class EnergyDomain:
+    """Energy consumed by a RAPL domain"""
+
+    joules: float = 0
+    watts: float = 0
+
+
+@dataclass
+class EnergyMeasure:
+    """Energy consumed by every RAPL domain during a benchmark.
+
+    Domains are package_<package>, dram_<package> and the sum of all packages: package and dram."""
+
+    duration_s: float = 0
+    domains: dict[str, EnergyDomain] = field(default_factory=dict)
+
+    def get_joules(self) -> float:
+        """Return the CPU and DRAM energy"""
+        return sum(self.domains[total].joules for total in [PACKAGE, DRAM] if total in self.domains)
+
+
+class RaplEnergy:
+    """Measure the exact energy consumed between start() and stop().
+
+    The counters are read every update_interval_s, in the background, so
+    a counter wrapping around several times during a long benchmark is not missed."""
+
+    def __init__(self, root: pathlib.Path = pathlib.Path("/"), update_interval_s: float = 10):
+        self.domains = detect_rapl_domains(root)
+        self.update_interval_s = update_interval_s
+        self.clock = time.monotonic_ns
+        self.joules: dict[str, dict[str, float]] = {}
+        self.start_ns = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.updater: threading.Thread | None = None
+        self.delayed_start: threading.Timer | None = None
+
+    def is_available(self) -> bool:
+        return bool(self.domains[PACKAGE])
+
+    def update(self):
+        """Add the energy consumed since the previous read"""
+        with self.lock:
+            for kind, domains in self.domains.items():
+                for package, domain in domains.items():
+                    delta_uj = domain.get_delta_uj()
+                    if delta_uj is not None:
+                        self.joules[kind][package] += delta_uj * 1e-6
+
+    def __update_loop(self):
+        while not self.stopped.wait(self.update_interval_s):
+            self.update()
+
+    def start(self):
+        """Snapshot the counters and start updating them in the background"""
+        self.joules = {kind: dict.fromkeys(domains, 0.0) for kind, domains in self.domains.items()}
+        for domains in self.domains.values():
+            for domain in domains.values():
+                domain.last_energy_uj = None
+        self.start_ns = self.clock()
+        self.update()
+        self.stopped.clear()
+        self.updater = threading.Thread(target=self.__update_loop, daemon=True)
+        self.updater.start()
+
+    def stop(self) -> EnergyMeasure:
+        """Snapshot the counters and return the energy consumed since start()"""
+        self.update()
+        duration_s = (self.clock() - self.start_ns) * 1e-9
+        self.stopped.set()
+        if self.updater:
+            self.updater.join()
+        measure = EnergyMeasure(duration_s)
+        for kind, packages in self.joules.items():
+            if not packages:
+                continue
+            for package, joules in packages.items():
+                measure.domains[f"{kind}_{package}"] = EnergyDomain(joules, joules / duration_s if duration_s else 0)
+            total = sum(packages.values())
+            measure.domains[kind] = EnergyDomain(total, total / duration_s if duration_s else 0)
+        return measure
+
+    def start_after(self, delay_s: float):
+        """Start measuring after delay_s seconds, like at the end of a warm-up"""
+        self.delayed_start = threading.Timer(delay_s, self.start)
+        self.delayed_start.start()
+
+    def stop_delayed(self) -> EnergyMeasure | None:
+        """Stop a measure started by start_after(), None if it did not start yet"""
+        if self.delayed_start:
+            self.delayed_start.cancel()
+            self.delayed_start.join()
+        if not self.updater:
+            return None
+        return self.stop()
@@ -0,0 +1,178 @@
+import pathlib
+import tempfile
+from unittest.mock import patch
+
+from hwbench.bench.monitoring_structs import MonitoringContexts
+
+from .cpu_sampler import MSR_APERF, MSR_MPERF, MSR_TSC, CPUSampler
+from .turbostat import CPUSTATS
+
+
+class FakeSystem:
+    """A fake sysfs/devfs tree: 2 cores with 2 threads, 1 package"""
+
+    def __init__(self, root: pathlib.Path, msr: bool = True):
+        self.root = root
+        # The msr file offsets are register numbers, registers cannot be stored in a regular file
+        self.msr: dict[int, dict[int, int]] = {}
+        for cpu, siblings in [(0, "0,2"), (1, "1,3"), (2, "0,2"), (3, "1,3")]:
+            cpu_dir = root / f"sys/devices/system/cpu/cpu{cpu}"
+            (cpu_dir / "topology").mkdir(parents=True)
+            (cpu_dir / "topology/thread_siblings_list").write_text(f"{siblings}\n")
+            (cpu_dir / "cpufreq").mkdir()
+            (cpu_dir / "cpufreq/scaling_cur_freq").write_text("2500000\n")
+            if msr:
+                (root / f"dev/cpu/{cpu}").mkdir(parents=True)
+                (root / f"dev/cpu/{cpu}/msr").write_bytes(bytes(8 * (MSR_APERF + 1)))
+                self.set_msr(cpu, 0, 0, 0)
+        for zone, name in [("intel-rapl:0", "package-0"), ("intel-rapl:0:0", "dram")]:
+            (root / f"sys/class/powercap/{zone}").mkdir(parents=True)
+            (root / f"sys/class/powercap/{zone}/name").write_text(f"{name}\n")
+            (root / f"sys/class/powercap/{zone}/max_energy_range_uj").write_text("1000000000\n")
+            self.set_energy(zone, 0)
+
+    def add_offline_cpu(self, cpu: int):
+        """An offline cpu has no topology, cpufreq nor msr"""
+        cpu_dir = self.root / f"sys/devices/system/cpu/cpu{cpu}"
+        cpu_dir.mkdir(parents=True)
+        (cpu_dir / "online").write_text("0\n")
+
+    def set_msr(self, cpu: int, aperf: int, mperf: int, tsc: int):
+        self.msr[cpu] = {MSR_APERF: aperf, MSR_MPERF: mperf, MSR_TSC: tsc}
+
+    def read_msr(self, cpu: int, register: int) -> int:
+        return self.msr[cpu][register]
+
+    def set_energy(self, zone: str, energy_uj: int):
+        (self.root / f"sys/class/powercap/{zone}/energy_uj").write_text(f"{energy_uj}\n")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now_ns = 1_000_000_000
+
+    def __call__(self) -> int:
+        return self.now_ns
+
+
+class TestCPUSampler:
+    def get_sampler(self, root: pathlib.Path, contexts: MonitoringContexts) -> tuple[CPUSampler, FakeClock]:
+        sampler = CPUSampler(contexts, root)
+        clock = FakeClock()
+        sampler.clock = clock
+        sampler.start_background()
+        return sampler, clock
+
+    def test_msr_and_rapl(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = pathlib.Path(tmpdir)
+            system = FakeSystem(root)
+            contexts = MonitoringContexts()
+            read_msr = patch.object(CPUSampler, "read_msr", lambda _, cpu, register: system.read_msr(cpu, register))
+            with read_msr:
+                sampler, clock = self.get_sampler(root, contexts)
+                assert sampler.is_available()
+                assert sampler.get_cores_count() == 2
+                assert not sampler.has(CPUSTATS.IPC)
+                assert sampler.get_components() == ["Busy.CPU", "Freq.CPU", "PowerConsumption.CPU"]
+
+                # 1 second at a 2GHz TSC, cpu0 is busy half of the time at 3GHz
+                clock.now_ns += 1_000_000_000
+                system.set_msr(0, 1_500_000_000, 1_000_000_000, 2_000_000_000)
+                system.set_msr(1, 200_000_000, 200_000_000, 2_000_000_000)
+                system.set_energy("intel-rapl:0", 150_000_000)
+                system.set_energy("intel-rapl:0:0", 10_000_000)
+                assert sampler.get_and_parse_sample(1) == clock.now_ns
+
+                assert contexts.Busy.CPU["Core_0"].get_values()[-1] == 50
+                assert contexts.Freq.CPU["Core_0"].get_values()[-1] == 3000
+                assert contexts.Busy.CPU["Core_1"].get_values()[-1] == 10
+                assert contexts.Freq.CPU["Core_1"].get_values()[-1] == 2000
+                # The hyperthreads are not reported
+                assert "Core_2" not in contexts.Freq.CPU
+                power = contexts.PowerConsumption.CPU
+                assert power["package_0"].get_values()[-1] == 150
+                assert power["package"].get_values()[-1] == 150
+                assert power["dram"].get_values()[-1] == 10
+
+                # The energy counter wraps around
+                clock.now_ns += 500_000_000
+                system.set_energy("intel-rapl:0", 50_000_000)
+                sampler.get_and_parse_sample(1)
+                assert round(power["package_0"].get_values()[-1]) == 1800
+                sampler.stop_background()
+
+    def test_cpufreq(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = pathlib.Path(tmpdir)
+            FakeSystem(root, msr=False)
+            contexts = MonitoringContexts()
+            sampler, clock = self.get_sampler(root, contexts)
+            assert sampler.is_available()
+            assert not sampler.has(CPUSTATS.BUSY_PERCENT)
+            assert "Core_0" not in contexts.Busy.CPU
+            clock.now_ns += 1_000_000_000
+            sampler.get_and_parse_sample(1)
+            assert contexts.Freq.CPU["Core_1"].get_values()[-1] == 2500
+
+            # A read in its own contexts does not touch the monitoring ones
+            read_contexts = MonitoringContexts()
+            clock.now_ns += 1_000_000_000
+            sampler.get_and_parse_sample(1, read_contexts)
+            assert read_contexts.Freq.CPU["Core_1"].get_values().tolist() == [2500]
+            assert len(contexts.Freq.CPU["Core_1"].get_values()) == 1
+
+    def test_offline_cpu(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = pathlib.Path(tmpdir)
+            system = FakeSystem(root)
+            system.add_offline_cpu(4)
+            (root / "sys/devices/system/cpu/cpu1/online").write_text("1\n")
+            contexts = MonitoringContexts()
+            read_msr = patch.object(CPUSampler, "read_msr", lambda _, cpu, register: system.read_msr(cpu, register))
+            with read_msr:
+                sampler, clock = self.get_sampler(root, contexts)
+                assert sampler.cpus == [0, 1]
+                assert "Core_4" not in contexts.Freq.CPU
+                clock.now_ns += 1_000_000_000
+                system.set_msr(0, 2_000_000_000, 2_000_000_000, 2_000_000_000)
+                system.set_msr(1, 2_000_000_000, 2_000_000_000, 2_000_000_000)
+                sampler.get_and_parse_sample(1)
+                assert contexts.Freq.CPU["Core_1"].get_values()[-1] == 2000
+                sampler.stop_background()
+
+    def test_msr_open_failure(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = pathlib.Path(tmpdir)
+            system = FakeSystem(root)
+            contexts = MonitoringContexts()
+            sampler = CPUSampler(contexts, root)
+            clock = FakeClock()
+            sampler.clock = clock
+            # cpu1 went offline after the msr were probed on cpu0
+            (root / "dev/cpu/1/msr").unlink()
+            read_msr = patch.object(CPUSampler, "read_msr", lambda _, cpu, register: system.read_msr(cpu, register))
+            with read_msr:
+                sampler.start_background()
+                assert list(sampler.msr_fds) == [0]
+                # Its frequency is read from cpufreq, its busy time is not known
+                assert "Core_1" not in contexts.Busy.CPU
+                clock.now_ns += 1_000_000_000
+                system.set_msr(0, 3_000_000_000, 2_000_000_000, 2_000_000_000)
+                sampler.get_and_parse_sample(1)
+                assert contexts.Freq.CPU["Core_0"].get_values()[-1] == 3000
+                assert contexts.Freq.CPU["Core_1"].get_values()[-1] == 2500
+                sampler.stop_background()
+
+                # Without cpufreq, the cpu is not reported anymore
+                (root / "dev/cpu/0/msr").unlink()
+                (root / "sys/devices/system/cpu/cpu0/cpufreq/scaling_cur_freq").unlink()
+                del sampler.cpufreq[0]
+                sampler.start_background()
+                assert sampler.cpus == [1]
+                assert "Core_0" not in contexts.Freq.CPU
+                sampler.stop_background()
+
+    def test_unavailable(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            assert not CPUSampler(MonitoringContexts(), pathlib.Path(tmpdir)).is_available()
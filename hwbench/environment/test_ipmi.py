@@ -0,0 +1,106 @@
+import sys
+
+import pytest
+
+from hwbench.bench.monitoring_structs import PowerConsumptionContext, ThermalContextFactory
+
+from .ipmi import IpmiSampler, IpmiShell, parse_dcmi_power, parse_sdr_temperatures
+
+DCMI_OUTPUT = """
+    Instantaneous power reading:                   312 Watts
+    Minimum during sampling period:                 96 Watts
+    Maximum during sampling period:                584 Watts
+    Average power reading over sample period:      298 Watts
+    IPMI timestamp:                           Thu Jan  1 00:00:00 2026
+    Sampling period:                          00000001 Seconds.
+    Power reading state is:                   activated
+"""
+
+SDR_OUTPUT = """Inlet Temp       | 04h | ok  |  7.1 | 23 degrees C
+Exhaust Temp     | 01h | ok  |  7.1 | 38 degrees C
+Temp             | 0Eh | ok  |  3.1 | 54 degrees C
+Temp             | 0Fh | ok  |  3.2 | 51 degrees C
+Temp             | 10h | ns  |  3.3 | Disabled"""
+
+# A fake 'ipmitool shell': it echoes the commands like readline does without a terminal,
+# 'hang' never answers and 'exit' kills the shell.
+FAKE_SHELL = f"""
+import sys, time
+answers = {{"dcmi power reading": {DCMI_OUTPUT!r}, "sdr type Temperature": {SDR_OUTPUT!r}}}
+sys.stdout.write("ipmitool> ")
+sys.stdout.flush()
+for line in sys.stdin:
+    command = line.strip()
+    if command == "hang":
+        time.sleep(60)
+    if command == "exit":
+        sys.exit(0)
+    sys.stdout.write(command + "\\n" + answers.get(command, "Invalid command: " + command) + "\\nipmitool> ")
+    sys.stdout.flush()
+"""
+
+
+def fake_shell() -> IpmiShell:
+    return IpmiShell([sys.executable, "-c", FAKE_SHELL])
+
+
+class TestIpmi:
+    def test_parse(self):
+        assert parse_dcmi_power(DCMI_OUTPUT) == 312
+        assert parse_dcmi_power("Error: No response") is None
+        # Sensors without a reading are ignored
+        assert parse_sdr_temperatures(SDR_OUTPUT) == {
+            "Inlet Temp": 23,
+            "Exhaust Temp": 38,
+            "Temp": 54,
+            "Temp 0Fh": 51,
+        }
+        # The sensors above their thresholds are the ones a thermal benchmark needs
+        hot = "Temp             | 0Eh | nc  |  3.1 | 91 degrees C\nTemp             | 0Fh | cr  |  3.2 | 98 degrees C"
+        assert parse_sdr_temperatures(hot) == {"Temp": 91, "Temp 0Fh": 98}
+
+    def test_shell(self):
+        shell = fake_shell()
+        try:
+            assert shell.run("dcmi power reading") == DCMI_OUTPUT
+            process = shell.process
+            assert shell.run("sdr type Temperature") == SDR_OUTPUT
+            # The same process answers all the commands
+            assert shell.process is process
+
+            # A dead shell is restarted on the next command
+            with pytest.raises(OSError, match="exited"):
+                shell.run("exit")
+            assert shell.process is None
+            assert parse_dcmi_power(shell.run("dcmi power reading")) == 312
+
+            # A hung shell is stopped
+            with pytest.raises(TimeoutError, match="did not answer"):
+                shell.run("hang", timeout_s=0.5)
+            assert not shell.is_running()
+        finally:
+            shell.stop()
+
+    def test_sampler(self):
+        sampler = IpmiSampler(["dcmi", "sdr"], fake_shell())
+        try:
+            sampler.detect()
+            assert sampler.get_components() == ["PowerConsumption.IPMI", "Thermal.IPMI"]
+            power = sampler.read_power_consumption(PowerConsumptionContext())
+            assert power.IPMI["Server"].get_values().tolist() == [312]
+            thermals = sampler.read_thermals(ThermalContextFactory())
+            assert list(thermals["IPMI"]) == ["Inlet Temp", "Exhaust Temp", "Temp", "Temp 0Fh"]
+            assert thermals["IPMI"]["Temp 0Fh"].get_values().tolist() == [51]
+        finally:
+            sampler.shell.stop()
+
+    def test_unavailable(self):
+        # Only the requested items are read
+        sampler = IpmiSampler(["sdr"], fake_shell())
+        sampler.detect()
+        assert sampler.get_components() == ["Thermal.IPMI"]
+        sampler.shell.stop()
+
+        sampler = IpmiSampler(["dcmi", "sdr"], IpmiShell(["/nonexistent/ipmitool", "shell"]))
+        sampler.detect()
+        assert not sampler.is_available()
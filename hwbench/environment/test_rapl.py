@@ -0,0 +1,77 @@
+import pathlib
+import tempfile
+
+from .rapl import RaplEnergy
+
+MAX_ENERGY_RANGE_UJ = 262143328850
+
+
+def set_energy(root: pathlib.Path, zone: str, energy_uj: int):
+    (root / f"sys/class/powercap/{zone}/energy_uj").write_text(f"{energy_uj}\n")
+
+
+def create_zones(root: pathlib.Path):
+    """Two packages with their dram"""
+    for zone, name in [
+        ("intel-rapl:0", "package-0"),
+        ("intel-rapl:0:0", "dram"),
+        ("intel-rapl:1", "package-1"),
+        ("intel-rapl:1:0", "dram"),
+    ]:
+        (root / f"sys/class/powercap/{zone}").mkdir(parents=True)
+        (root / f"sys/class/powercap/{zone}/name").write_text(f"{name}\n")
+        (root / f"sys/class/powercap/{zone}/max_energy_range_uj").write_text(f"{MAX_ENERGY_RANGE_UJ}\n")
+        set_energy(root, zone, 1000)
+
+
+class TestRapl:
+    def test_energy(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = pathlib.Path(tmpdir)
+            create_zones(root)
+            now_ns = [0]
+            energy = RaplEnergy(root, update_interval_s=3600)
+            energy.clock = lambda: now_ns[0]
+            assert energy.is_available()
+            energy.start()
+
+            # package-0 wraps around twice, seen by the background updates
+            set_energy(root, "intel-rapl:0", 0)
+            energy.update()
+            set_energy(root, "intel-rapl:0", MAX_ENERGY_RANGE_UJ - 1000)
+            energy.update()
+            set_energy(root, "intel-rapl:0", 1000)
+            set_energy(root, "intel-rapl:0:0", 1000 + 50_000_000)
+            set_energy(root, "intel-rapl:1", 1000 + 100_000_000)
+            now_ns[0] = 10_000_000_000
+            measure = energy.stop()
+
+            assert measure.duration_s == 10
+            package_0 = 2 * MAX_ENERGY_RANGE_UJ * 1e-6
+            assert round(measure.domains["package_0"].joules, 6) == round(package_0, 6)
+            assert measure.domains["package_1"].joules == 100
+            assert measure.domains["package_1"].watts == 10
+            assert measure.domains["dram_0"].joules == 50
+            assert measure.domains["dram_1"].joules == 0
+            assert round(measure.domains["package"].joules, 6) == round(package_0 + 100, 6)
+            assert measure.domains["dram"].watts == 5
+            assert round(measure.get_joules(), 6) == round(package_0 + 150, 6)
+
+    def test_unavailable(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            assert not RaplEnergy(pathlib.Path(tmpdir)).is_available()
+
+    def test_delayed_start(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = pathlib.Path(tmpdir)
+            create_zones(root)
+            energy = RaplEnergy(root, update_interval_s=3600)
+            # Stopped before the end of the warm-up
+            energy.start_after(3600)
+            assert energy.stop_delayed() is None
+            energy.start_after(0)
+            assert energy.delayed_start
+            energy.delayed_start.join()
+            measure = energy.stop_delayed()
+            assert measure is not None
+            assert "package" in measure.domains
@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+import types
+from io import BytesIO
+from unittest.mock import MagicMock, patch
+
+from hwbench.bench.monitoring_structs import MonitoringContexts
+
+from .turbostat import DTS, Turbostat
+
+HEADER = "Node\tCore\tCPU\tBusy%\tBzy_MHz"
+
+# Two packages of two cores, package columns are only reported on the first core of each package
+TWO_PACKAGES = [
+    "Package\tCore\tCPU\tBusy%\tBzy_MHz\tTSC_MHz\tC1%\tCPU%c6\tCoreTmp\tCorWatt\tPkgTmp\tPkg%pc6\tPkgWatt\tRAMWatt",
+    "-\t-\t-\t50.00\t3000\t2000\t10.00\t40.00\t60\t5.00\t62\t0.00\t200.00\t20.00",
+    "0\t0\t0\t90.00\t3100\t2000\t5.00\t5.00\t65\t6.00\t66\t0.00\t110.00\t12.00",
+    "0\t1\t1\t10.00\t3000\t2000\t20.00\t70.00\t55\t4.00",
+    "1\t0\t2\t80.00\t2900\t2000\t5.00\t15.00\t58\t5.50\t59\t1.00\t90.00\t8.00",
+    "1\t1\t3\t20.00\t2800\t2000\t10.00\t60.00\t57\t4.50",
+]
+
+
+def sample(freq: int) -> bytes:
+    lines = [HEADER, f"-\t-\t-\t1.00\t{freq}", f"0\t0\t0\t1.00\t{freq}", f"0\t1\t1\t1.00\t{freq}"]
+    return ("\n".join(lines) + "\n").encode()
+
+
+class TestTurbostat:
+    def get_turbostat(self) -> tuple[Turbostat, int]:
+        """Return a Turbostat reading its samples from a pipe, and the pipe to write them"""
+        with patch.object(Turbostat, "check_version"), patch.object(Turbostat, "pre_run"):
+            turbostat = Turbostat(MagicMock(), MonitoringContexts())
+        turbostat.cores_count = 2
+        read_fd, write_fd = os.pipe()
+        turbostat._background_process = types.SimpleNamespace(  # type: ignore[assignment]
+            stdout=os.fdopen(read_fd, "rb"), stdin=BytesIO()
+        )
+        turbostat._reader_thread = threading.Thread(target=turbostat._reader_worker, daemon=True)
+        turbostat._reader_thread.start()
+        return turbostat, write_fd
+
+    def test_columns(self):
+        contexts = MonitoringContexts()
+        with patch.object(Turbostat, "check_version"), patch.object(Turbostat, "run") as run:
+            run.return_value = TWO_PACKAGES
+            turbostat = Turbostat(MagicMock(), contexts)
+        assert turbostat.get_cores_count() == 4
+        assert sorted(turbostat.get_components()) == [
+            "Busy.CPU",
+            "CState.C1",
+            "CState.CPUc6",
+            "CState.Pkgpc6",
+            "Freq.CPU",
+            "PowerConsumption.CPU",
+            "Thermal.DTS",
+        ]
+        # Only the collected columns are requested
+        assert "TSC_MHz" not in turbostat.get_show_list()
+
+        turbostat.parse_sample(TWO_PACKAGES)
+        assert contexts.Busy.CPU["Core_2"].get_values()[-1] == 80
+        assert contexts.Freq.CPU["Core_3"].get_values()[-1] == 2800
+        assert contexts.CState["C1"]["Core_1"].get_values()[-1] == 20
+        assert contexts.CState["CPUc6"]["Core_0"].get_values()[-1] == 5
+        assert contexts.CState["Pkgpc6"]["package_1"].get_values()[-1] == 1
+        assert contexts.Thermal[DTS]["Core_3"].get_values()[-1] == 57
+        assert contexts.Thermal[DTS]["package_0"].get_values()[-1] == 66
+        power = contexts.PowerConsumption.CPU
+        assert power["Core_1"].get_values()[-1] == 4
+        assert power["package_0"].get_values()[-1] == 110
+        assert power["package_1"].get_values()[-1] == 90
+        assert power["package"].get_values()[-1] == 200
+        assert power["dram_1"].get_values()[-1] == 8
+        assert power["dram"].get_values()[-1] == 20
+        # The package values are not reported on the other cores
+        assert "package_2" not in power
+        assert "Core_1" not in contexts.CState["Pkgpc6"]
+
+    def test_sample_handoff(self):
+        turbostat, pipe = self.get_turbostat()
+        sequence = turbostat.trigger_sample()
+        assert sequence == 1
+        # The sample must be handed over as soon as it is complete
+        threading.Timer(0.05, os.write, args=(pipe, sample(1000))).start()
+        start = time.monotonic()
+        lines = turbostat.wait_for_sample(timeout=5)
+        assert time.monotonic() - start < 1
+        assert lines is not None
+        assert lines[1].split()[-1] == "1000"
+        assert turbostat.last_turbostat_output > 0
+        os.close(pipe)
+
+    def test_stale_samples(self):
+        turbostat, pipe = self.get_turbostat()
+        turbostat.trigger_sample()
+        os.write(pipe, sample(1000))
+        assert turbostat.wait_for_sample(timeout=1) is not None
+
+        # The previous sample must not be returned for a new trigger
+        late = turbostat.trigger_sample()
+        assert turbostat.wait_for_sample(timeout=0.1) is None
+
+        # The answer to the timed out trigger arrives after the next trigger
+        sequence = turbostat.trigger_sample()
+        os.write(pipe, sample(2000))
+        assert turbostat.wait_for_sample(timeout=0.1, sequence=sequence) is None
+        lines = turbostat.wait_for_sample(timeout=0.1, sequence=late)
+        assert lines is not None
+        assert lines[1].split()[-1] == "2000"
+
+        os.write(pipe, sample(3000))
+        lines = turbostat.wait_for_sample(timeout=1, sequence=sequence)
+        assert lines is not None
+        assert lines[1].split()[-1] == "3000"
+        os.close(pipe)
+
+    def test_untriggered_samples(self):
+        turbostat, pipe = self.get_turbostat()
+        turbostat.trigger_sample()
+        os.write(pipe, sample(1000))
+        assert turbostat.wait_for_sample(timeout=1) is not None
+
+        # A sample of the turbostat interval, without any trigger
+        os.write(pipe, sample(9999))
+        time.sleep(0.1)
+        sequence = turbostat.trigger_sample()
+        assert turbostat.wait_for_sample(timeout=0.1) is None
+
+        # The next sample answers the trigger
+        os.write(pipe, sample(2000))
+        lines = turbostat.wait_for_sample(timeout=1, sequence=sequence)
+        assert lines is not None
+        assert lines[1].split()[-1] == "2000"
+        os.close(pipe)
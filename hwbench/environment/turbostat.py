@@ -6,21 +6,26 @@ import re
 import subprocess
 import threading
 import time
-from contextlib import suppress
+from collections.abc import Iterator
+from dataclasses import dataclass
 from enum import Enum
 
 from packaging.version import Version
 
-from hwbench.bench.monitoring_structs import MonitoringContexts, MonitorMetric
+from hwbench.bench.monitoring_structs import MonitoringContextKeys, MonitoringContexts, MonitorMetric
 from hwbench.environment.hardware import BaseHardware
 from hwbench.utils.helpers import fatal, is_binary_available
 
 CORE = "core"
 PACKAGE = "package"
+DRAM = "dram"
+# Thermal family of the CPU digital thermal sensors
+DTS = "DTS"
 
 
 class CPUSTATS(Enum):
     NODE = "Node"
+    PACKAGE = "Package"
     CORE = "Core"
     CPU = "CPU"
     BUSY_PERCENT = "Busy%"
@@ -29,33 +34,76 @@ class CPUSTATS(Enum):
     IPC = "IPC"
     C1_PERCENT = "C1%"
     C2_PERCENT = "C2%"
+    CORE_C1_PERCENT = "CPU%c1"
+    CORE_C6_PERCENT = "CPU%c6"
+    CORE_TEMP = "CoreTmp"
     CORE_WATTS = "CorWatt"
+    PACKAGE_TEMP = "PkgTmp"
+    PACKAGE_C2_PERCENT = "Pkg%pc2"
+    PACKAGE_C6_PERCENT = "Pkg%pc6"
     PACKAGE_WATTS = "PkgWatt"
+    RAM_WATTS = "RAMWatt"
 
     def __str__(self) -> str:
         """Returns the field name."""
         return self.value
 
 
+@dataclass(frozen=True)
+class TurbostatColumn:
+    """Where the values of a turbostat column are stored.
+
+    Per core values are named Core_<cpu>, per package values <prefix>_<package>.
+    If total is set, the sum of all packages is also stored as <prefix>."""
+
+    stat: CPUSTATS
+    context: MonitoringContextKeys
+    family: str
+    unit: str
+    scope: str = CORE
+    prefix: str = PACKAGE
+    total: bool = False
+
+    def get_components(self) -> str:
+        return f"{self.context}.{self.family}"
+
+
+# The topology columns, to name the metrics
+TOPOLOGY = [CPUSTATS.PACKAGE, CPUSTATS.CORE, CPUSTATS.CPU]
+
+# The turbostat columns to collect, a new column only needs a new entry here
+COLUMNS = [
+    TurbostatColumn(CPUSTATS.BUSY_PERCENT, MonitoringContextKeys.Busy, "CPU", "%"),
+    TurbostatColumn(CPUSTATS.BUSY_MHZ, MonitoringContextKeys.Freq, "CPU", "Mhz"),
+    TurbostatColumn(CPUSTATS.IPC, MonitoringContextKeys.IPC, "CPU", "IPC"),
+    TurbostatColumn(CPUSTATS.C1_PERCENT, MonitoringContextKeys.CState, "C1", "%"),
+    TurbostatColumn(CPUSTATS.C2_PERCENT, MonitoringContextKeys.CState, "C2", "%"),
+    TurbostatColumn(CPUSTATS.CORE_C1_PERCENT, MonitoringContextKeys.CState, "CPUc1", "%"),
+    TurbostatColumn(CPUSTATS.CORE_C6_PERCENT, MonitoringContextKeys.CState, "CPUc6", "%"),
+    TurbostatColumn(CPUSTATS.CORE_TEMP, MonitoringContextKeys.Thermal, DTS, "Celsius"),
+    TurbostatColumn(CPUSTATS.CORE_WATTS, MonitoringContextKeys.PowerConsumption, "CPU", "Watts"),
+    TurbostatColumn(CPUSTATS.PACKAGE_TEMP, MonitoringContextKeys.Thermal, DTS, "Celsius", PACKAGE),
+    TurbostatColumn(CPUSTATS.PACKAGE_C2_PERCENT, MonitoringContextKeys.CState, "Pkgpc2", "%", PACKAGE),
+    TurbostatColumn(CPUSTATS.PACKAGE_C6_PERCENT, MonitoringContextKeys.CState, "Pkgpc6", "%", PACKAGE),
+    TurbostatColumn(
+        CPUSTATS.PACKAGE_WATTS, MonitoringContextKeys.PowerConsumption, "CPU", "Watts", PACKAGE, total=True
+    ),
+    TurbostatColumn(CPUSTATS.RAM_WATTS, MonitoringContextKeys.PowerConsumption, "CPU", "Watts", PACKAGE, DRAM, True),
+]
+
+
 class Turbostat:
     def __init__(self, hardware: BaseHardware, monitoring_contexts: MonitoringContexts):
         self.__output: list[str] | None = None
         self.cores_count = 0
-        self.sensor_list = {
-            CPUSTATS.NODE,
-            CPUSTATS.CORE,
-            CPUSTATS.CPU,
-            CPUSTATS.BUSY_PERCENT,
-            CPUSTATS.BUSY_MHZ,
-            CPUSTATS.TSC_MHZ,
-            CPUSTATS.IPC,
-            CPUSTATS.C1_PERCENT,
-            CPUSTATS.C2_PERCENT,
-            CPUSTATS.CORE_WATTS,
-            CPUSTATS.PACKAGE_WATTS,
-        }
         self.min_release = Version("2022.04.16")
         self.header = ""
+        # Position of every column of the header
+        self.__positions: dict[str, int] = {}
+        # The collected columns of the header, sorted by position
+        self.__layout: list[tuple[int, TurbostatColumn]] = []
+        # The metrics names of every collected column
+        self.__metrics_names: dict[TurbostatColumn, list[str]] = {}
         self.monitoring_contexts = monitoring_contexts
         self.hardware = hardware
         self.process: subprocess.Popen[bytes] = None  # type: ignore[assignment]
@@ -67,6 +115,11 @@ class Turbostat:
         self.last_turbostat_output: int = 0
         self._stop_background = False
         self._buffer_lock = threading.Lock()
+        # Signaled by the reader thread every time a sample is complete
+        self._sample_ready = threading.Condition(self._buffer_lock)
+        # Every trigger produces one sample: the n-th sample answers the n-th trigger
+        self._sample_seq = 0
+        self._trigger_seq = 0
         self._background_started = False
 
         # Let's make a first quick run to detect system
@@ -103,7 +156,15 @@ class Turbostat:
 
     def has(self, metric) -> bool:
         """Return if turbostat has a given metric"""
-        return str(metric) in self.header.split()
+        return str(metric) in self.__positions
+
+    def get_show_list(self) -> str:
+        """Return the turbostat columns to show"""
+        return ",".join(str(column) for column in TOPOLOGY + [column.stat for column in COLUMNS])
+
+    def get_components(self) -> list[str]:
+        """Return the monitoring components fed by turbostat"""
+        return list(dict.fromkeys(column.get_components() for _, column in self.__layout))
 
     def run(self, interval: float = 1, wait=False):
         """Execute turbostats"""
@@ -142,14 +203,8 @@ class Turbostat:
             "--num_iterations",
             "1",
             "--show",
+            self.get_show_list(),
         ]
-        sensors = ""
-        for sensor in CPUSTATS:
-            if not sensors:
-                sensors += f"{sensor}"
-            else:
-                sensors += f",{sensor}"
-        cmd_line.append(sensors)
 
         self.process = subprocess.Popen(
             cmd_line,
@@ -166,9 +221,13 @@ class Turbostat:
         self.__output = out.decode().splitlines()
         return self.__output
 
-    def __get_field_position(self, metric):
-        """Return the field position of a given metric in the current header"""
-        return self.header.split().index(str(metric))
+    def __build_layout(self, header: str):
+        """Map the columns of a header to the metrics they feed, done once per header"""
+        self.header = header
+        self.__positions = {column.strip(): position for position, column in enumerate(header.split("\t"))}
+        self.__layout = sorted(
+            (self.__positions[str(column.stat)], column) for column in COLUMNS if str(column.stat) in self.__positions
+        )
 
     def __find_header_index(self, output_lines):
         """Find the index of the header line in turbostat output.
@@ -196,7 +255,7 @@ class Turbostat:
 
         # Find the header line (skip any topology debug lines at the start)
         header_idx = self.__find_header_index(output)
-        self.header = output[header_idx]
+        self.__build_layout(output[header_idx])
 
         # Data lines come after the header: 1 aggregated line + per-CPU lines
         # cores_count should only count per-CPU lines, not the aggregated line
@@ -210,17 +269,14 @@ class Turbostat:
             logging.warning(
                 "Package watts not supported by turbostat. Are you running in a VM? If not, then the CPU is probably not supported by the running kernel"
             )
-        else:
-            # Initialize package power metric
-            self.monitoring_contexts.PowerConsumption.CPU[PACKAGE] = MonitorMetric(PACKAGE, "Watts")
-        for cores in range(self.get_cores_count()):
-            # If we have CoreWatt, let's report them
-            if self.has(CPUSTATS.CORE_WATTS):
-                self.monitoring_contexts.PowerConsumption.CPU[f"Core_{cores}"] = MonitorMetric(f"Core_{cores}", "Watts")
-            # If we have IPC, let's report them
-            if self.has(CPUSTATS.IPC):
-                self.monitoring_contexts.IPC.CPU[f"Core_{cores}"] = MonitorMetric(f"Core_{cores}", "IPC")
-            self.monitoring_contexts.Freq.CPU[f"Core_{cores}"] = MonitorMetric(f"Core_{cores}", "Mhz")
+
+        # The metrics to create are the ones reported by this first run
+        self.__metrics_names = {}
+        for column, name, _ in self.__iterate_values(data_lines):
+            names = self.__metrics_names.setdefault(column, [])
+            if name not in names:
+                names.append(name)
+        self.reinitialize_metrics()
 
     def get_cores_count(self):
         return self.cores_count
@@ -232,35 +288,43 @@ class Turbostat:
         re-running turbostat. Use this after __reset_metrics() to restore the metric
         structure that turbostat will populate during monitoring.
         """
-        # Initialize package power metric if available
-        if self.has(CPUSTATS.PACKAGE_WATTS):
-            self.monitoring_contexts.PowerConsumption.CPU[PACKAGE] = MonitorMetric(PACKAGE, "Watts")
-
-        # Initialize per-core metrics
-        for cores in range(self.get_cores_count()):
-            # If we have CoreWatt, let's report them
-            if self.has(CPUSTATS.CORE_WATTS):
-                self.monitoring_contexts.PowerConsumption.CPU[f"Core_{cores}"] = MonitorMetric(f"Core_{cores}", "Watts")
-            # If we have IPC, let's report them
-            if self.has(CPUSTATS.IPC):
-                self.monitoring_contexts.IPC.CPU[f"Core_{cores}"] = MonitorMetric(f"Core_{cores}", "IPC")
-            self.monitoring_contexts.Freq.CPU[f"Core_{cores}"] = MonitorMetric(f"Core_{cores}", "Mhz")
-
-    def _get_global_packages_power(self) -> float:
-        """Return the summarized packages power from current output."""
-        assert self.__output is not None, "Output must be set before calling _get_global_packages_power"
-        package_power = []
-        header_idx = self.__find_header_index(self.__output)
-        # Skip header and aggregated line, process per-core data
-        for line in self.__output[header_idx + 2 :]:
-            items = line.split()
-            try:
-                pkg_pos = self.__get_field_position(CPUSTATS.PACKAGE_WATTS)
-                pkg_value = items[pkg_pos]
-                package_power.append(float(pkg_value))
-            except (IndexError, ValueError):
-                continue
-        return sum(package_power)
+        for column, names in self.__metrics_names.items():
+            family = self.monitoring_contexts.get_family(column.context, column.family)
+            for name in names:
+                family[name] = MonitorMetric(name, column.unit)
+
+    def __iterate_values(self, data_lines: list[str]) -> Iterator[tuple[TurbostatColumn, str, float]]:
+        """Return the column, metric name and value of every collected value of a sample
+
+        data_lines are the aggregated line followed by the per-core lines."""
+        cpu_pos = self.__positions[str(CPUSTATS.CPU)]
+        package_pos = self.__positions.get(str(CPUSTATS.PACKAGE))
+        totals: dict[TurbostatColumn, float] = {}
+        packages_count = 0
+        # Skip aggregated line (first data line), process per-core lines
+        for line in data_lines[1:]:
+            # Package and core values are only reported on the first cpu of a package or a core,
+            # missing values are at the end of the lines
+            items = line.split("\t")
+            core_name = f"Core_{items[cpu_pos].strip()}"
+            package = ""
+            for position, column in self.__layout:
+                if position >= len(items):
+                    break
+                value = items[position].strip()
+                if not value or value == "-":
+                    continue
+                if column.scope == CORE:
+                    yield column, core_name, float(value)
+                    continue
+                if not package:
+                    package = items[package_pos].strip() if package_pos is not None else str(packages_count)
+                    packages_count += 1
+                yield column, f"{column.prefix}_{package}", float(value)
+                if column.total:
+                    totals[column] = totals.get(column, 0.0) + float(value)
+        for column, total in totals.items():
+            yield column, column.prefix, total
 
     def _reader_worker(self):
         """Background thread that continuously reads turbostat output and buffers samples.
@@ -302,15 +366,22 @@ class Turbostat:
                     # current_sample_lines contains: [header, aggregated, core_0, core_1, ...]
                     # We need: 1 (header) + 1 (aggregated) + cores_count (per-core lines)
                     if len(current_sample_lines) >= 2 + self.cores_count:
-                        with self._buffer_lock:
-                            # Replace the buffer with the latest sample
-                            self._sample_buffer = current_sample_lines.copy()
-                            logging.debug("Turbostat: buffered new sample")
+                        with self._sample_ready:
+                            if self._sample_seq < self._trigger_seq:
+                                # Replace the buffer with the latest sample and wake up the consumer
+                                self._sample_buffer = current_sample_lines
+                                self._sample_seq += 1
+                                self.last_turbostat_output = time.monotonic_ns()
+                                self._sample_ready.notify_all()
+                                logging.debug(f"Turbostat: buffered sample {self._sample_seq}")
+                            else:
+                                # Turbostat also outputs a sample every interval (-i),
+                                # it answers no trigger and would shift the pairing.
+                                logging.debug("Turbostat: ignored an untriggered sample")
 
                         # Reset for next sample
                         current_sample_lines = []
                         header_seen = False
-                self.last_turbostat_output = time.monotonic_ns()
 
         except Exception as e:
             logging.error(f"Turbostat reader thread error: {e}")
@@ -338,11 +409,9 @@ class Turbostat:
             "100",
             "--quiet",
             "--show",
+            self.get_show_list(),
         ]
 
-        sensors = ",".join(str(sensor) for sensor in CPUSTATS)
-        cmd_line.append(sensors)
-
         logging.info("Starting turbostat in background mode with EOL-triggered sampling")
 
         self._background_process = subprocess.Popen(
@@ -367,25 +436,31 @@ class Turbostat:
 
         # Start the reader thread
         self._stop_background = False
+        with self._sample_ready:
+            self._sample_buffer = None
+            self._sample_seq = 0
+            self._trigger_seq = 0
         self._reader_thread = threading.Thread(target=self._reader_worker, daemon=True)
         self._reader_thread.start()
         self._background_started = True
 
-    def trigger_sample(self):
+    def trigger_sample(self) -> int:
         """Trigger turbostat to output a sample by sending EOL to stdin.
 
         This sends a newline character to turbostat's stdin, which causes it
-        to immediately collect and output statistics. The previous sample buffer
-        is cleared to ensure we don't retrieve stale data.
+        to immediately collect and output statistics.
+
+        Returns:
+            The sequence number of the triggered sample, to be given to wait_for_sample()
         """
         if not self._background_process or not self._background_process.stdin:
             logging.error("Cannot trigger sample: no background process or stdin")
-            return
+            return self._trigger_seq
 
-        # Clear the previous sample buffer to avoid retrieving stale data
-        with self._buffer_lock:
-            self._sample_buffer = None
-            logging.debug("Turbostat: cleared sample buffer")
+        # The trigger is counted before it is sent, so its answer is never taken for an untriggered sample
+        with self._sample_ready:
+            self._trigger_seq += 1
+            sequence = self._trigger_seq
 
         try:
             self._background_process.stdin.write(b"\n")
@@ -393,34 +468,34 @@ class Turbostat:
             logging.debug("Turbostat: sent EOL trigger")
         except (BrokenPipeError, OSError) as e:
             logging.error(f"Failed to trigger turbostat sample: {e}")
+            with self._sample_ready:
+                self._trigger_seq -= 1
+                return self._trigger_seq
 
-    def wait_for_sample(self, timeout: float = 5.0) -> list | None:
+        return sequence
+
+    def wait_for_sample(self, timeout: float = 5.0, sequence: int | None = None) -> list | None:
         """Wait for a sample from turbostat.
 
-        This method blocks until a sample appears in the buffer, or until the timeout expires.
-        The sample is NOT consumed - it remains in the buffer and will be overwritten when
-        a newer sample arrives.
+        This method blocks until the reader thread hands over the requested sample,
+        or until the timeout expires. A sample older than the requested one,
+        like a late answer to a previous trigger, is never returned.
 
         Args:
             timeout: Maximum time to wait in seconds (default: 5.0)
+            sequence: the sample to wait for, the last triggered one by default
 
         Returns:
             Sample lines or None if timeout or no sample
         """
-        start_time = time.monotonic()
-        poll_interval = 0.05  # 50ms polling interval
-
-        while time.monotonic() - start_time < timeout:
-            with self._buffer_lock:
-                if self._sample_buffer is not None:
-                    # Return a copy of the sample WITHOUT consuming it
-                    return self._sample_buffer.copy()
-
-            # No sample yet, wait a bit
-            time.sleep(poll_interval)
-
-        # Timeout - no sample available
-        return None
+        with self._sample_ready:
+            if sequence is None:
+                sequence = self._trigger_seq
+            if not self._sample_ready.wait_for(lambda: self._sample_seq >= sequence, timeout=timeout):
+                return None
+            if self._sample_buffer is None:
+                return None
+            return self._sample_buffer.copy()
 
     def stop_background(self):
         """Stop the background turbostat process."""
@@ -445,11 +520,12 @@ class Turbostat:
         self._background_process = None
         self._reader_thread = None
 
-    def parse_sample(self, sample_lines: list[str]) -> None:
+    def parse_sample(self, sample_lines: list[str], contexts: MonitoringContexts | None = None) -> None:
         """Parse a turbostat sample and update monitoring contexts.
 
         Args:
             sample_lines: List of output lines for a single sample
+            contexts: where to add the values, the monitoring contexts by default
         """
         if not sample_lines:
             return
@@ -458,50 +534,42 @@ class Turbostat:
 
         # Find header (skip topology lines if present in test/mock data)
         header_idx = self.__find_header_index(sample_lines)
-        self.header = sample_lines[header_idx]
+        if sample_lines[header_idx] != self.header:
+            self.__build_layout(sample_lines[header_idx])
 
         # Data lines: aggregated + per-core
         # cores_count should only count per-core lines, not the aggregated line
         data_lines = sample_lines[header_idx + 1 :]
         self.cores_count = len(data_lines) - 1  # Subtract 1 for the aggregated line
 
-        # Collect overall package power consumption
-        if self.has(CPUSTATS.PACKAGE_WATTS):
-            self.monitoring_contexts.PowerConsumption.CPU[PACKAGE].add(self._get_global_packages_power())
-
-        # Extract per-core information
-        cpu_pos = self.__get_field_position(CPUSTATS.CPU)
-        corewatt_pos = self.__get_field_position(CPUSTATS.CORE_WATTS) if self.has(CPUSTATS.CORE_WATTS) else None
-        freq_pos = self.__get_field_position(CPUSTATS.BUSY_MHZ) if self.has(CPUSTATS.BUSY_MHZ) else None
-        ipc_pos = self.__get_field_position(CPUSTATS.IPC) if self.has(CPUSTATS.IPC) else None
-
-        # Skip aggregated line (first data line), process per-core lines
-        for line in data_lines[1:]:
-            items = line.split()
-            core_nb = items[cpu_pos]
-
-            # Some processors report corewatt in header but not for all cores, so ignore IndexError
-            if corewatt_pos is not None:
-                with suppress(IndexError):
-                    self.monitoring_contexts.PowerConsumption.CPU[f"Core_{core_nb}"].add(float(items[corewatt_pos]))
-
-            if freq_pos is not None:
-                self.monitoring_contexts.Freq.CPU[f"Core_{core_nb}"].add(float(items[freq_pos]))
-
-            if ipc_pos is not None:
-                self.monitoring_contexts.IPC.CPU[f"Core_{core_nb}"].add(float(items[ipc_pos]))
+        families = {
+            column: self.monitoring_contexts.get_family(column.context, column.family) for _, column in self.__layout
+        }
+        for column, name, value in self.__iterate_values(data_lines):
+            # Only the metrics detected at initialization are kept, so they all have the same samples
+            if name not in families[column]:
+                continue
+            if contexts is None:
+                families[column][name].add(value)
+                continue
+            family = contexts.get_family(column.context, column.family)
+            if name not in family:
+                family[name] = MonitorMetric(name, column.unit)
+            family[name].add(value)
 
-    def get_and_parse_sample(self, precision_s: float) -> int:
+    def get_and_parse_sample(self, precision_s: float, contexts: MonitoringContexts | None = None) -> int:
         """Get the latest sample from buffer and parse it.
 
-        This method waits for and retrieves a turbostat sample that was triggered
-        earlier by trigger_sample(). The typical usage pattern is:
+        This method waits for and retrieves the last turbostat sample triggered
+        by trigger_sample(), it returns as soon as turbostat's output is complete.
+        The typical usage pattern is:
         1. Call trigger_sample() at the start of the monitoring loop
         2. Do monitoring work
         3. Call get_and_parse_sample() to retrieve and parse the results
 
         Args:
             precision_s: the monitoring loop interval (used for timeout)
+            contexts: where to add the values, the monitoring contexts by default
 
         Returns:
             last_turbostat_output: when (in monotonic time) Turbostat outputted the last values.
@@ -516,5 +584,5 @@ class Turbostat:
             return self.last_turbostat_output
 
         # Parse the sample
-        self.parse_sample(sample)
+        self.parse_sample(sample, contexts)
         return self.last_turbostat_output
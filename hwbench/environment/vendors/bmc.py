@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import functools
+import logging
 import os.path
 import pathlib
+from collections.abc import Iterator
 from typing import Any
 
 from hwbench.bench.monitoring_structs import (
@@ -20,6 +22,43 @@ from hwbench.utils.external import External
 
 from .monitoring_device import MonitoringDevice
 
+# The chassis subresources fetched in a single $expand request, and the fields parsed from them
+EXPANDED_FIELDS = {
+    "Thermal": ["Temperatures", "Fans"],
+    "Power": ["PowerControl", "PowerSupplies"],
+}
+
+# The fields of a Sensor resource parsed from an expanded Sensors collection
+SENSOR_FIELDS = ["Name", "Reading", "ReadingType", "ReadingUnits", "PhysicalContext"]
+
+
+class BMCSnapshot:
+    """The BMC endpoints read by a monitoring iteration.
+
+    The urls are requested once, concurrently, when the snapshot is taken, so all
+    the parsers of an iteration read the same answers. An url missing from the
+    snapshot is requested at its first use, and kept for the next ones."""
+
+    def __init__(self, device: MonitoringDevice, urls: list[str]):
+        self.device = device
+        self.contents: dict[str, Any] = {}
+        self.fetch(urls)
+
+    def fetch(self, urls: list[str]):
+        """Add urls to the snapshot, requested concurrently"""
+        missing = [url for url in dict.fromkeys(urls) if url not in self.contents]
+        if missing:
+            self.contents.update(self.device.get_redfish_urls(missing))
+
+    def get(self, url: str, log_failure=True) -> Any:
+        """Return the content of an url"""
+        if url not in self.contents:
+            if log_failure:
+                self.contents[url] = self.device.get_redfish_url(url)
+            else:
+                self.contents[url] = self.device.get_redfish_url(url, log_failure=False)
+        return self.contents[url]
+
 
 class BMC(MonitoringDevice, External):
     def __init__(self, out_dir: pathlib.Path, vendor):
@@ -27,6 +66,13 @@ class BMC(MonitoringDevice, External):
         External.__init__(self, out_dir)
         self.bmc = {}  # type: dict[str, str]
         self.bmc_section = None
+        # $expand and $select query parameters support, detected by detect()
+        self.expand_query = False
+        self.select_query = False
+        # A collection can be read with its members in a single request
+        self.expand_members = False
+        # Subscribe to the metric reports pushed by the BMC
+        self.push = False
 
         # For testing purposes, vendor can be None
         if self.vendor:
@@ -80,6 +126,7 @@ class BMC(MonitoringDevice, External):
 
         bmc_username = self.vendor.monitoring_config_file.get(sections[0], "username")
         bmc_password = self.vendor.monitoring_config_file.get(sections[0], "password")
+        self.push = self.vendor.monitoring_config_file.getboolean(sections[0], "push", fallback=False)
         return super().connect_redfish(bmc_username, bmc_password, self.get_url())
 
     @functools.cache
@@ -93,6 +140,100 @@ class BMC(MonitoringDevice, External):
                     chassis.append(member["@odata.id"])
         return chassis
 
+    def detect_query_support(self):
+        """Detect if the service supports the $expand and $select query parameters"""
+        service_root = self.get_redfish_url("/redfish/v1/", log_failure=False) or {}
+        features = service_root.get("ProtocolFeaturesSupported", {})
+        expand = features.get("ExpandQuery", {})
+        # Thermal and Power are expanded at the second level, below the chassis collection members
+        self.expand_query = bool(expand.get("NoLinks") and expand.get("Levels") and expand.get("MaxLevels", 0) >= 2)
+        self.expand_members = bool(expand.get("NoLinks"))
+        self.select_query = bool(features.get("SelectQuery"))
+
+    def _expanded_chassis_url(self) -> str:
+        url = "/redfish/v1/Chassis?$expand=.($levels=2)"
+        if self.select_query:
+            fields = [f"Members/{item}/{field}" for item, fields in EXPANDED_FIELDS.items() for field in fields]
+            url += "&$select=" + ",".join(fields)
+        return url
+
+    def snapshot(self, urls: list[str] | None = None) -> BMCSnapshot:
+        """Request the urls read by a monitoring iteration, all the monitored urls by default"""
+        if urls is None:
+            urls = [*self.get_thermal_urls(), *self.get_power_urls()]
+        return BMCSnapshot(self, urls)
+
+    def _chassis_item_urls(self, chassis_url: str, name: str, url: str = "") -> list[str]:
+        """Return the urls providing a subresource of a chassis"""
+        if self.expand_query:
+            return [self._expanded_chassis_url()]
+        return [url or f"{chassis_url}/{name}"]
+
+    def get_thermal_urls(self) -> list[str]:
+        """Return the urls read by read_thermals() and read_fans()"""
+        if self._get_chassis_sensors():
+            return list(self._get_sensors_urls().values())
+        if self.expand_query:
+            return [self._expanded_chassis_url()]
+        return list(self._get_chassis_thermals().values())
+
+    def get_power_urls(self) -> list[str]:
+        """Return the urls read by read_power_consumption() and read_power_supplies()"""
+        if self._get_chassis_sensors():
+            return list(self._get_sensors_urls().values())
+        if self.expand_query:
+            return [self._expanded_chassis_url()]
+        return list(self._get_chassis_powers().values())
+
+    def _get_expanded_chassis(self, snapshot: BMCSnapshot) -> dict[str, dict]:
+        """Return the chassis with their subresources expanded, by chassis url.
+
+        Returns an empty dict if the service does not support $expand."""
+        if not self.expand_query:
+            return {}
+        chlist = snapshot.get(self._expanded_chassis_url())
+        chassis = {}
+        if isinstance(chlist, dict) and "Members" in chlist and isinstance(chlist["Members"], list):
+            for member in chlist["Members"]:
+                if isinstance(member, dict) and "@odata.id" in member and isinstance(member["@odata.id"], str):
+                    chassis[member["@odata.id"].rstrip("/")] = member
+        if not chassis:
+            logging.warning("BMC: $expand request failed, requesting every chassis endpoint")
+            self.expand_query = False
+        return chassis
+
+    def _expanded_item(self, chassis: dict, name: str) -> dict | None:
+        """Return a chassis subresource if the service expanded it"""
+        item = chassis.get(name)
+        # A subresource not expanded is only a link
+        if isinstance(item, dict) and item.keys() - {"@odata.id"}:
+            return item
+        return None
+
+    def _get_expanded_items(self, snapshot: BMCSnapshot, name: str) -> dict[str, dict] | None:
+        """Return a subresource of every chassis, by chassis name, from the expanded chassis.
+
+        Returns None if the chassis are not expanded."""
+        expanded_chassis = self._get_expanded_chassis(snapshot)
+        if not expanded_chassis:
+            return None
+        items = {}
+        for chassis_url, chassis in expanded_chassis.items():
+            if name not in chassis:
+                continue
+            item = self._expanded_item(chassis, name)
+            if item is None:
+                return None
+            items[os.path.basename(chassis_url)] = item
+        return items
+
+    def _get_chassis_item(self, snapshot: BMCSnapshot, chassis_url: str, name: str, url: str = "") -> dict:
+        """Return a subresource of a chassis, from the expanded chassis if possible, or from its url"""
+        item = self._expanded_item(self._get_expanded_chassis(snapshot).get(chassis_url, {}), name)
+        if item is not None:
+            return item
+        return snapshot.get(url or f"{chassis_url}/{name}")
+
     def _chassis_item_url(self, chassis, name: str) -> str:
         if isinstance(chassis, dict) and name in chassis:
             item = chassis[name]
@@ -104,8 +245,7 @@ class BMC(MonitoringDevice, External):
     def _get_chassis_thermals(self) -> dict[str, str]:
         # Auto-detect all "Chassis" Thermal URIs
         thermals = {}
-        for chassis_url in self._get_chassis():
-            chassis = self.get_redfish_url(chassis_url)
+        for chassis_url, chassis in self.get_redfish_urls(self._get_chassis()).items():
             chassis_name = os.path.basename(chassis_url.rstrip("/"))
             url = self._chassis_item_url(chassis, "Thermal")
             if url:
@@ -116,29 +256,84 @@ class BMC(MonitoringDevice, External):
     def _get_chassis_powers(self) -> dict[str, str]:
         # Auto-detect all "Chassis" Power URIs
         powers = {}
-        for chassis_url in self._get_chassis():
-            chassis = self.get_redfish_url(chassis_url)
+        for chassis_url, chassis in self.get_redfish_urls(self._get_chassis()).items():
             chassis_name = os.path.basename(chassis_url.rstrip("/"))
             url = self._chassis_item_url(chassis, "Power")
             if url:
                 powers[chassis_name] = url
         return powers
 
-    def _get_thermals(self) -> dict[str, dict[str, Any]]:
-        thermals = {}
-        for chassis, thermal_url in self._get_chassis_thermals().items():
-            thermals[chassis] = self.get_redfish_url(thermal_url)
-        return thermals
+    @functools.cache
+    def _get_chassis_sensors(self) -> dict[str, str]:
+        """Auto-detect the "Chassis" Sensors collection URIs, when they can replace the Thermal & Power ones.
+
+        The Sensors collection is used if it is read in a single request, or if the chassis has no Thermal resource."""
+        sensors = {}
+        for chassis_url, chassis in self.get_redfish_urls(self._get_chassis()).items():
+            chassis_name = os.path.basename(chassis_url.rstrip("/"))
+            url = self._chassis_item_url(chassis, "Sensors")
+            if url and (self.expand_members or not self._chassis_item_url(chassis, "Thermal")):
+                sensors[chassis_name] = url
+        return sensors
 
-    def get_thermal(self) -> dict:
-        th = self._get_thermals()
+    def _get_sensors_urls(self) -> dict[str, str]:
+        """Return the url of the Sensors collection of every chassis, by chassis name"""
+        urls = {}
+        for chassis, sensors_url in self._get_chassis_sensors().items():
+            url = sensors_url
+            if self.expand_members:
+                url += "?$expand=."
+                if self.select_query:
+                    url += "&$select=" + ",".join(f"Members/{field}" for field in SENSOR_FIELDS)
+            urls[chassis] = url
+        return urls
+
+    def _get_sensors(self, snapshot: BMCSnapshot) -> dict[str, list[dict[str, Any]]]:
+        """Return the sensors of every chassis, by chassis name"""
+        urls = self._get_sensors_urls()
+        snapshot.fetch(list(urls.values()))
+        sensors = {}
+        for chassis, url in urls.items():
+            members = (snapshot.get(url) or {}).get("Members", [])
+            # Members not expanded are only links, they are requested concurrently
+            links = [member["@odata.id"] for member in members if "ReadingType" not in member and "@odata.id" in member]
+            snapshot.fetch(links)
+            members = [
+                snapshot.get(member["@odata.id"]) if "ReadingType" not in member and "@odata.id" in member else member
+                for member in members
+            ]
+            sensors[chassis] = [member for member in members if isinstance(member, dict)]
+        return sensors
+
+    def _get_sensor_readings(self, snapshot: BMCSnapshot, reading_type: str) -> Iterator[tuple[str, dict[str, Any]]]:
+        """Return the prefix and the content of the sensors of a ReadingType having a reading"""
+        sensors = self._get_sensors(snapshot)
+        for chassis, chassis_sensors in sensors.items():
+            prefix = chassis + "-" if len(sensors) > 1 else ""
+            for sensor in chassis_sensors:
+                if sensor.get("ReadingType") == reading_type and sensor.get("Reading") is not None:
+                    yield prefix, sensor
+
+    def _get_thermals(self, snapshot: BMCSnapshot) -> dict[str, dict[str, Any]]:
+        expanded = self._get_expanded_items(snapshot, "Thermal")
+        if expanded is not None:
+            return expanded
+        chassis_thermals = self._get_chassis_thermals()
+        snapshot.fetch(list(chassis_thermals.values()))
+        return {chassis: snapshot.get(thermal_url) for chassis, thermal_url in chassis_thermals.items()}
+
+    def get_thermal(self, snapshot: BMCSnapshot | None = None) -> dict:
+        th = self._get_thermals(snapshot or self.snapshot(self.get_thermal_urls()))
         if len(th) == 1:
             return next(iter(th.values()))  # return only element
         return {}  # return nothing if there are more than 1 elements
 
-    def read_thermals(self, thermals: ThermalContext) -> ThermalContext:
+    def read_thermals(self, thermals: ThermalContext, snapshot: BMCSnapshot | None = None) -> ThermalContext:
         """Return thermals from server"""
-        th = self._get_thermals()
+        snapshot = snapshot or self.snapshot(self.get_thermal_urls())
+        if self._get_chassis_sensors():
+            return self.read_sensors_thermals(thermals, snapshot)
+        th = self._get_thermals(snapshot)
         for chassis, thermal in th.items():
             prefix = ""
             if len(th) > 1:
@@ -157,51 +352,125 @@ class BMC(MonitoringDevice, External):
                 )
         return thermals
 
-    def read_fans(self, fans: FansContext) -> FansContext:
+    def read_fans(self, fans: FansContext, snapshot: BMCSnapshot | None = None) -> FansContext:
         """Return fans from server"""
         # Generic for now, could be overridden by vendors
-        for f in self.get_thermal().get("Fans", []):
+        snapshot = snapshot or self.snapshot(self.get_thermal_urls())
+        if self._get_chassis_sensors():
+            return self.read_sensors_fans(fans, snapshot)
+        for f in self.get_thermal(snapshot).get("Fans", []):
             name = f["Name"]
             if name not in fans.Fan:
                 fans.Fan[name] = MonitorMetric(f["Name"], f["ReadingUnits"])
             fans.Fan[name].add(f["Reading"])
         return fans
 
-    def _get_powers(self) -> dict[str, dict]:
-        powers = {}
-        for chassis, thermal_url in self._get_chassis_powers().items():
-            powers[chassis] = self.get_redfish_url(thermal_url)
-        return powers
+    def _get_powers(self, snapshot: BMCSnapshot) -> dict[str, dict]:
+        expanded = self._get_expanded_items(snapshot, "Power")
+        if expanded is not None:
+            return expanded
+        chassis_powers = self._get_chassis_powers()
+        snapshot.fetch(list(chassis_powers.values()))
+        return {chassis: snapshot.get(power_url) for chassis, power_url in chassis_powers.items()}
 
-    def get_power(self):
+    def get_power(self, snapshot: BMCSnapshot | None = None):
         """Return the power metrics."""
-        th = self._get_powers()
+        th = self._get_powers(snapshot or self.snapshot(self.get_power_urls()))
         if len(th) == 1:
             return next(iter(th.values()))  # return only element
         return {}  # return nothing if there are more than 1 elements
 
-    def read_power_consumption(self, power_consumption: PowerConsumptionContext) -> PowerConsumptionContext:
+    def read_power_consumption(
+        self, power_consumption: PowerConsumptionContext, snapshot: BMCSnapshot | None = None
+    ) -> PowerConsumptionContext:
         """Return power consumption from server"""
         # Generic for now, could be overridden by vendors
+        snapshot = snapshot or self.snapshot(self.get_power_urls())
         if power_consumption.BMC.get(str(PowerCategories.SERVER), None) is None:
             power_consumption.BMC[str(PowerCategories.SERVER)] = Power("Server")
-        power = self.get_power().get("PowerControl", [{"PowerConsumedWatts": None}])[0].get("PowerConsumedWatts", None)
+        if self._get_chassis_sensors():
+            return self.read_sensors_power_consumption(power_consumption, snapshot)
+        power = (
+            self.get_power(snapshot)
+            .get("PowerControl", [{"PowerConsumedWatts": None}])[0]
+            .get("PowerConsumedWatts", None)
+        )
         if power:
             power_consumption.BMC[str(PowerCategories.SERVER)].add(power)
         return power_consumption
 
-    def read_power_supplies(self, power_supplies: PowerSuppliesContext) -> PowerSuppliesContext:
+    def read_power_supplies(
+        self, power_supplies: PowerSuppliesContext, snapshot: BMCSnapshot | None = None
+    ) -> PowerSuppliesContext:
         """Return power supplies power from server"""
         # Generic for now, could be overridden by vendors
-        for psu in self.get_power().get("PowerSupplies", []):
+        snapshot = snapshot or self.snapshot(self.get_power_urls())
+        if self._get_chassis_sensors():
+            return self.read_sensors_power_supplies(power_supplies, snapshot)
+        for psu in self.get_power(snapshot).get("PowerSupplies", []):
             psu_name = psu["Name"].split()[0]
             if psu["Name"] not in power_supplies.BMC:
                 power_supplies.BMC[psu["Name"]] = Power(psu_name)
             power_supplies.BMC[psu["Name"]].add(psu["PowerInputWatts"])
         return power_supplies
 
+    def read_sensors_thermals(self, thermals: ThermalContext, snapshot: BMCSnapshot) -> ThermalContext:
+        """Return thermals from the Sensors collections"""
+        for prefix, sensor in self._get_sensor_readings(snapshot, "Temperature"):
+            if sensor["Reading"] <= 0:
+                continue
+            super().add_monitoring_value(
+                thermals,
+                sensor.get("PhysicalContext") or "UnknownPhysicalContext",
+                Temperature(prefix + sensor["Name"].split("Temp")[0].strip()),
+                prefix + sensor["Name"],
+                sensor["Reading"],
+            )
+        return thermals
+
+    def read_sensors_fans(self, fans: FansContext, snapshot: BMCSnapshot) -> FansContext:
+        """Return fans from the Sensors collections"""
+        for prefix, sensor in self._get_sensor_readings(snapshot, "Rotational"):
+            name = prefix + sensor["Name"]
+            if name not in fans.Fan:
+                fans.Fan[name] = MonitorMetric(name, sensor.get("ReadingUnits") or "RPM")
+            fans.Fan[name].add(sensor["Reading"])
+        return fans
+
+    def read_sensors_power_consumption(
+        self, power_consumption: PowerConsumptionContext, snapshot: BMCSnapshot
+    ) -> PowerConsumptionContext:
+        """Return power consumption from the Sensors collections"""
+        # The server power consumption is the power sensor of the chassis
+        for _, sensor in self._get_sensor_readings(snapshot, "Power"):
+            if sensor.get("PhysicalContext") == "Chassis":
+                power_consumption.BMC[str(PowerCategories.SERVER)].add(sensor["Reading"])
+                break
+        return power_consumption
+
+    def read_sensors_power_supplies(
+        self, power_supplies: PowerSuppliesContext, snapshot: BMCSnapshot
+    ) -> PowerSuppliesContext:
+        """Return power supplies power from the Sensors collections"""
+        for prefix, sensor in self._get_sensor_readings(snapshot, "Power"):
+            # Only the input power of the power supplies is reported
+            if sensor.get("PhysicalContext") != "PowerSupply" or "Output" in sensor["Name"]:
+                continue
+            name = prefix + sensor["Name"]
+            if name not in power_supplies.BMC:
+                power_supplies.BMC[name] = Power(name.split()[0])
+            power_supplies.BMC[name].add(sensor["Reading"])
+        return power_supplies
+
     def detect(self):
         """Detect monitoring device"""
+        self.detect_query_support()
+        if self.push:
+            if self.start_telemetry():
+                # The reports update the Thermal & Power resources, not the expanded chassis
+                self.expand_query = False
+            else:
+                logging.warning("BMC: no metric reports are pushed, polling the BMC")
         bmc_info = self.get_redfish_url("/redfish/v1/Managers/")
         members = bmc_info.get("Members")
         if not members:
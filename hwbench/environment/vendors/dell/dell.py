@@ -11,18 +11,35 @@ from hwbench.bench.monitoring_structs import (
     ThermalContext,
 )
 from hwbench.bench.monitoring_structs import PowerCategories as PowerCat
+from hwbench.environment.vendors.bmc import BMCSnapshot
 from hwbench.environment.vendors.vendor import BMC, Vendor
 from hwbench.utils import helpers as h
 
+CHASSIS = "/redfish/v1/Chassis/System.Embedded.1"
+
 
 class IDRAC(BMC):
     oem_endpoint = ""
 
-    def get_thermal(self):
-        return self.get_redfish_url("/redfish/v1/Chassis/System.Embedded.1/Thermal")
+    def get_thermal_urls(self) -> list[str]:
+        if self._get_chassis_sensors():
+            return super().get_thermal_urls()
+        return self._chassis_item_urls(CHASSIS, "Thermal")
+
+    def get_power_urls(self) -> list[str]:
+        urls = super().get_power_urls() if self._get_chassis_sensors() else self._chassis_item_urls(CHASSIS, "Power")
+        # The OEM endpoint is known once found by get_oem_system()
+        if self.oem_endpoint:
+            urls.append(self.oem_endpoint)
+        return urls
+
+    def get_thermal(self, snapshot: BMCSnapshot | None = None):
+        return self._get_chassis_item(snapshot or self.snapshot(self.get_thermal_urls()), CHASSIS, "Thermal")
 
-    def read_thermals(self, thermals: ThermalContext) -> ThermalContext:
-        for t in self.get_thermal().get("Temperatures"):
+    def read_thermals(self, thermals: ThermalContext, snapshot: BMCSnapshot | None = None) -> ThermalContext:
+        if self._get_chassis_sensors():
+            return super().read_thermals(thermals, snapshot)
+        for t in self.get_thermal(snapshot).get("Temperatures"):
             if t["ReadingCelsius"] is None or t["ReadingCelsius"] <= 0:
                 continue
             name = t["Name"].split("Temp")[0].strip()
@@ -42,26 +59,27 @@ class IDRAC(BMC):
             )
         return thermals
 
-    def get_power(self):
-        return self.get_redfish_url("/redfish/v1/Chassis/System.Embedded.1/Power")
+    def get_power(self, snapshot: BMCSnapshot | None = None):
+        return self._get_chassis_item(snapshot or self.snapshot(self.get_power_urls()), CHASSIS, "Power")
 
-    def get_oem_system(self):
+    def get_oem_system(self, snapshot: BMCSnapshot | None = None):
+        snapshot = snapshot or self.snapshot([])
         # If we already found the proper endpoint, let's reuse it.
         if self.oem_endpoint:
-            return self.get_redfish_url(
+            return snapshot.get(
                 self.oem_endpoint,
                 log_failure=False,
             )
 
         new_oem_endpoint = "/redfish/v1/Managers/iDRAC.Embedded.1/Oem/Dell/DellAttributes/System.Embedded.1"
-        oem = self.get_redfish_url(
+        oem = snapshot.get(
             new_oem_endpoint,
             log_failure=False,
         )
         # If not System.Embedded, let's use the default attributes
         if "Attributes" not in oem:
             new_oem_endpoint = "/redfish/v1/Managers/iDRAC.Embedded.1/Attributes"
-            oem = self.get_redfish_url(new_oem_endpoint)
+            oem = snapshot.get(new_oem_endpoint)
             if "Attributes" not in oem:
                 h.fatal("Cannot find Dell OEM metrics, please fill a bug.")
 
@@ -69,9 +87,13 @@ class IDRAC(BMC):
         self.oem_endpoint = new_oem_endpoint
         return oem
 
-    def read_power_consumption(self, power_consumption: PowerConsumptionContext) -> PowerConsumptionContext:
-        power_consumption = super().read_power_consumption(power_consumption)
-        oem_system = self.get_oem_system()
+    def read_power_consumption(
+        self, power_consumption: PowerConsumptionContext, snapshot: BMCSnapshot | None = None
+    ) -> PowerConsumptionContext:
+        # The power and OEM endpoints are requested together, the power supplies are read from the same answer
+        snapshot = snapshot or self.snapshot(self.get_power_urls())
+        power_consumption = super().read_power_consumption(power_consumption, snapshot)
+        oem_system = self.get_oem_system(snapshot)
         if "ServerPwr.1.SCViewSledPwr" in oem_system["Attributes"]:
             # ServerPwr.1.SCViewSledPwr is computed from other metrics
             # It includes the SLED power consumption + a mathematical portion of the chassis consumption
@@ -95,7 +117,7 @@ class IDRAC(BMC):
         if chassis_name not in power_consumption.BMC:
             power_consumption.BMC[chassis_name] = Power(chassis_name)
         psus = PowerSuppliesContext()
-        psus = super().read_power_supplies(psus)
+        psus = super().read_power_supplies(psus, snapshot)
         power_consumption.BMC[chassis_name].add(float(sum([psu.get_values()[-1] for _, psu in psus.BMC.items()])))
 
         return power_consumption
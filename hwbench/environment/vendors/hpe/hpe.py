@@ -15,11 +15,15 @@ from hwbench.bench.monitoring_structs import (
     ThermalContext,
 )
 from hwbench.bench.monitoring_structs import PowerCategories as PowerCat
+from hwbench.environment.vendors.bmc import BMCSnapshot
 from hwbench.environment.vendors.vendor import BMC, Vendor
 from hwbench.utils import helpers as h
 
 from .ilorest import ILOREST, Ilorest, IlorestServerclone
 
+CHASSIS = "/redfish/v1/Chassis/1"
+ENCLOSURE_CHASSIS = "/redfish/v1/Chassis/enclosurechassis/"
+
 
 class ILO(BMC):
     def __init__(self, out_dir: pathlib.Path, vendor: Vendor, ilo: ILOREST):
@@ -38,11 +42,28 @@ class ILO(BMC):
 
         h.fatal("Cannot detect BMC url")
 
-    def get_thermal(self):
-        return self.get_redfish_url("/redfish/v1/Chassis/1/Thermal")
+    def get_thermal_urls(self) -> list[str]:
+        if self._get_chassis_sensors():
+            return super().get_thermal_urls()
+        return self._chassis_item_urls(CHASSIS, "Thermal")
+
+    def get_power_urls(self) -> list[str]:
+        urls = (
+            super().get_power_urls()
+            if self._get_chassis_sensors()
+            else self._chassis_item_urls(CHASSIS, "Power", f"{CHASSIS}/Power/")
+        )
+        if self.is_multinode_chassis():
+            urls.append(ENCLOSURE_CHASSIS)
+        return urls
+
+    def get_thermal(self, snapshot: BMCSnapshot | None = None):
+        return self._get_chassis_item(snapshot or self.snapshot(self.get_thermal_urls()), CHASSIS, "Thermal")
 
-    def read_thermals(self, thermals: ThermalContext) -> ThermalContext:
-        for t in self.get_thermal().get("Temperatures"):
+    def read_thermals(self, thermals: ThermalContext, snapshot: BMCSnapshot | None = None) -> ThermalContext:
+        if self._get_chassis_sensors():
+            return super().read_thermals(thermals, snapshot)
+        for t in self.get_thermal(snapshot).get("Temperatures"):
             if t["ReadingCelsius"] <= 0:
                 continue
             pc = t["PhysicalContext"]
@@ -103,16 +124,22 @@ class ILO(BMC):
                 print(f"read_thermals: Unsupported sensor {t['Name']}")
         return thermals
 
-    def get_power(self):
-        return self.get_redfish_url("/redfish/v1/Chassis/1/Power/")
+    def get_power(self, snapshot: BMCSnapshot | None = None):
+        return self._get_chassis_item(
+            snapshot or self.snapshot(self.get_power_urls()), CHASSIS, "Power", f"{CHASSIS}/Power/"
+        )
 
     @cache
     def __warn_psu(self, psu_number, message):
         logging.error(f"PSU {psu_number}: {message}")
 
-    def read_power_supplies(self, power_supplies: PowerSuppliesContext) -> PowerSuppliesContext:
+    def read_power_supplies(
+        self, power_supplies: PowerSuppliesContext, snapshot: BMCSnapshot | None = None
+    ) -> PowerSuppliesContext:
         """Return power supplies power from server"""
-        for psu in self.get_power().get("PowerSupplies"):
+        if self._get_chassis_sensors():
+            return super().read_power_supplies(power_supplies, snapshot)
+        for psu in self.get_power(snapshot).get("PowerSupplies"):
             psu_position = str(psu["Oem"]["Hpe"]["BayNumber"])
             # All PSUs are named the same (HpeServerPowerSupply)
             # Let's update it to have a unique name
@@ -140,13 +167,17 @@ class ILO(BMC):
 
         return power_supplies
 
-    def read_power_consumption(self, power_consumption: PowerConsumptionContext) -> PowerConsumptionContext:
-        oem_chassis = self.get_oem_chassis()
+    def read_power_consumption(
+        self, power_consumption: PowerConsumptionContext, snapshot: BMCSnapshot | None = None
+    ) -> PowerConsumptionContext:
+        # The power and enclosure endpoints are requested together
+        snapshot = snapshot or self.snapshot(self.get_power_urls())
+        oem_chassis = self.get_oem_chassis(snapshot)
 
         # If server is not in a chassis, the default parsing is good
         # That's the case for regular ProLiant servers
         if not oem_chassis:
-            return super().read_power_consumption(power_consumption)
+            return super().read_power_consumption(power_consumption, snapshot)
 
         # But for multi-server chassis, ...
         if "HPE Apollo2000 Gen10+" in oem_chassis["Name"]:
@@ -154,7 +185,15 @@ class ILO(BMC):
             server_in_chassis = str(PowerCat.SERVERINCHASSIS)
             if server_in_chassis not in power_consumption.BMC:
                 power_consumption.BMC[server_in_chassis] = Power(server_in_chassis)
-            power_consumption.BMC[server_in_chassis].add(self.get_power().get("PowerControl")[0]["PowerConsumedWatts"])
+            if self._get_chassis_sensors():
+                # The server power sensor of the chassis
+                server_power = super().read_power_consumption(PowerConsumptionContext(), snapshot)
+                for value in server_power.BMC[str(PowerCat.SERVER)].get_values():
+                    power_consumption.BMC[server_in_chassis].add(value)
+            else:
+                power_consumption.BMC[server_in_chassis].add(
+                    self.get_power(snapshot).get("PowerControl")[0]["PowerConsumedWatts"]
+                )
 
             # And extract SERVER from NodePowerWatts
             server = str(PowerCat.SERVER)
@@ -171,11 +210,11 @@ class ILO(BMC):
 
     @cache
     def is_multinode_chassis(self) -> bool:
-        return bool(self.get_redfish_url("/redfish/v1/Chassis/enclosurechassis/", log_failure=False))
+        return bool(self.get_redfish_url(ENCLOSURE_CHASSIS, log_failure=False))
 
-    def get_oem_chassis(self):
+    def get_oem_chassis(self, snapshot: BMCSnapshot | None = None):
         if self.is_multinode_chassis():
-            return self.get_redfish_url("/redfish/v1/Chassis/enclosurechassis/", log_failure=False)
+            return (snapshot or self.snapshot([])).get(ENCLOSURE_CHASSIS, log_failure=False)
         return {}
 
 
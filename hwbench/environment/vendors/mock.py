@@ -11,6 +11,7 @@ from hwbench.bench.monitoring_structs import (
     ThermalContext,
 )
 
+from .bmc import BMCSnapshot
 from .vendor import BMC, Vendor
 
 
@@ -22,7 +23,13 @@ class MockedBMC(BMC):
         self.firmware_version = "1.0.0"
         self.model = "MockedBMC"
 
-    def read_thermals(self, thermals: ThermalContext) -> ThermalContext:
+    def get_thermal_urls(self) -> list[str]:
+        return []
+
+    def get_power_urls(self) -> list[str]:
+        return []
+
+    def read_thermals(self, thermals: ThermalContext, snapshot: BMCSnapshot | None = None) -> ThermalContext:
         # Let's add a faked thermal metric
         name = "CPU1"
 
@@ -35,7 +42,7 @@ class MockedBMC(BMC):
         )
         return thermals
 
-    def read_fans(self, fans: FansContext) -> FansContext:
+    def read_fans(self, fans: FansContext, snapshot: BMCSnapshot | None = None) -> FansContext:
         # Let's add a faked fans metric
         name = "Fan1"
         if name not in fans.Fan:
@@ -43,7 +50,9 @@ class MockedBMC(BMC):
         fans.Fan[name].add(40)
         return fans
 
-    def read_power_consumption(self, power_consumption: PowerConsumptionContext) -> PowerConsumptionContext:
+    def read_power_consumption(
+        self, power_consumption: PowerConsumptionContext, snapshot: BMCSnapshot | None = None
+    ) -> PowerConsumptionContext:
         # Let's add a faked power metric
         name = str(PowerCategories.CHASSIS)
         if name not in power_consumption.BMC:
@@ -51,7 +60,9 @@ class MockedBMC(BMC):
         power_consumption.BMC[name].add(125.0)
         return power_consumption
 
-    def read_power_supplies(self, power_supplies: PowerSuppliesContext) -> PowerSuppliesContext:
+    def read_power_supplies(
+        self, power_supplies: PowerSuppliesContext, snapshot: BMCSnapshot | None = None
+    ) -> PowerSuppliesContext:
         # Let's add a faked power supplies
         status = "PS1 status"
         name = "PS1"
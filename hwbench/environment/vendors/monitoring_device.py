@@ -1,18 +1,56 @@
+from __future__ import annotations
+
 import json
 import logging
-from typing import Any
+import threading
+import time
+import urllib.parse
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
 
 import cachetools.func
 import redfish  # type: ignore
+import requests.adapters  # type: ignore
 
-from hwbench.bench.monitoring_structs import MonitorMetric
+from hwbench.bench.monitoring_structs import EndpointStats, MonitorMetric
 from hwbench.utils import helpers as h
 
+from .telemetry import RedfishTelemetry
+
+LOOPBACK = ["localhost", "127.0.0.1", "::1"]
+
+
+def get_body_bytes(response) -> int:
+    """Return the size of the body of a response, in bytes
+
+    Content-Length is the size sent by the device, before any decompression."""
+    length = response.getheader("Content-Length")
+    if length and str(length).isdigit():
+        return int(length)
+    body = getattr(response, "read", None) or b""
+    # The read content becomes text once the redfish library overrides it
+    return len(body.encode() if isinstance(body, str) else body)
+
 
 class MonitoringDevice:
+    # Persistent connections kept open to the device, it's also the number of concurrent requests
+    max_connections = 4
+    # Attempts after a failed request, like the redfish library does by default
+    max_retries = 10
+
     def __init__(self, vendor):
         self.vendor = vendor
         self.redfish_obj = None
+        self.executor: ThreadPoolExecutor | None = None
+        # The last ETag and content of each url, to send conditional requests
+        self.etags: dict[str, tuple[str, Any]] = {}
+        # The number of 200 and 304 answers of each url
+        self.conditional_requests: dict[str, dict[str, int]] = {}
+        # The statistics of the requests of each url, since the last take_endpoint_stats()
+        self.endpoints: dict[str, EndpointStats] = {}
+        self.requests_lock = threading.Lock()
+        # The metric reports pushed by the device, if subscribed
+        self.telemetry: RedfishTelemetry | None = None
         self.logged = False
         self.firmware_version = ""
         self.manufacturer = ""
@@ -20,6 +58,10 @@ class MonitoringDevice:
         self.serialnumber = ""
 
     def __del__(self):
+        if self.telemetry:
+            self.telemetry.stop()
+        if self.executor:
+            self.executor.shutdown(wait=False)
         if self.logged:
             try:
                 self.redfish_obj.logout()
@@ -76,9 +118,9 @@ class MonitoringDevice:
         """Return the driver name"""
         return type(self).__name__
 
-    def dump(self) -> dict[str, str]:
+    def dump(self) -> dict[str, Any]:
         """Return the dump of the drive"""
-        dump = {"driver": self.get_driver_name()}
+        dump: dict[str, Any] = {"driver": self.get_driver_name()}
         if self.firmware_version:
             dump["firmware_version"] = self.firmware_version
         if self.model:
@@ -89,6 +131,8 @@ class MonitoringDevice:
             dump["url"] = self.get_url()
         if self.manufacturer:
             dump["manufacturer"] = self.manufacturer
+        if self.conditional_requests:
+            dump["conditional_requests"] = self.conditional_requests
         return dump
 
     def connect_redfish(self, username: str, password: str, device_url: str):
@@ -105,14 +149,19 @@ class MonitoringDevice:
     def _connect_redfish(self, username: str, password: str, device_url: str, auth_method: str):
         """Connect to the device using Redfish."""
         try:
-            if not device_url.startswith("https://"):
-                h.fatal("redfish url '{device_url}' must be an https url")
+            # Only a local service, like the redfish simulator, can be reached without TLS
+            if not device_url.startswith("https://") and urllib.parse.urlparse(device_url).hostname not in LOOPBACK:
+                h.fatal(f"redfish url '{device_url}' must be an https url")
             self.redfish_obj = redfish.redfish_client(
                 base_url=device_url,
                 username=username,
                 password=password,
                 default_prefix="/redfish/v1",
                 timeout=10,
+                # Keep-alive connections, blocking the requests exceeding the pool size
+                https_adapter=requests.adapters.HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.max_connections, pool_block=True
+                ),
             )
             self.redfish_obj.login(auth=auth_method)
             self.logged = True
@@ -138,18 +187,108 @@ class MonitoringDevice:
         try:
             if self.redfish_obj is None:
                 return None
-            redfish = self.redfish_obj.get(url, None).dict
+            if self.telemetry:
+                pushed = self.telemetry.get(url)
+                if pushed is not None:
+                    return pushed
+            # If the content did not change since the last answer, the device answers 304 without a body
+            etag, last_content = self.etags.get(url, (None, None))
+            response = self.__request(url, {"If-None-Match": etag} if etag else None)
+            self.__count_answer(url, response.status)
+            if response.status == 304 and etag:
+                return last_content
+            content = response.dict
             # Let's ignore errors and return empty objects
             # It will be up to the caller to see there is no answer and process this
             # {'error':
             # {'code': 'iLO.0.10.ExtendedInfo', 'message': 'See @Message.ExtendedInfo for more information.', '@Message.ExtendedInfo':
             # [{'MessageArgs': ['/redfish/v1/Chassis/enclosurechassis/'], 'MessageId': 'Base.1.4.ResourceMissingAtURI'}]}}
-            if redfish and "error" in redfish:
+            if content and "error" in content:
                 if log_failure:
-                    logging.error(f"Parsing redfish url {url} failed : {redfish}")
+                    logging.error(f"Parsing redfish url {url} failed : {content}")
                 return {}
-            return redfish
+            etag = response.getheader("ETag")
+            if etag:
+                self.etags[url] = (etag, content)
+            if self.telemetry:
+                self.telemetry.watch(url, content)
+            return content
         except redfish.rest.v1.RetriesExhaustedError:
             return None
         except json.decoder.JSONDecodeError:
             return None
+
+    def start_telemetry(self) -> bool:
+        """Subscribe to the metric reports pushed by the device, return False if it cannot push them."""
+        event_service = self.get_redfish_url("/redfish/v1/EventService", log_failure=False) or {}
+        uri = event_service.get("ServerSentEventUri")
+        if not uri or self.redfish_obj is None:
+            return False
+        headers = {}
+        if self.redfish_obj.get_session_key():
+            headers["X-Auth-Token"] = self.redfish_obj.get_session_key()
+        elif self.redfish_obj.get_authorization_key():
+            headers["Authorization"] = self.redfish_obj.get_authorization_key()
+        self.telemetry = RedfishTelemetry(self.redfish_obj.get_base_url(), headers, uri)
+        self.telemetry.start()
+        return True
+
+    def get_push_time_ns(self) -> int | None:
+        """Return when the device produced its latest pushed metric report, None if not pushing."""
+        if self.telemetry:
+            return self.telemetry.get_report_time_ns()
+        return None
+
+    def __request(self, url: str, headers: dict[str, str] | None):
+        """Send a GET request, retrying it on failures, and record its statistics"""
+        assert self.redfish_obj
+        retries = 0
+        while True:
+            start_ns = time.monotonic_ns()
+            try:
+                # The retries are done here to be counted
+                response = self.redfish_obj.get(url, None, headers, max_retry=0)
+            except redfish.rest.v1.RetriesExhaustedError:
+                if retries >= self.max_retries:
+                    self.__record(url, None, 0, 0, retries)
+                    raise
+                # The redfish library already waited a second after the failure
+                retries += 1
+                continue
+            latency_ms = (time.monotonic_ns() - start_ns) / 1e6
+            self.__record(url, response.status, latency_ms, get_body_bytes(response), retries)
+            return response
+
+    def __record(self, url: str, status: int | None, latency_ms: float, body_bytes: int, retries: int):
+        with self.requests_lock:
+            self.endpoints.setdefault(url, EndpointStats()).add(status, latency_ms, body_bytes, retries)
+
+    def take_endpoint_stats(self) -> dict[str, EndpointStats]:
+        """Return the statistics of the requests of each url, and start new ones"""
+        with self.requests_lock:
+            endpoints, self.endpoints = self.endpoints, {}
+        return endpoints
+
+    def __count_answer(self, url: str, status: int):
+        if status not in (200, 304):
+            return
+        with self.requests_lock:
+            answers = self.conditional_requests.setdefault(url, {"200": 0, "304": 0})
+            answers[str(status)] += 1
+
+    def submit(self, function: Callable, *args) -> Future:
+        """Run function(*args) in the background, on the connection pool of the device."""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.max_connections, thread_name_prefix=f"redfish-{self.get_driver_name()}"
+            )
+        return self.executor.submit(function, *args)
+
+    def get_redfish_urls(self, urls: list[str], log_failure=True) -> dict[str, Any]:
+        """Return the content of several Redfish urls, requested concurrently."""
+        # The arguments must be passed like the single calls to share their ttl cache entries
+        if log_failure:
+            futures = [self.submit(self.get_redfish_url, url) for url in urls]
+        else:
+            futures = [self.submit(lambda url: self.get_redfish_url(url, log_failure=False), url) for url in urls]
+        return {url: future.result() for url, future in zip(urls, futures)}
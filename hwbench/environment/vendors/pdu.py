@@ -1,16 +1,109 @@
 from __future__ import annotations
 
-from hwbench.bench.monitoring_structs import Power, PowerConsumptionContext
+import threading
+import time
+
+from hwbench.bench.monitoring_structs import PduEnergy, Power, PowerConsumptionContext
 from hwbench.utils import helpers as h
 
 from .monitoring_device import MonitoringDevice
 
+JOULES_PER_KWH = 3.6e6
+
+
+def get_resolution_kwh(reading: float) -> float:
+    """Return the resolution of an energy counter reading, from its number of decimals"""
+    decimals = f"{reading:.6f}".rstrip("0").partition(".")[2]
+    return 10 ** -len(decimals)
+
+
+class EnergyMeter:
+    """Measure the energy consumed by the outlets of a PDU between a start() and a stop()
+
+    The cumulative energy counters (EnergykWh) are exact but often reported in Wh,
+    like 3600 J: they are used when their resolution is below <tolerance> of the
+    measured energy. Otherwise, or when the counters are not reported or went
+    backwards, the power readings are integrated over time."""
+
+    def __init__(self, tolerance: float = 0.02):
+        self.tolerance = tolerance
+        self.lock = threading.Lock()
+        self.start_ns: int | None = None
+        # (monotonic_ns, value by outlet) of every reading
+        self.power: list[tuple[int, dict[str, float]]] = []
+        self.counters: list[tuple[int, dict[str, float]]] = []
+
+    def start(self):
+        with self.lock:
+            self.start_ns = time.monotonic_ns()
+            self.power = []
+            self.counters = []
+
+    def add(self, power: dict[str, float], counters: dict[str, float]):
+        """Record the power (W) and energy counters (kWh) read on the outlets"""
+        now_ns = time.monotonic_ns()
+        with self.lock:
+            if self.start_ns is None:
+                return
+            if power:
+                self.power.append((now_ns, power))
+            if counters:
+                self.counters.append((now_ns, counters))
+
+    def stop(self) -> PduEnergy | None:
+        """Return the energy consumed since start(), None if nothing was read"""
+        with self.lock:
+            if self.start_ns is None:
+                return None
+            start_ns, stop_ns = self.start_ns, time.monotonic_ns()
+            self.start_ns = None
+            counted = self.__count((stop_ns - start_ns) * 1e-9)
+            if counted and (not self.power or (counted.resolution_j or 0) <= self.tolerance * counted.joules):
+                return counted
+            if self.power:
+                return self.__integrate(start_ns, stop_ns)
+            return counted
+
+    def __count(self, duration_s: float) -> PduEnergy | None:
+        """Return the energy from the counter readings, None if they are not usable"""
+        if len(self.counters) < 2:
+            return None
+        outlets = self.counters[0][1].keys()
+        for (_, previous), (_, current) in zip(self.counters, self.counters[1:]):
+            if current.keys() != outlets or any(current[outlet] < previous[outlet] for outlet in outlets):
+                # An outlet disappeared, or its counter was reset
+                return None
+        # A reading like 12.3 may be a 12.30 one, the finest reading tells the resolution
+        resolution_kwh = min(
+            get_resolution_kwh(reading) for _, readings in self.counters for reading in readings.values()
+        )
+        (_, first), (_, last) = self.counters[0], self.counters[-1]
+        return PduEnergy(
+            "counter",
+            duration_s,
+            {outlet: (last[outlet] - first[outlet]) * JOULES_PER_KWH for outlet in outlets},
+            resolution_kwh * JOULES_PER_KWH * len(outlets),
+        )
+
+    def __integrate(self, start_ns: int, stop_ns: int) -> PduEnergy:
+        """Return the energy from the power readings, by the trapezoidal rule
+
+        The first and last readings are extended to the start and the stop of the measure."""
+        outlets: dict[str, float] = {}
+        readings = [(start_ns, self.power[0][1]), *self.power, (stop_ns, self.power[-1][1])]
+        for (previous_ns, previous), (now_ns, power) in zip(readings, readings[1:]):
+            for outlet, watts in power.items():
+                energy = (watts + previous.get(outlet, watts)) / 2 * (now_ns - previous_ns) * 1e-9
+                outlets[outlet] = outlets.get(outlet, 0) + energy
+        return PduEnergy("integration", (stop_ns - start_ns) * 1e-9, outlets)
+
 
 class PDU(MonitoringDevice):
     def __init__(self, vendor, pdu_section: str):
         super().__init__(vendor)
         self.pdu_section = pdu_section
         self.outlet: str = self.vendor.monitoring_config_file.get(self.pdu_section, "outlet", fallback="")
+        self.energy = EnergyMeter()
 
     def get_url(self):
         url = super().get_url()
@@ -37,6 +130,17 @@ class PDU(MonitoringDevice):
         """Return the power metrics."""
         return 0.0
 
+    def start_energy(self):
+        """Start measuring the energy consumed by the outlets"""
+        self.energy.start()
+        # The drivers record the counters & power they read in self.energy
+        self.get_power_total()
+
+    def stop_energy(self) -> PduEnergy | None:
+        """Return the energy consumed by the outlets since start_energy()"""
+        self.get_power_total()
+        return self.energy.stop()
+
     def read_power_consumption(self, power_consumption: PowerConsumptionContext) -> PowerConsumptionContext:
         """Return power consumption from server"""
         # Generic for now, could be override by vendors
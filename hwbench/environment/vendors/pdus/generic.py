@@ -58,25 +58,34 @@ class Generic(PDU):
             h.fatal(f"Cannot get outlet from url {self.get_url()}{url}, please check its name: {res}")
         return res
 
+    def get_outlet_ids(self) -> list[str]:
+        """Return the monitored outlets or outlet groups"""
+        return (self.outletgroup or self.outlet).split(self.multi_separator)
+
     def get_power(self):
-        power = []
-        if self.outletgroup:
-            option, path = self.outletgroup, "OutletGroups"
-        else:
-            option, path = self.outlet, "Outlets"
-        for opt in option.split(self.multi_separator):
-            power.append(self.get_power_outlet(f"{self.redfish_root}{path}/{opt}"))
-        return power
+        path = "OutletGroups" if self.outletgroup else "Outlets"
+        # The outlets are requested concurrently
+        requests = [
+            self.submit(self.get_power_outlet, f"{self.redfish_root}{path}/{opt}") for opt in self.get_outlet_ids()
+        ]
+        return [request.result() for request in requests]
 
     def get_power_total(self):
-        total = 0.0
-        for outlet in self.get_power():
+        power = {}
+        counters = {}
+        for outlet_id, outlet in zip(self.get_outlet_ids(), self.get_power()):
             if "PowerWatts" not in outlet or "Reading" not in outlet["PowerWatts"]:
                 h.fatal(
                     f"Outlet for {self.get_url()} does not expose power metrics: {outlet}\noutlet={self.outlet}, outletgroup={self.outletgroup}"
                 )
-            total += outlet.get("PowerWatts")["Reading"]
-        return total
+            power[outlet_id] = outlet.get("PowerWatts")["Reading"]
+            # The cumulative energy counter, if the outlet reports it
+            reading = (outlet.get("EnergykWh") or {}).get("Reading")
+            if isinstance(reading, (int, float)):
+                counters[outlet_id] = float(reading)
+        # The energy counters are only usable when all the outlets report them
+        self.energy.add(power, counters if len(counters) == len(power) else {})
+        return sum(power.values(), 0.0)
 
     def read_power_consumption(self, power_consumption: PowerConsumptionContext) -> PowerConsumptionContext:
         """Return power consumption from pdu"""
@@ -0,0 +1,492 @@
+"""A local Redfish service simulating the BMC and PDU monitored by hwbench.
+
+It serves iDRAC, iLO or Raritan PDU like resources, with a configurable latency,
+jitter, error and timeout rate, or replays recorded answers. The monitoring path
+(requests, parsing, sampling) can then be measured and tested without hardware:
+
+    python -m hwbench.environment.vendors.simulator --profile idrac --port 8000 --latency-ms 80 --jitter-ms 40
+
+and set 'url=http://127.0.0.1:8000' in the BMC or PDU section of the monitoring configuration.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import pathlib
+import random
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+SESSIONS = "/redfish/v1/SessionService/Sessions"
+
+# The readings changing every refresh period, by a few percent
+VARYING_FIELDS = {
+    "ReadingCelsius",
+    "Reading",
+    "PowerConsumedWatts",
+    "PowerInputWatts",
+    "PowerOutputWatts",
+    "AveragePowerOutputWatts",
+    "ServerPwr.1.SCViewSledPwr",
+    "SC-BMC.1.ChassisInfraPower",
+}
+
+
+@dataclass
+class Faults:
+    """The latency and the failures injected in the answers"""
+
+    latency_ms: float = 0
+    # The latency varies uniformly by +/- jitter_ms
+    jitter_ms: float = 0
+    # Share of the requests answered by a 503 error
+    error_rate: float = 0
+    # Share of the requests never answered, the connection is closed after timeout_s
+    timeout_rate: float = 0
+    timeout_s: float = 15
+
+    def get_latency_s(self, rng: random.Random) -> float:
+        return max(0, self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+
+def link(url: str) -> dict[str, str]:
+    return {"@odata.id": url}
+
+
+def collection(url: str, members: list[str]) -> dict[str, Any]:
+    return {"@odata.id": url, "Members": [link(member) for member in members], "Members@odata.count": len(members)}
+
+
+def service_root(vendor: str, chassis: list[str], managers: list[str]) -> dict[str, Any]:
+    """Return the resources common to every profile"""
+    return {
+        "/redfish/v1": {
+            "@odata.id": "/redfish/v1",
+            "RedfishVersion": "1.11.0",
+            "Vendor": vendor,
+            "Chassis": link("/redfish/v1/Chassis"),
+            "Managers": link("/redfish/v1/Managers"),
+            "SessionService": link("/redfish/v1/SessionService"),
+            "Links": {"Sessions": link(SESSIONS)},
+        },
+        "/redfish/v1/Chassis": collection("/redfish/v1/Chassis", chassis),
+        "/redfish/v1/Managers": collection("/redfish/v1/Managers", managers),
+        SESSIONS: collection(SESSIONS, []),
+    }
+
+
+def idrac_tree() -> dict[str, Any]:
+    """A Dell PowerEdge sled, its power is reported in the OEM attributes"""
+    chassis = "/redfish/v1/Chassis/System.Embedded.1"
+    manager = "/redfish/v1/Managers/iDRAC.Embedded.1"
+    tree = service_root("Dell", [chassis], [manager])
+    temperatures = [
+        ("System Board Inlet Temp", 24, "Intake"),
+        ("System Board Exhaust Temp", 38, "Exhaust"),
+        ("CPU1 Temp", 58, "CPU"),
+        ("CPU2 Temp", 55, "CPU"),
+    ]
+    tree |= {
+        manager: {
+            "@odata.id": manager,
+            "FirmwareVersion": "6.10.30.00",
+            "Model": "14G Modular",
+            "Manufacturer": "Dell",
+        },
+        chassis: {
+            "@odata.id": chassis,
+            "Manufacturer": "Dell Inc.",
+            "Model": "PowerEdge C6420",
+            "Thermal": link(f"{chassis}/Thermal"),
+            "Power": link(f"{chassis}/Power"),
+        },
+        f"{chassis}/Thermal": {
+            "@odata.id": f"{chassis}/Thermal",
+            "Temperatures": [
+                {
+                    "@odata.id": f"{chassis}/Thermal#/Temperatures/{index}",
+                    "Name": name,
+                    "ReadingCelsius": reading,
+                    "PhysicalContext": context,
+                }
+                for index, (name, reading, context) in enumerate(temperatures)
+            ],
+            "Fans": [
+                {
+                    "@odata.id": f"{chassis}/Thermal#/Fans/{index}",
+                    "Name": f"System Board Fan{index + 1}",
+                    "Reading": 9600,
+                    "ReadingUnits": "RPM",
+                    "PhysicalContext": "SystemBoard",
+                }
+                for index in range(4)
+            ],
+        },
+        f"{chassis}/Power": {
+            "@odata.id": f"{chassis}/Power",
+            "PowerControl": [{"@odata.id": f"{chassis}/Power#/PowerControl/0", "PowerConsumedWatts": 320}],
+            "PowerSupplies": [
+                {
+                    "@odata.id": f"{chassis}/Power#/PowerSupplies/{index}",
+                    "Name": f"PS{index + 1} Status",
+                    "PowerInputWatts": 720,
+                    "PowerOutputWatts": 680,
+                    "Status": {"State": "Enabled", "Health": "OK"},
+                }
+                for index in range(2)
+            ],
+        },
+        f"{manager}/Oem/Dell/DellAttributes/System.Embedded.1": {
+            "@odata.id": f"{manager}/Oem/Dell/DellAttributes/System.Embedded.1",
+            "Attributes": {"ServerPwr.1.SCViewSledPwr": 352, "SC-BMC.1.ChassisInfraPower": 128},
+        },
+    }
+    return tree
+
+
+def ilo_tree() -> dict[str, Any]:
+    """A HPE ProLiant server, its power supplies are detailed in the OEM properties"""
+    chassis = "/redfish/v1/Chassis/1"
+    manager = "/redfish/v1/Managers/1"
+    tree = service_root("HPE", [chassis], [manager])
+    temperatures = [
+        ("01-Inlet Ambient", 22, "Intake"),
+        ("02-CPU 1", 40, "CPU"),
+        ("03-CPU 2", 40, "CPU"),
+        ("04-P1 DIMM 1-6", 33, "SystemBoard"),
+        ("39-Sys Exhaust 1", 36, "Exhaust"),
+    ]
+    tree |= {
+        manager: {"@odata.id": manager, "FirmwareVersion": "iLO 5 v2.72", "Model": "iLO 5", "Manufacturer": "HPE"},
+        chassis: {
+            "@odata.id": chassis,
+            "Manufacturer": "HPE",
+            "Model": "ProLiant DL380 Gen10",
+            "Thermal": link(f"{chassis}/Thermal"),
+            "Power": link(f"{chassis}/Power/"),
+        },
+        f"{chassis}/Thermal": {
+            "@odata.id": f"{chassis}/Thermal",
+            "Temperatures": [
+                {
+                    "@odata.id": f"{chassis}/Thermal#Temperatures/{index}",
+                    "Name": name,
+                    "ReadingCelsius": reading,
+                    "PhysicalContext": context,
+                }
+                for index, (name, reading, context) in enumerate(temperatures)
+            ],
+            "Fans": [
+                {
+                    "@odata.id": f"{chassis}/Thermal#Fans/{index}",
+                    "Name": f"Fan {index + 1}",
+                    "Reading": 24,
+                    "ReadingUnits": "Percent",
+                }
+                for index in range(6)
+            ],
+        },
+        f"{chassis}/Power": {
+            "@odata.id": f"{chassis}/Power/",
+            "PowerControl": [{"@odata.id": f"{chassis}/Power#PowerControl/0", "PowerConsumedWatts": 260}],
+            "PowerSupplies": [
+                {
+                    "@odata.id": f"{chassis}/Power#PowerSupplies/{index}",
+                    "Name": "HpeServerPowerSupply",
+                    "Status": {"State": "Enabled", "Health": "OK"},
+                    "Oem": {"Hpe": {"BayNumber": index + 1, "AveragePowerOutputWatts": 125}},
+                }
+                for index in range(2)
+            ],
+        },
+    }
+    return tree
+
+
+def raritan_tree(outlets: int = 8) -> dict[str, Any]:
+    """A Raritan rack PDU, its outlets are grouped by pairs"""
+    pdu = "/redfish/v1/PowerEquipment/RackPDUs/1"
+    tree = service_root("Raritan", [], [])
+    tree |= {
+        pdu: {
+            "@odata.id": pdu,
+            "Id": "1",
+            "Name": "PDU 1",
+            "EquipmentType": "RackPDU",
+            "Manufacturer": "Raritan",
+            "Model": "PX3-5722V-V2",
+            "SerialNumber": "1E00000000000",
+            "FirmwareVersion": "4.3.0.5-51180",
+            "UserLabel": "SIMULATOR/RACK-1/FEED-A",
+            "Outlets": link(f"{pdu}/Outlets"),
+            "OutletGroups": link(f"{pdu}/OutletGroups"),
+        },
+        f"{pdu}/Outlets": collection(f"{pdu}/Outlets", [f"{pdu}/Outlets/{outlet}" for outlet in range(1, outlets + 1)]),
+        f"{pdu}/OutletGroups": collection(
+            f"{pdu}/OutletGroups", [f"{pdu}/OutletGroups/{group}" for group in range(1, outlets // 2 + 1)]
+        ),
+    }
+    for outlet in range(1, outlets + 1):
+        tree[f"{pdu}/Outlets/{outlet}"] = {
+            "@odata.id": f"{pdu}/Outlets/{outlet}",
+            "Id": str(outlet),
+            "Name": f"Outlet {outlet}",
+            "UserLabel": f"server-{(outlet + 1) // 2} PSU{2 - outlet % 2}",
+            "Status": {"State": "Enabled", "Health": "OK"},
+            "PowerWatts": {"Reading": 180},
+            "EnergykWh": {"Reading": 1000.0 + outlet},
+        }
+    for group in range(1, outlets // 2 + 1):
+        tree[f"{pdu}/OutletGroups/{group}"] = {
+            "@odata.id": f"{pdu}/OutletGroups/{group}",
+            "Id": str(group),
+            "Name": f"server-{group}",
+            "Status": {"State": "Enabled", "Health": "OK"},
+            "PowerWatts": {"Reading": 360},
+            "EnergykWh": {"Reading": 2000.0 + group},
+        }
+    return tree
+
+
+PROFILES: dict[str, Callable[[], dict[str, Any]]] = {
+    "idrac": idrac_tree,
+    "ilo": ilo_tree,
+    "raritan": raritan_tree,
+}
+
+
+def resource_key(url: str) -> str:
+    """Return the tree key of an url, like the services ignoring the trailing slash"""
+    return url.rstrip("/") or "/"
+
+
+def vary(document: Any, rng: random.Random, amplitude: float = 0.03) -> Any:
+    """Return a copy of a document with its readings moved by up to amplitude"""
+    if isinstance(document, list):
+        return [vary(item, rng, amplitude) for item in document]
+    if not isinstance(document, dict):
+        return document
+    varied: dict[str, Any] = {}
+    for key, value in document.items():
+        if key in VARYING_FIELDS and isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = value * (1 + rng.uniform(-amplitude, amplitude))
+            varied[key] = round(value) if isinstance(document[key], int) else round(value, 2)
+        else:
+            varied[key] = vary(value, rng, amplitude)
+    return varied
+
+
+def load_replay(replay_file: pathlib.Path) -> dict[str, list[Any]]:
+    """Load recorded answers: a json object of the answers by url.
+
+    An url recorded with a list of answers replays them in sequence, in a loop."""
+    recorded = json.loads(replay_file.read_text())
+    if not isinstance(recorded, dict):
+        raise ValueError(f"{replay_file} must be a json object of the answers by url")
+    return {
+        resource_key(url): answers if isinstance(answers, list) and answers else [answers]
+        for url, answers in recorded.items()
+    }
+
+
+class RedfishHandler(BaseHTTPRequestHandler):
+    # Keep-alive connections, like the BMCs
+    protocol_version = "HTTP/1.1"
+    server: RedfishSimulator
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status: int, document: Any = None, headers: dict[str, str] | None = None):
+        body = json.dumps(document).encode() if document is not None else b""
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if body:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def inject_faults(self) -> bool:
+        """Wait for the simulated latency, return False if the request must not be answered"""
+        simulator = self.server
+        with simulator.lock:
+            latency_s = simulator.faults.get_latency_s(simulator.rng)
+            draw = simulator.rng.random()
+        if draw < simulator.faults.timeout_rate:
+            time.sleep(simulator.faults.timeout_s)
+            self.close_connection = True
+            return False
+        time.sleep(latency_s)
+        if draw < simulator.faults.timeout_rate + simulator.faults.error_rate:
+            self.send_json(503, simulator.error("Base.1.8.ServiceTemporarilyUnavailable", self.path))
+            return False
+        return True
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        self.server.count(path)
+        if not self.inject_faults():
+            return
+        document = self.server.get(path)
+        if document is None:
+            self.send_json(404, self.server.error("Base.1.8.ResourceMissingAtURI", path))
+            return
+        etag = '"' + hashlib.sha1(json.dumps(document, sort_keys=True).encode()).hexdigest()[:16] + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_json(304, headers={"ETag": etag})
+            return
+        self.send_json(200, document, {"ETag": etag})
+
+    def do_POST(self):
+        # Any credentials open a session
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.split("?")[0].rstrip("/") != SESSIONS:
+            self.send_json(405, self.server.error("Base.1.8.ActionNotSupported", self.path))
+            return
+        session = self.server.open_session()
+        self.send_json(
+            201,
+            {"@odata.id": session, "UserName": "simulator"},
+            {"X-Auth-Token": session.rsplit("/", 1)[-1], "Location": session},
+        )
+
+    def do_DELETE(self):
+        self.send_json(204)
+
+
+class RedfishSimulator(ThreadingHTTPServer):
+    """A Redfish service answering from a profile tree or from recorded answers"""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int] = ("127.0.0.1", 0),
+        profile: str = "idrac",
+        faults: Faults | None = None,
+        replay: dict[str, list[Any]] | None = None,
+        refresh_s: float = 1.0,
+        seed: int | None = None,
+        verbose: bool = False,
+    ):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown '{profile}' profile, valid profiles are {', '.join(PROFILES)}")
+        super().__init__(address, RedfishHandler)
+        self.tree = {resource_key(url): document for url, document in PROFILES[profile]().items()}
+        self.faults = faults or Faults()
+        self.replay = replay or {}
+        # The readings change every refresh_s, like the sensors polled by a BMC
+        self.refresh_s = refresh_s
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.rng = random.Random(self.seed)
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        # Number of GET requests by path
+        self.requests: dict[str, int] = {}
+        self.replayed: dict[str, int] = {}
+        self.sessions = 0
+        self.thread: threading.Thread | None = None
+        self.started = time.monotonic()
+
+    def get_url(self) -> str:
+        host, port = self.server_address[:2]
+        assert isinstance(host, str)
+        return f"http://{host}:{port}"
+
+    def count(self, path: str):
+        with self.lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def open_session(self) -> str:
+        with self.lock:
+            self.sessions += 1
+            return f"{SESSIONS}/{self.sessions}"
+
+    def error(self, message_id: str, path: str) -> dict[str, Any]:
+        return {
+            "error": {
+                "code": message_id,
+                "message": "See @Message.ExtendedInfo for more information.",
+                "@Message.ExtendedInfo": [{"MessageId": message_id, "MessageArgs": [path]}],
+            }
+        }
+
+    def get(self, path: str) -> Any | None:
+        """Return the answer to an url, None if it does not exist"""
+        key = resource_key(path)
+        if key in self.replay:
+            with self.lock:
+                index = self.replayed.get(key, 0)
+                self.replayed[key] = index + 1
+            answers = self.replay[key]
+            return answers[index % len(answers)]
+        if key not in self.tree:
+            return None
+        period = int(time.monotonic() / self.refresh_s) if self.refresh_s else 0
+        document = vary(self.tree[key], random.Random(f"{self.seed}-{key}-{period}"))
+        if isinstance(document, dict) and "EnergykWh" in document:
+            # The energy counters accumulate the nominal power since the start, with a Wh resolution
+            nominal = self.tree[key]
+            consumed_kwh = nominal["PowerWatts"]["Reading"] * (time.monotonic() - self.started) / 3.6e6
+            document["EnergykWh"] = {"Reading": round(nominal["EnergykWh"]["Reading"] + consumed_kwh, 3)}
+        return document
+
+    def start(self) -> RedfishSimulator:
+        """Serve the requests in the background"""
+        self.thread = threading.Thread(target=self.serve_forever, name="redfish-simulator", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        prog="hwbench-redfish-simulator", description="simulate the Redfish service of a BMC or a PDU"
+    )
+    parser.add_argument("--profile", choices=list(PROFILES), default="idrac", help="the simulated device")
+    parser.add_argument("--address", default="127.0.0.1", help="the listening address")
+    parser.add_argument("--port", type=int, default=8000, help="the listening port")
+    parser.add_argument("--latency-ms", type=float, default=0, help="the latency of every answer")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="the latency varies by +/- jitter")
+    parser.add_argument("--error-rate", type=float, default=0, help="share of requests answered by a 503 error")
+    parser.add_argument("--timeout-rate", type=float, default=0, help="share of requests never answered")
+    parser.add_argument("--timeout", type=float, default=15, help="seconds before closing an unanswered request")
+    parser.add_argument("--refresh", type=float, default=1, help="seconds between two changes of the readings")
+    parser.add_argument("--replay", type=pathlib.Path, help="a json file of the recorded answers by url")
+    parser.add_argument("--seed", type=int, help="the seed of the injected faults and readings")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    faults = Faults(args.latency_ms, args.jitter_ms, args.error_rate, args.timeout_rate, args.timeout)
+    simulator = RedfishSimulator(
+        (args.address, args.port),
+        args.profile,
+        faults,
+        load_replay(args.replay) if args.replay else None,
+        args.refresh,
+        args.seed,
+        args.verbose,
+    )
+    print(f"Simulating a {args.profile} redfish service on {simulator.get_url()}")
+    try:
+        simulator.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Redfish metric reports pushed by the device over a Server-Sent Events stream.
+
+The EventService of recent BMCs exposes a ServerSentEventUri streaming the
+TelemetryService MetricReports. Each metric value points to the property it
+reports, like '/redfish/v1/Chassis/1/Thermal#/Temperatures/0/ReadingCelsius'.
+
+The pushed values are applied to a copy of the polled resources, so the vendor
+parsers read them like a polled answer, without requesting the device.
+"""
+
+from __future__ import annotations
+
+import copy
+import datetime
+import json
+import logging
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+import requests  # type: ignore
+
+# Only the metric reports are streamed, not the other events
+SSE_FILTER = "?$filter=EventFormatType%20eq%20MetricReport"
+
+
+def parse_sse(lines: Iterable[str]) -> Iterator[str]:
+    """Return the data of every event of a Server-Sent Events stream"""
+    data: list[str] = []
+    for line in lines:
+        if not line:
+            # An empty line dispatches the event
+            if data:
+                yield "\n".join(data)
+            data = []
+        elif line.startswith("data:"):
+            data.append(line[5:].removeprefix(" "))
+        # Comments, ids, event types and retry delays are not used
+    if data:
+        yield "\n".join(data)
+
+
+def timestamp_to_monotonic_ns(timestamp: str) -> int:
+    """Convert a Redfish timestamp of the device clock to the host monotonic clock"""
+    epoch_s = datetime.datetime.fromisoformat(timestamp).timestamp()
+    now_ns = time.monotonic_ns()
+    # A device clock ahead of the host cannot report samples from the future
+    return min(now_ns, now_ns - int((time.time() - epoch_s) * 1e9))
+
+
+def to_number(value: Any) -> Any:
+    """MetricValue is a string, numbers are converted back"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+
+class RedfishTelemetry:
+    """Keep the resources of a monitoring device updated by its metric reports.
+
+    A resource is served from the pushed values as long as a report updated it
+    within max_age_s, otherwise the device must be polled."""
+
+    def __init__(self, base_url: str, headers: dict[str, str], uri: str, max_age_s: float = 10):
+        self.url = f"{base_url.rstrip('/')}{uri}{SSE_FILTER}"
+        self.headers = {**headers, "Accept": "text/event-stream"}
+        self.max_age_s = max_age_s
+        self.retry_s = 5.0
+        self.lock = threading.Lock()
+        # The latest content of the watched resources, by url
+        self.documents: dict[str, Any] = {}
+        # When a report last updated a resource, in host monotonic time
+        self.updated_ns: dict[str, int] = {}
+        # The device timestamp of the latest report, in host monotonic time, and when it was received
+        self.last_report_ns = 0
+        self.last_received_ns = 0
+        self.reports = 0
+        self.stopped = threading.Event()
+        self.session = requests.Session()
+        self.listener: threading.Thread | None = None
+
+    @staticmethod
+    def __key(url: str) -> str:
+        return url.rstrip("/")
+
+    def watch(self, url: str, content: Any):
+        """Register the polled content of a resource, pushed values will update it"""
+        if not isinstance(content, dict) or not content:
+            return
+        with self.lock:
+            self.documents[self.__key(url)] = content
+
+    def get(self, url: str) -> Any | None:
+        """Return the pushed content of a resource, None if it must be polled"""
+        key = self.__key(url)
+        with self.lock:
+            updated_ns = self.updated_ns.get(key)
+            if updated_ns is None or time.monotonic_ns() - updated_ns > self.max_age_s * 1e9:
+                return None
+            return self.documents[key]
+
+    def get_report_time_ns(self) -> int | None:
+        """Return when the device produced its latest report, None if the reports are too old"""
+        if not self.last_received_ns or time.monotonic_ns() - self.last_received_ns > self.max_age_s * 1e9:
+            return None
+        return self.last_report_ns
+
+    def apply(self, report: dict):
+        """Update the watched resources with the values of a metric report"""
+        received_ns = time.monotonic_ns()
+        updated: dict[str, Any] = {}
+        with self.lock:
+            for metric in report.get("MetricValues", []):
+                url, _, pointer = str(metric.get("MetricProperty", "")).partition("#")
+                key = self.__key(url)
+                if key not in self.documents or not pointer:
+                    continue
+                # The served documents are never modified, a new copy is updated
+                if key not in updated:
+                    updated[key] = copy.deepcopy(self.documents[key])
+                if not self.__set(updated[key], pointer, to_number(metric.get("MetricValue"))):
+                    logging.debug(f"Telemetry: no {metric.get('MetricProperty')} property to update")
+            for key, document in updated.items():
+                self.documents[key] = document
+                self.updated_ns[key] = received_ns
+            if updated:
+                self.reports += 1
+                self.last_received_ns = received_ns
+                timestamp = report.get("Timestamp")
+                try:
+                    self.last_report_ns = timestamp_to_monotonic_ns(timestamp) if timestamp else received_ns
+                except ValueError:
+                    self.last_report_ns = received_ns
+
+    @staticmethod
+    def __set(document: Any, pointer: str, value: Any) -> bool:
+        """Set a value in a document at a JSON pointer like /Temperatures/0/ReadingCelsius"""
+        tokens = [token.replace("~1", "/").replace("~0", "~") for token in pointer.strip("/").split("/")]
+        for token in tokens[:-1]:
+            if isinstance(document, list) and token.isdigit() and int(token) < len(document):
+                document = document[int(token)]
+            elif isinstance(document, dict) and token in document:
+                document = document[token]
+            else:
+                return False
+        last = tokens[-1]
+        if isinstance(document, list) and last.isdigit() and int(last) < len(document):
+            document[int(last)] = value
+        elif isinstance(document, dict):
+            document[last] = value
+        else:
+            return False
+        return True
+
+    @staticmethod
+    def __read_lines(stream: requests.Response) -> Iterator[str]:
+        """Return the lines of the stream as soon as they are received, not when a read buffer is full"""
+        buffer = b""
+        while chunk := stream.raw.read1(65536):
+            *lines, buffer = (buffer + chunk).split(b"\n")
+            for line in lines:
+                yield line.rstrip(b"\r").decode("utf-8", "ignore")
+        if buffer:
+            yield buffer.decode("utf-8", "ignore")
+
+    def __listen(self):
+        """Read the stream, reconnecting until stopped"""
+        while not self.stopped.is_set():
+            try:
+                with self.session.get(self.url, headers=self.headers, stream=True, verify=False, timeout=30) as stream:
+                    stream.raise_for_status()
+                    for data in parse_sse(self.__read_lines(stream)):
+                        if self.stopped.is_set():
+                            return
+                        try:
+                            event = json.loads(data)
+                        except json.decoder.JSONDecodeError:
+                            continue
+                        if isinstance(event, dict) and "MetricValues" in event:
+                            self.apply(event)
+            except requests.exceptions.RequestException as e:
+                logging.warning(f"Telemetry: stream {self.url} failed ({e}), polling until it reconnects")
+            self.stopped.wait(self.retry_s)
+
+    def start(self):
+        self.stopped.clear()
+        self.listener = threading.Thread(target=self.__listen, name="redfish-telemetry", daemon=True)
+        self.listener.start()
+
+    def stop(self):
+        """Stop listening, the stream is closed when the device sends its next event"""
+        self.stopped.set()
+        self.session.close()
@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import pathlib
+import threading
+import time
+import types
+from unittest.mock import patch
+
+import redfish  # type: ignore
+
+from hwbench.bench.monitoring_structs import (
+    FansContext,
+    PowerConsumptionContext,
+    PowerSuppliesContext,
+    ThermalContext,
+)
+
+from .bmc import BMC
+from .dell.dell import IDRAC
+from .hpe.hpe import ILO
+from .monitoring_device import get_body_bytes
+
+CHASSIS = [f"/redfish/v1/Chassis/{chassis}" for chassis in range(8)]
+
+
+class FakeRedfish:
+    """A slow redfish client, counting the concurrent requests"""
+
+    def __init__(self, expand: bool = False):
+        self.expand = expand
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests: list[str] = []
+
+    def content(self, url: str) -> dict:
+        if url == "/redfish/v1/":
+            expand = {"NoLinks": self.expand, "Levels": self.expand, "MaxLevels": 3}
+            return {"ProtocolFeaturesSupported": {"ExpandQuery": expand, "SelectQuery": self.expand}}
+        if url == "/redfish/v1/Managers/":
+            return {"Members": [{"@odata.id": "/redfish/v1/Managers/1"}]}
+        if url == "/redfish/v1/Managers/1":
+            return {"FirmwareVersion": "1.0", "Model": "fake"}
+        if url.startswith("/redfish/v1/Chassis?$expand=.($levels=2)&$select=Members/Thermal/Temperatures,"):
+            members = [{"@odata.id": chassis, "Thermal": self.content(f"{chassis}/Thermal")} for chassis in CHASSIS]
+            return {"Members": members}
+        if url == "/redfish/v1/Chassis":
+            return {"Members": [{"@odata.id": chassis} for chassis in CHASSIS]}
+        if url in CHASSIS:
+            return {"Thermal": {"@odata.id": f"{url}/Thermal"}}
+        name = f"Inlet {url.split('/')[-2]} Temp"
+        return {"Temperatures": [{"Name": name, "ReadingCelsius": 25, "PhysicalContext": "Intake"}]}
+
+    def get(self, url, _args=None, headers=None, max_retry=None):
+        with self.lock:
+            self.requests.append(url)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.05)
+        with self.lock:
+            self.in_flight -= 1
+        return types.SimpleNamespace(dict=self.content(url), status=200, getheader=lambda _: None)
+
+
+class ETagRedfish:
+    """A redfish client answering 304 if the If-None-Match header matches the current ETag"""
+
+    def __init__(self):
+        self.etag = "1"
+        self.parsed = 0
+
+    def get(self, url, _args=None, headers=None, max_retry=None):
+        if headers and headers.get("If-None-Match") == self.etag:
+            return types.SimpleNamespace(status=304, getheader=lambda _: None)
+        return types.SimpleNamespace(
+            dict=self.parse(), status=200, getheader=lambda name: self.etag if name == "ETag" else None
+        )
+
+    def parse(self) -> dict:
+        self.parsed += 1
+        return {"PowerControl": [{"PowerConsumedWatts": 100 + int(self.etag)}]}
+
+
+SENSORS = [
+    {"Name": "Inlet Temp", "Reading": 22, "ReadingType": "Temperature", "PhysicalContext": "Intake"},
+    {"Name": "CPU1 Temp", "Reading": 61, "ReadingType": "Temperature", "PhysicalContext": "CPU"},
+    {"Name": "Fan1", "Reading": 9000, "ReadingType": "Rotational", "ReadingUnits": "RPM", "PhysicalContext": "Fan"},
+    {"Name": "Total Power", "Reading": 420, "ReadingType": "Power", "PhysicalContext": "Chassis"},
+    {"Name": "PS1 Input Power", "Reading": 230, "ReadingType": "Power", "PhysicalContext": "PowerSupply"},
+    {"Name": "PS1 Output Power", "Reading": 210, "ReadingType": "Power", "PhysicalContext": "PowerSupply"},
+    {"Name": "PS1 Voltage", "Reading": 230, "ReadingType": "Voltage", "PhysicalContext": "PowerSupply"},
+]
+
+
+class SensorsRedfish:
+    """A redfish client exposing a Sensors collection, expanded or not"""
+
+    def __init__(self, expand: bool, chassis: str = "/redfish/v1/Chassis/1", oem: dict | None = None):
+        self.expand = expand
+        self.chassis = chassis
+        # The vendor specific urls and their content
+        self.oem = oem or {}
+        self.requests: list[str] = []
+
+    def content(self, url: str) -> dict:
+        sensors = f"{self.chassis}/Sensors"
+        if url in self.oem:
+            return self.oem[url]
+        if url == "/redfish/v1/":
+            return {"ProtocolFeaturesSupported": {"ExpandQuery": {"NoLinks": self.expand}, "SelectQuery": True}}
+        if url == "/redfish/v1/Managers/":
+            return {"Members": [{"@odata.id": "/redfish/v1/Managers/1"}]}
+        if url == "/redfish/v1/Chassis":
+            return {"Members": [{"@odata.id": self.chassis}]}
+        if url == self.chassis:
+            return {"Sensors": {"@odata.id": sensors}}
+        if (
+            url
+            == f"{sensors}?$expand=.&$select=Members/Name,Members/Reading,Members/ReadingType,Members/ReadingUnits,Members/PhysicalContext"
+        ):
+            return {"Members": SENSORS}
+        if url == sensors:
+            return {"Members": [{"@odata.id": f"{sensors}/{index}"} for index in range(len(SENSORS))]}
+        if url.startswith(f"{sensors}/"):
+            return SENSORS[int(url.split("/")[-1])]
+        return {}
+
+    def get(self, url, _args=None, headers=None, max_retry=None):
+        self.requests.append(url)
+        return types.SimpleNamespace(dict=self.content(url), status=200, getheader=lambda _: None)
+
+
+class FlakyRedfish:
+    """A redfish client failing the first request of every url, answering 404 on unknown urls"""
+
+    def __init__(self):
+        self.failed: set[str] = set()
+
+    def get(self, url, _args=None, headers=None, max_retry=None):
+        if url not in self.failed:
+            self.failed.add(url)
+            raise redfish.rest.v1.RetriesExhaustedError()
+        if url == "/redfish/v1/Chassis/1/Power":
+            return types.SimpleNamespace(dict={}, read=b"{}", status=200, getheader=lambda _: None)
+        error = {"error": {"code": "Base.1.4.ResourceMissingAtURI"}}
+        return types.SimpleNamespace(dict=error, read=b"x" * 50, status=404, getheader=lambda _: None)
+
+
+class TestMonitoringDevice:
+    def test_concurrent_requests(self):
+        bmc = BMC(pathlib.Path(""), None)
+        redfish = FakeRedfish()
+        bmc.redfish_obj = redfish
+        thermals = bmc.read_thermals(ThermalContext())
+        assert len(thermals["Intake"]) == len(CHASSIS)
+        # The chassis are requested concurrently, but never more than the pool size
+        assert 1 < redfish.max_in_flight <= bmc.max_connections
+
+        # The ttl cache is shared with the single requests
+        requests = len(redfish.requests)
+        bmc.read_thermals(ThermalContext())
+        assert bmc.get_redfish_url(f"{CHASSIS[0]}/Thermal") is not None
+        assert len(redfish.requests) == requests
+
+    def test_snapshot(self):
+        bmc = BMC(pathlib.Path(""), None)
+        redfish = FakeRedfish()
+        bmc.redfish_obj = redfish
+        # The chassis are detected once
+        assert len(bmc.get_thermal_urls()) == len(CHASSIS)
+        redfish.requests.clear()
+        BMC.get_redfish_url.cache_clear()  # type: ignore[attr-defined]
+
+        snapshot = bmc.snapshot(bmc.get_thermal_urls())
+        assert len(redfish.requests) == len(CHASSIS)
+        # The readings of an iteration are served by the snapshot, whatever the ttl cache
+        BMC.get_redfish_url.cache_clear()  # type: ignore[attr-defined]
+        thermals = bmc.read_thermals(ThermalContext(), snapshot)
+        bmc.read_fans(FansContext(), snapshot)
+        assert len(thermals["Intake"]) == len(CHASSIS)
+        assert len(redfish.requests) == len(CHASSIS)
+
+    def test_pooled_connections(self):
+        bmc = BMC(pathlib.Path(""), None)
+        with patch("redfish.redfish_client") as redfish_client:
+            bmc._connect_redfish("user", "password", "https://bmc", "session")
+        adapter = redfish_client.call_args.kwargs["https_adapter"]
+        assert adapter._pool_maxsize == bmc.max_connections
+        assert adapter._pool_block
+        assert bmc.logged
+
+    def test_expand(self):
+        bmc = BMC(pathlib.Path(""), None)
+        redfish = FakeRedfish(expand=True)
+        bmc.redfish_obj = redfish
+        bmc.detect()
+        assert bmc.expand_query
+        assert bmc.select_query
+        # The chassis are detected once
+        bmc.read_thermals(ThermalContext())
+        redfish.requests.clear()
+        BMC.get_redfish_url.cache_clear()  # type: ignore[attr-defined]
+        thermals = bmc.read_thermals(ThermalContext())
+        assert len(thermals["Intake"]) == len(CHASSIS)
+        # All the chassis thermals in one request
+        assert len(redfish.requests) == 1
+        # These chassis have no Power subresource
+        assert bmc._get_expanded_items(bmc.snapshot([]), "Power") == {}
+
+    def test_no_expand(self):
+        bmc = BMC(pathlib.Path(""), None)
+        redfish = FakeRedfish()
+        bmc.redfish_obj = redfish
+        bmc.detect()
+        assert not bmc.expand_query
+        thermals = bmc.read_thermals(ThermalContext())
+        assert len(thermals["Intake"]) == len(CHASSIS)
+        assert not any("$expand" in url for url in redfish.requests)
+
+    def test_etag(self):
+        bmc = BMC(pathlib.Path(""), None)
+        redfish = ETagRedfish()
+        bmc.redfish_obj = redfish
+        url = "/redfish/v1/Chassis/1/Power"
+        for etag in ["1", "1", "1", "2", "2"]:
+            # Skip the ttl cache
+            BMC.get_redfish_url.cache_clear()  # type: ignore[attr-defined]
+            redfish.etag = etag
+            assert bmc.get_redfish_url(url)["PowerControl"][0]["PowerConsumedWatts"] == 100 + int(etag)
+        # The content was only parsed when it changed
+        assert redfish.parsed == 2
+        assert bmc.conditional_requests == {url: {"200": 2, "304": 3}}
+
+    def test_sensors(self):
+        for expand in [True, False]:
+            bmc = BMC(pathlib.Path(""), None)
+            redfish = SensorsRedfish(expand)
+            bmc.redfish_obj = redfish
+            bmc.detect()
+            assert bmc._get_chassis_sensors() == {"1": "/redfish/v1/Chassis/1/Sensors"}
+            redfish.requests.clear()
+            BMC.get_redfish_url.cache_clear()  # type: ignore[attr-defined]
+
+            thermals = bmc.read_thermals(ThermalContext())
+            assert thermals["Intake"]["Inlet Temp"].get_name() == "Inlet"
+            assert list(thermals["CPU"]["CPU1 Temp"].get_values()) == [61]
+            fans = bmc.read_fans(FansContext())
+            assert fans.Fan["Fan1"].get_unit() == "RPM"
+            power = bmc.read_power_consumption(PowerConsumptionContext())
+            assert list(power.BMC["Server"].get_values()) == [420]
+            psus = bmc.read_power_supplies(PowerSuppliesContext())
+            assert list(psus.BMC) == ["PS1 Input Power"]
+            assert list(psus.BMC["PS1 Input Power"].get_values()) == [230]
+            # A single bulk request if the collection can be expanded, otherwise every sensor concurrently
+            assert len(redfish.requests) == (1 if expand else 1 + len(SENSORS))
+
+    def test_dell_sensors(self):
+        chassis = "/redfish/v1/Chassis/System.Embedded.1"
+        oem_endpoint = "/redfish/v1/Managers/iDRAC.Embedded.1/Oem/Dell/DellAttributes/System.Embedded.1"
+        oem = {oem_endpoint: {"Attributes": {"SC-BMC.1.ChassisInfraPower": 54}}}
+        bmc = IDRAC(pathlib.Path(""), None)
+        redfish = SensorsRedfish(True, chassis, oem)
+        bmc.redfish_obj = redfish
+        bmc.detect()
+        power = bmc.read_power_consumption(PowerConsumptionContext())
+        assert list(power.BMC["Server"].get_values()) == [420]
+        assert list(power.BMC["Infrastructure"].get_values()) == [54]
+        # The chassis power is the sum of the power supplies input
+        assert list(power.BMC["Chassis"].get_values()) == [230]
+        # Every reading comes from the Sensors collection, and the OEM endpoint
+        sensors_url = bmc._get_sensors_urls()["System.Embedded.1"]
+        assert bmc.get_thermal_urls() == [sensors_url]
+        assert bmc.get_power_urls() == [sensors_url, oem_endpoint]
+        redfish.requests.clear()
+        BMC.get_redfish_url.cache_clear()  # type: ignore[attr-defined]
+        snapshot = bmc.snapshot()
+        thermals = bmc.read_thermals(ThermalContext(), snapshot)
+        assert list(thermals["CPU"]["CPU1 Temp"].get_values()) == [61]
+        fans = bmc.read_fans(FansContext(), snapshot)
+        assert list(fans.Fan["Fan1"].get_values()) == [9000]
+        psus = bmc.read_power_supplies(PowerSuppliesContext(), snapshot)
+        assert list(psus.BMC) == ["PS1 Input Power"]
+        assert sorted(redfish.requests) == sorted([sensors_url, oem_endpoint])
+
+    def test_hpe_sensors(self):
+        bmc = ILO(pathlib.Path(""), None, None)
+        redfish = SensorsRedfish(False, "/redfish/v1/Chassis/1")
+        bmc.redfish_obj = redfish
+        bmc.detect()
+        assert bmc.get_power_urls() == bmc.get_thermal_urls() == ["/redfish/v1/Chassis/1/Sensors"]
+        thermals = bmc.read_thermals(ThermalContext())
+        assert list(thermals["Intake"]["Inlet Temp"].get_values()) == [22]
+        psus = bmc.read_power_supplies(PowerSuppliesContext())
+        assert list(psus.BMC["PS1 Input Power"].get_values()) == [230]
+        power = bmc.read_power_consumption(PowerConsumptionContext())
+        assert list(power.BMC["Server"].get_values()) == [420]
+
+    def test_endpoint_stats(self):
+        bmc = BMC(pathlib.Path(""), None)
+        bmc.redfish_obj = FlakyRedfish()
+        power = "/redfish/v1/Chassis/1/Power"
+        for _ in range(2):
+            BMC.get_redfish_url.cache_clear()  # type: ignore[attr-defined]
+            assert bmc.get_redfish_url(power) == {}
+            assert bmc.get_redfish_url("/redfish/v1/Missing", log_failure=False) == {}
+        endpoints = bmc.take_endpoint_stats()
+        assert endpoints[power].requests == 2
+        assert endpoints[power].retries == 1
+        assert endpoints[power].status == {"200": 2}
+        assert endpoints[power].body_bytes == 4
+        assert sum(endpoints[power].latency_ms.values()) == 2
+        assert endpoints["/redfish/v1/Missing"].status == {"404": 2}
+        assert endpoints["/redfish/v1/Missing"].body_bytes == 100
+        # The statistics restart from scratch
+        assert bmc.take_endpoint_stats() == {}
+
+        # The body size is counted in bytes, Content-Length first
+        assert get_body_bytes(types.SimpleNamespace(read="é", getheader=lambda _: None)) == 2
+        assert get_body_bytes(types.SimpleNamespace(read=b"{}", getheader=lambda _: "120")) == 120
+        assert get_body_bytes(types.SimpleNamespace(read=None, getheader=lambda _: None)) == 0
+
+        # A url never answering
+        def unreachable(*_args, **_kwargs):
+            raise redfish.rest.v1.RetriesExhaustedError()
+
+        bmc.max_retries = 2
+        bmc.redfish_obj = types.SimpleNamespace(get=unreachable)
+        BMC.get_redfish_url.cache_clear()  # type: ignore[attr-defined]
+        assert bmc.get_redfish_url(power) is None
+        stats = bmc.take_endpoint_stats()[power]
+        assert (stats.requests, stats.retries, stats.failures, stats.status) == (1, 2, 1, {})
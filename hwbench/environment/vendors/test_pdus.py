@@ -1,9 +1,13 @@
 import json
 import pathlib
+from unittest.mock import patch
+
+import pytest
 
 from hwbench.bench.monitoring_structs import Power, PowerConsumptionContext
 from hwbench.environment.test_vendors import PATCH_TYPES, TestVendors
 from hwbench.environment.vendors.mock import MockVendor
+from hwbench.environment.vendors.pdu import EnergyMeter, get_resolution_kwh
 from hwbench.environment.vendors.pdus.generic import Generic
 
 path = pathlib.Path("")
@@ -112,6 +116,61 @@ class TestRaritan(TestPDU):
             "user_label": "DATACENTER-6/RACK-B37/FEED-C",
         }
 
+    def test_energy(self):
+        self.pdu.start_energy()
+        energy = self.pdu.stop_energy()
+        # The counter did not change, the power readings are integrated
+        assert energy
+        assert energy.method == "integration"
+        assert list(energy.outlets) == [self.pdu.get_outlet_ids()[0]]
+
+
+class TestEnergyMeter:
+    def measure(self, times_s: list[float], readings: list[tuple[dict, dict]]):
+        """Return the energy of readings done at times_s[1:-1], between a start at times_s[0] and a stop"""
+        meter = EnergyMeter()
+        with patch("hwbench.environment.vendors.pdu.time.monotonic_ns", side_effect=[int(t * 1e9) for t in times_s]):
+            meter.start()
+            for power, counters in readings:
+                meter.add(power, counters)
+            return meter.stop()
+
+    def test_resolution(self):
+        assert get_resolution_kwh(4219.230905) == pytest.approx(1e-6)
+        assert get_resolution_kwh(21.19475100000203) == pytest.approx(1e-6)
+        assert get_resolution_kwh(12.3) == pytest.approx(0.1)
+        assert get_resolution_kwh(0.0) == 1
+
+    def test_counter(self):
+        energy = self.measure(
+            [0, 0, 30, 60, 60],
+            [({"1": 300}, {"1": 10.000123}), ({"1": 310}, {"1": 10.0026}), ({"1": 300}, {"1": 10.005123})],
+        )
+        assert energy
+        assert energy.method == "counter"
+        assert energy.joules == pytest.approx(18000)
+        assert energy.watts == pytest.approx(300)
+        assert energy.resolution_j == pytest.approx(3.6)
+
+    def test_integration(self):
+        # Wh counters are too coarse for 5Wh
+        coarse = self.measure(
+            [0, 0, 30, 60],
+            [({"1": 200, "2": 100}, {"1": 10.0, "2": 20.0}), ({"1": 400, "2": 100}, {"1": 10.005, "2": 20.002})],
+        )
+        assert coarse
+        assert coarse.method == "integration"
+        # 300W for the first 30s, then the last reading is extended to the stop
+        assert coarse.outlets == pytest.approx({"1": 21000, "2": 6000})
+
+        # The counter was reset
+        reset = self.measure([0, 0, 60, 60], [({"1": 300}, {"1": 10.000123}), ({"1": 300}, {"1": 0.000123})])
+        assert reset
+        assert reset.method == "integration"
+        assert reset.joules == pytest.approx(18000)
+
+        assert self.measure([0, 60], []) is None
+
 
 class TestRaritanGroup(TestRaritan):
     def __init__(self, *args, **kwargs):
@@ -0,0 +1,150 @@
+import json
+import pathlib
+import tempfile
+
+import redfish  # type: ignore
+
+from hwbench.bench.monitoring_structs import (
+    FansContext,
+    PowerConsumptionContext,
+    PowerSuppliesContext,
+    ThermalContext,
+)
+
+from .bmc import BMC
+from .dell.dell import IDRAC
+from .hpe.hpe import ILO
+from .mock import MockVendor
+from .pdus.generic import Generic
+from .simulator import Faults, RedfishSimulator, load_replay
+
+THERMAL = "/redfish/v1/Chassis/System.Embedded.1/Thermal"
+
+
+def connect(bmc: BMC, simulator: RedfishSimulator) -> BMC:
+    bmc._connect_redfish("user", "password", simulator.get_url(), redfish.AuthMethod.SESSION)
+    return bmc
+
+
+def disconnect(bmc: BMC, simulator: RedfishSimulator):
+    bmc.redfish_obj.logout()
+    bmc.logged = False
+    simulator.stop()
+
+
+class TestSimulator:
+    def test_idrac(self):
+        simulator = RedfishSimulator(profile="idrac", seed=1).start()
+        bmc = connect(IDRAC(pathlib.Path(""), None), simulator)
+        try:
+            bmc.detect()
+            assert bmc.get_firmware_version() == "6.10.30.00"
+            snapshot = bmc.snapshot(bmc.get_power_urls())
+            thermals = bmc.read_thermals(ThermalContext(), snapshot)
+            assert set(thermals) == {"Intake", "Exhaust", "CPU"}
+            assert 20 < thermals["Intake"]["System Board Inlet Temp"].get_values()[0] < 28
+            assert len(bmc.read_fans(FansContext(), snapshot).Fan) == 4
+            power = bmc.read_power_consumption(PowerConsumptionContext(), snapshot)
+            assert set(power.BMC) == {"Server", "ServerInChassis", "Infrastructure", "Chassis"}
+            assert bmc.oem_endpoint.endswith("DellAttributes/System.Embedded.1")
+        finally:
+            disconnect(bmc, simulator)
+
+    def test_ilo(self):
+        simulator = RedfishSimulator(profile="ilo", seed=1).start()
+        bmc = connect(ILO(pathlib.Path(""), None, None), simulator)  # type: ignore[arg-type]
+        try:
+            bmc.detect()
+            assert not bmc.is_multinode_chassis()
+            thermals = bmc.read_thermals(ThermalContext())
+            assert "Inlet Ambient" in [metric.get_name() for metric in thermals["Intake"].values()]
+            psus = bmc.read_power_supplies(PowerSuppliesContext())
+            assert list(psus.BMC) == ["HpeServerPowerSupply1", "HpeServerPowerSupply2"]
+            assert bmc.read_power_consumption(PowerConsumptionContext()).BMC["Server"].get_values()
+        finally:
+            disconnect(bmc, simulator)
+
+    def test_raritan(self):
+        simulator = RedfishSimulator(profile="raritan", seed=1).start()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config = pathlib.Path(tmpdir) / "monitoring.cfg"
+            config.write_text(
+                f"[pdu]\ntype=PDU\ndriver=raritan\nurl={simulator.get_url()}\n"
+                "username=admin\npassword=admin\noutletgroup=1,2\n"
+            )
+            vendor = MockVendor(pathlib.Path(tmpdir), None, str(config))
+            vendor.find_monitoring_sections("PDU")
+            pdu = Generic(vendor, "pdu")
+            pdu.connect_redfish()
+            try:
+                pdu.detect()
+                assert pdu.dump()["outlets"] == [
+                    {"id": "1", "name": "server-1", "user_label": None},
+                    {"id": "2", "name": "server-2", "user_label": None},
+                ]
+                power = pdu.read_power_consumption(PowerConsumptionContext())
+                assert 690 < power.PDU["pdu"].get_values()[0] < 750
+
+                pdu.start_energy()
+                energy = pdu.stop_energy()
+                assert energy
+                assert list(energy.outlets) == ["1", "2"]
+            finally:
+                pdu.redfish_obj.logout()
+                pdu.logged = False
+                simulator.stop()
+
+    def test_etag(self):
+        simulator = RedfishSimulator(profile="idrac", refresh_s=3600, seed=1).start()
+        bmc = connect(BMC(pathlib.Path(""), None), simulator)
+        try:
+            for _ in range(3):
+                BMC.get_redfish_url.cache_clear()  # type: ignore[attr-defined]
+                assert bmc.get_redfish_url(THERMAL)["Temperatures"]
+            # The readings did not change, the device answered 304
+            assert bmc.take_endpoint_stats()[THERMAL].status == {"200": 1, "304": 2}
+        finally:
+            disconnect(bmc, simulator)
+
+    def test_faults(self):
+        simulator = RedfishSimulator(profile="idrac", seed=1).start()
+        bmc = connect(BMC(pathlib.Path(""), None), simulator)
+        try:
+            simulator.faults = Faults(latency_ms=50, jitter_ms=10)
+            BMC.get_redfish_url.cache_clear()  # type: ignore[attr-defined]
+            assert bmc.get_redfish_url(THERMAL)
+            assert 40 <= bmc.take_endpoint_stats()[THERMAL].get_mean_latency_ms() < 1000
+
+            simulator.faults = Faults(error_rate=1)
+            BMC.get_redfish_url.cache_clear()  # type: ignore[attr-defined]
+            assert bmc.get_redfish_url(THERMAL, log_failure=False) == {}
+            assert bmc.take_endpoint_stats()[THERMAL].status == {"503": 1}
+
+            # The connection is closed without an answer
+            simulator.faults = Faults(timeout_rate=1, timeout_s=0.1)
+            bmc.max_retries = 0
+            BMC.get_redfish_url.cache_clear()  # type: ignore[attr-defined]
+            assert bmc.get_redfish_url(THERMAL) is None
+            stats = bmc.take_endpoint_stats()[THERMAL]
+            assert (stats.requests, stats.retries, stats.failures) == (1, 0, 1)
+            simulator.faults = Faults()
+        finally:
+            disconnect(bmc, simulator)
+
+    def test_replay(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            replay_file = pathlib.Path(tmpdir) / "replay.json"
+            answers = [{"Temperatures": [{"Name": f"Inlet {index}"}]} for index in range(2)]
+            replay_file.write_text(json.dumps({f"{THERMAL}/": answers}))
+            simulator = RedfishSimulator(profile="idrac", replay=load_replay(replay_file)).start()
+        bmc = connect(BMC(pathlib.Path(""), None), simulator)
+        try:
+            names = []
+            for _ in range(3):
+                BMC.get_redfish_url.cache_clear()  # type: ignore[attr-defined]
+                names.append(bmc.get_redfish_url(THERMAL)["Temperatures"][0]["Name"])
+            # The recorded answers are replayed in a loop, the other urls are served by the profile
+            assert names == ["Inlet 0", "Inlet 1", "Inlet 0"]
+            assert bmc.get_redfish_url("/redfish/v1/Chassis")["Members"]
+        finally:
+            disconnect(bmc, simulator)
@@ -0,0 +1,134 @@
+import datetime
+import json
+import pathlib
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from hwbench.bench.monitoring_structs import ThermalContext
+
+from .bmc import BMC
+from .telemetry import parse_sse
+
+THERMAL = "/redfish/v1/Chassis/1/Thermal"
+
+
+class FakeBMC:
+    """A polled redfish client, exposing a Server-Sent Events uri"""
+
+    def __init__(self, base_url: str, sse: bool = True):
+        self.base_url = base_url
+        self.sse = sse
+        self.requests: list[str] = []
+
+    def content(self, url: str) -> dict:
+        if url == "/redfish/v1/EventService":
+            return {"ServerSentEventUri": "/redfish/v1/SSE"} if self.sse else {"ServiceEnabled": True}
+        if url == "/redfish/v1/Managers/":
+            return {"Members": [{"@odata.id": "/redfish/v1/Managers/1"}]}
+        if url == "/redfish/v1/Chassis":
+            return {"Members": [{"@odata.id": "/redfish/v1/Chassis/1"}]}
+        if url == "/redfish/v1/Chassis/1":
+            return {"Thermal": {"@odata.id": THERMAL}}
+        if url == THERMAL:
+            return {"Temperatures": [{"Name": "Inlet Temp", "ReadingCelsius": 25, "PhysicalContext": "Intake"}]}
+        return {}
+
+    def get(self, url, _args=None, headers=None, max_retry=None):
+        self.requests.append(url)
+        return types.SimpleNamespace(dict=self.content(url), status=200, getheader=lambda _: None)
+
+    def get_base_url(self):
+        return self.base_url
+
+    def get_session_key(self):
+        return "token"
+
+    def get_authorization_key(self):
+        return None
+
+
+class SSEHandler(BaseHTTPRequestHandler):
+    """Stream a metric report once the test is ready to receive it"""
+
+    def do_GET(self):
+        server = self.server
+        server.headers = self.headers  # type: ignore[attr-defined]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        server.ready.wait(5)  # type: ignore[attr-defined]
+        report = {
+            "@odata.type": "#MetricReport.v1_4_2.MetricReport",
+            "Timestamp": server.timestamp,  # type: ignore[attr-defined]
+            "MetricValues": [
+                {"MetricProperty": f"{THERMAL}#/Temperatures/0/ReadingCelsius", "MetricValue": "31"},
+                {
+                    "MetricProperty": "/redfish/v1/Chassis/2/Power#/PowerControl/0/PowerConsumedWatts",
+                    "MetricValue": "1",
+                },
+            ],
+        }
+        self.wfile.write(b": keep-alive\n\nevent: MetricReport\n")
+        self.wfile.write(f"data: {json.dumps(report)}\n\n".encode())
+        self.wfile.flush()
+        server.done.wait(5)  # type: ignore[attr-defined]
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestTelemetry:
+    def test_parse_sse(self):
+        lines = [": comment", "id: 1", "data: {", "data: }", "", "", "data: last"]
+        assert list(parse_sse(lines)) == ["{\n}", "last"]
+
+    def test_push(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), SSEHandler)
+        server.ready = threading.Event()  # type: ignore[attr-defined]
+        server.done = threading.Event()  # type: ignore[attr-defined]
+        timestamp = datetime.datetime.now(datetime.UTC) - datetime.timedelta(seconds=1)
+        server.timestamp = timestamp.isoformat()  # type: ignore[attr-defined]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            bmc = BMC(pathlib.Path(""), None)
+            redfish = FakeBMC(f"http://127.0.0.1:{server.server_address[1]}")
+            bmc.redfish_obj = redfish
+            bmc.push = True
+            bmc.detect()
+            assert bmc.telemetry
+            assert bmc.get_push_time_ns() is None
+
+            # The first reading is polled, the pushed values will update it
+            thermals = bmc.read_thermals(ThermalContext())
+            assert list(thermals["Intake"]["Inlet Temp"].get_values()) == [25]
+            server.ready.set()  # type: ignore[attr-defined]
+            deadline = time.monotonic() + 5
+            while not bmc.telemetry.reports and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert bmc.telemetry.reports == 1
+            assert server.headers["X-Auth-Token"] == "token"  # type: ignore[attr-defined]
+
+            requests = len(redfish.requests)
+            BMC.get_redfish_url.cache_clear()  # type: ignore[attr-defined]
+            bmc.read_thermals(thermals)
+            assert list(thermals["Intake"]["Inlet Temp"].get_values()) == [25, 31]
+            assert len(redfish.requests) == requests
+            # The sample is dated by the BMC clock
+            push_time_ns = bmc.get_push_time_ns()
+            assert push_time_ns is not None
+            assert 0.5 < (time.monotonic_ns() - push_time_ns) / 1e9 < 3
+        finally:
+            if bmc.telemetry:
+                bmc.telemetry.stop()
+            server.done.set()  # type: ignore[attr-defined]
+            server.shutdown()
+
+    def test_no_push(self):
+        bmc = BMC(pathlib.Path(""), None)
+        bmc.redfish_obj = FakeBMC("http://127.0.0.1:1", sse=False)
+        bmc.push = True
+        bmc.detect()
+        assert bmc.telemetry is None
+        assert bmc.get_push_time_ns() is None
@@ -6,11 +6,13 @@ import logging
 import os
 import pathlib
 import platform
+import shutil
 import time
 
 from packaging.version import Version
 
 from .bench import benchmarks
+from .bench.results import ResultsJournal, get_fingerprint
 from .config import config
 from .environment import hardware as env_hw
 from .environment import software as env_soft
@@ -18,6 +20,9 @@ from .tuning import setup as tuning_setup
 from .utils import helpers as h
 from .utils.hwlogging import init_logging
 
+# The copy of the jobs configuration in the output directory, to resume the campaign
+JOBS_CONFIG_FILE = "jobs_config.conf"
+
 
 def main():
     # Let's ensure no one is running below the expected python release
@@ -31,12 +36,17 @@ def main():
     if not is_root():
         h.fatal("hwbench is not running as effective uid 0.")
 
-    out_dir, tuning_out_dir = create_output_directory(args.output_directory)
+    if args.resume:
+        out_dir, tuning_out_dir = resume_output_directory(args.resume)
+        hwbench_config = config.Config(str(out_dir / JOBS_CONFIG_FILE))
+    else:
+        hwbench_config = config.Config(args.jobs_config)
+        out_dir, tuning_out_dir = create_output_directory(args.output_directory)
+        shutil.copyfile(args.jobs_config, out_dir / JOBS_CONFIG_FILE)
 
     # configure logging
     init_logging(tuning_out_dir / "hwbench-tuning.log")
 
-    hwbench_config = config.Config(args.jobs_config)
     benches = benchmarks.Benchmarks(out_dir, hwbench_config, verbose=args.verbose)
 
     problems = env_hw.check_requirements() + benches.check_requirements()
@@ -57,9 +67,18 @@ def main():
     benches.set_hardware(hw)
     benches.parse_jobs_config()
 
-    results = benches.run()
+    # A campaign can only be resumed on the same hardware, with the same benchmarks
+    journal = ResultsJournal(out_dir)
+    fingerprint = get_fingerprint(hw.dump(), hwbench_config.to_dict(), benches.get_expanded_jobs())
+    if args.resume:
+        journal.check_fingerprint(fingerprint)
+    else:
+        journal.write_fingerprint(fingerprint)
     benches.dump()
 
+    # Every result is saved as soon as its benchmark completes, the completed ones are not run again
+    results = benches.run(journal.load(), journal.append)
+
     out = format_output(env.dump(), hw.dump(), results, benches.jobs_config)
 
     write_output(out_dir, out)
@@ -81,17 +100,34 @@ def create_output_directory(directory) -> tuple[pathlib.Path, pathlib.Path]:
     return out_dir.absolute(), tuning_out_dir.absolute()
 
 
+def resume_output_directory(directory) -> tuple[pathlib.Path, pathlib.Path]:
+    out_dir = pathlib.Path(directory)
+    if not (out_dir / JOBS_CONFIG_FILE).is_file():
+        h.fatal(f"Cannot resume: {out_dir} is not a hwbench output directory.")
+    if (out_dir / "results.json").exists():
+        h.fatal(f"Cannot resume: {out_dir} already has all its results.")
+    tuning_out_dir = out_dir / "tuning"
+    tuning_out_dir.mkdir(exist_ok=True)
+
+    return out_dir.absolute(), tuning_out_dir.absolute()
+
+
 def parse_options():
     parser = argparse.ArgumentParser(
         prog="hwbench",
         description="Criteo Hardware Benchmarking tool",
         epilog="Note that hwbench needs to run as root, for many reasons: system-wide tuning, local IPMI link to the BMC, x86 performance with turbostat, devices access with fio, etc.",
     )
-    parser.add_argument(
+    campaign = parser.add_mutually_exclusive_group(required=True)
+    campaign.add_argument(
         "-j",
         "--jobs-config",
         help="Specify the file containing jobs to runs",
-        required=True,
+    )
+    campaign.add_argument(
+        "--resume",
+        metavar="OUTPUT_DIRECTORY",
+        help="Resume an interrupted run from its output directory, only the missing benchmarks are run",
     )
     parser.add_argument(
         "-m",
@@ -116,7 +152,10 @@ def parse_options():
         default=False,
         help="Enable verbose output",
     )
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.resume and args.output_directory:
+        parser.error("--resume uses its own output directory, -o/--output-directory cannot be set")
+    return args
 
 
 def format_output(env, hw, results, config) -> dict[str, object]:
@@ -7,6 +7,20 @@ if TYPE_CHECKING:
     from _typeshed import DataclassInstance
 
 
+def asdict(obj):
+    """Like dataclasses.asdict() but objects with a to_dict() method serialize themselves"""
+
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return {field.name: asdict(getattr(obj, field.name)) for field in dataclasses.fields(obj)}
+    if isinstance(obj, dict):
+        return {key: asdict(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [asdict(value) for value in obj]
+    return obj
+
+
 def iterate_dataclass(obj: DataclassInstance | dict):
     """Useful to not convert a whole dataclass recursively to keep instances"""
 
@@ -19,6 +19,10 @@ class External(ABC):
     def run_cmd_version(self) -> list[str]:
         return []
 
+    def run_cmd_warmup(self) -> list[str]:
+        """Command run before run_cmd(), its output is discarded"""
+        return []
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -62,6 +66,16 @@ class External(ABC):
                 self._write_output("version-stdout", ver.stdout)
                 self._write_output("version-stderr", ver.stderr)
                 self.parse_version(ver.stdout, ver.stderr)
+            warmup = self.run_cmd_warmup()
+            if warmup:
+                subprocess.run(
+                    warmup,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    cwd=self.out_dir,
+                    env=english_env,
+                    stdin=subprocess.DEVNULL,
+                )
             out = subprocess.run(
                 self.run_cmd(),
                 capture_output=True,